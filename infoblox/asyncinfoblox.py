@@ -0,0 +1,1098 @@
+# -*- coding: utf-8 -*-
+""" asyncio client mirroring infoblox.Infoblox (python 3.5+, needs aiohttp)
+
+    async with AsyncInfoblox('10.10.10.10', 'admin', 'admin', '1.6',
+                             'default', 'default') as iba_api:
+        hosts = await asyncio.gather(*[iba_api.get_host(fqdn)
+                                       for fqdn in fqdns])
+
+Every public method of Infoblox and Util is a coroutine here, taking the
+same arguments plus an optional timeout keyword bounding the whole call.
+Requests share one aiohttp connection pool; at most max_concurrency of
+them are in flight to the grid, the others wait their turn.
+"""
+import asyncio
+import base64
+import functools
+import json
+import logging
+import re
+import ssl
+
+try:
+    import aiohttp
+    from yarl import URL
+except ImportError:  # pragma: no cover - optional dependency
+    aiohttp = None
+
+from .infoblox import (InfobloxBadInputParameter, InfobloxGeneralException,
+                       InfobloxNoIPavailableException,
+                       InfobloxNoNetworkAvailableException,
+                       InfobloxNotFoundException, InfobloxNotUpdatedException,
+                       InfobloxTimeoutException, Stats)
+
+
+logger = logging.getLogger(__name__)
+
+
+def _ref_name(ref, obj):
+    """ Returns the name part of a _ref of the obj type, or None """
+    match = re.match(r'%s/[^:]+:([^/]+)/' % obj, ref or '')
+    return match.group(1) if match else None
+
+
+def _raise_ibap_error(error, exception):
+    """ Raises exception for a WAPI Client.Ibap.Data error, the WAPI error
+        text for other errors carrying one, else error itself
+    """
+    try:
+        r_json = error.response.json()
+        code, text = r_json.get('code'), r_json.get('text')
+    except (AttributeError, ValueError):
+        raise error
+    if code == 'Client.Ibap.Data':
+        raise exception(text)
+    if text is not None:
+        raise InfobloxGeneralException(text)
+    raise error
+
+
+def _bounded(func):
+    """ Adds the timeout keyword argument bounding the whole call, every
+        request it makes included (defaults to the client timeout)
+    """
+    @functools.wraps(func)
+    async def call(self, *args, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = self.timeout
+        if timeout is None:
+            return await func(self, *args, **kwargs)
+        try:
+            return await asyncio.wait_for(func(self, *args, **kwargs),
+                                          timeout)
+        except asyncio.TimeoutError:
+            raise InfobloxTimeoutException(
+                '%s did not complete within %ss' % (func.__name__, timeout))
+    return call
+
+
+class AsyncResponse(object):
+    """ Status, headers and body of a WAPI response, read in full """
+
+    def __init__(self, response, content):
+        self.status_code = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+        self.url = str(response.url)
+        self.content = content
+        self._response = response
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        """ Returns the decoded body, raises ValueError if not JSON """
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            error = aiohttp.ClientResponseError(
+                self._response.request_info, self._response.history,
+                status=self.status_code, message=self.reason,
+                headers=self.headers)
+            # like requests' HTTPError, for the WAPI error body
+            error.response = self
+            raise error
+
+
+class AsyncSession(object):
+    """ aiohttp session of one grid, logging in once and reusing the
+    ibapauth cookie like the synchronous Session
+    """
+
+    auth_cookie = 'ibapauth'
+
+    def __init__(self, user, password, verify_ssl=False, max_concurrency=100,
+                 timeout=None, connect_timeout=None, cookie_auth=True,
+                 compression=True):
+        token = base64.b64encode(
+            ('%s:%s' % (user, password)).encode('utf-8')).decode('ascii')
+        self.credentials = {'Authorization': 'Basic ' + token}
+        self.cookie_auth = cookie_auth
+        self.max_concurrency = max_concurrency
+        self.timeout = aiohttp.ClientTimeout(total=timeout,
+                                             sock_connect=connect_timeout)
+        if isinstance(verify_ssl, str):
+            self.ssl = ssl.create_default_context(cafile=verify_ssl)
+        else:
+            self.ssl = None if verify_ssl else False
+        self.headers = {'Accept-Encoding':
+                        'gzip, deflate' if compression else 'identity'}
+        self.stats = Stats('requests', 'logins')
+        self.session = None
+        self._semaphore = None
+        self._login_lock = None
+        self._in_flight = 0
+
+    def _session(self):
+        # created on first use, from within the event loop
+        if self.session is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._login_lock = asyncio.Lock()
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency,
+                                               ssl=self.ssl),
+                cookie_jar=aiohttp.CookieJar(unsafe=True),
+                headers=self.headers, timeout=self.timeout)
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def _auth_cookie_value(self, url):
+        cookie = self._session().cookie_jar.filter_cookies(URL(url)).get(
+            self.auth_cookie)
+        return cookie.value if cookie is not None else None
+
+    def clear_auth_cookie(self):
+        self._session().cookie_jar.clear(
+            lambda cookie: cookie.key == self.auth_cookie)
+
+    async def request(self, method, url, params=None, data=None):
+        """ Sends a request once a slot is free and returns its response
+            read in full; raises ClientResponseError on 4xx/5xx statuses
+        """
+        self._session()
+        async with self._semaphore:
+            self._in_flight += 1
+            try:
+                response = await self._send_once(method, url, params, data)
+            finally:
+                self._in_flight -= 1
+        self.stats.incr('requests')
+        if response.status_code >= 400:
+            logger.error('Failed request details: url=%r, method=%r, '
+                         'response-status=%r, response-content=%r',
+                         url, method, response.status_code, response.content)
+            response.raise_for_status()
+        return response
+
+    async def _send_once(self, method, url, params, data):
+        if not self.cookie_auth:
+            return await self._http(method, url, params, data,
+                                    self.credentials)
+        cookie = self._auth_cookie_value(url)
+        if cookie is None:
+            return await self._login(cookie, method, url, params, data)
+        response = await self._http(method, url, params, data, None)
+        if response.status_code == 401:
+            # the session timed out on the grid, log in again
+            response = await self._login(cookie, method, url, params, data)
+        return response
+
+    async def _login(self, stale, method, url, params, data):
+        """ Sends the request with the credentials to get a new session
+            cookie, unless another task replaced the stale one meanwhile
+        """
+        async with self._login_lock:
+            cookie = self._auth_cookie_value(url)
+            if cookie is not None and cookie != stale:
+                return await self._http(method, url, params, data, None)
+            self.clear_auth_cookie()
+            self.stats.incr('logins')
+            return await self._http(method, url, params, data,
+                                    self.credentials)
+
+    async def _http(self, method, url, params, data, auth):
+        # auth is the Authorization header when logging in, else None
+        async with self.session.request(method, url, params=params,
+                                        data=data,
+                                        headers=auth) as response:
+            content = await response.read()
+        return AsyncResponse(response, content)
+
+
+class AsyncUtil(object):
+    """ Coroutine versions of the Util primitives """
+
+    def __init__(self, session, base_url, timeout=None):
+        """ Class initialization method
+        :param session: AsyncSession of the grid
+        :param base_url: WAPI base url (https://host/wapi/vX.Y)
+        :param timeout: default time budget of a call in seconds (optional)
+        """
+        self.session = session
+        self.base_url = base_url
+        self.timeout = timeout
+
+    @staticmethod
+    def _return_fields(query_params, fields):
+        if fields is not None:
+            if type(fields) == str:
+                query_params['_return_fields'] = fields
+            else:
+                query_params['_return_fields'] = ','.join(fields)
+        return query_params
+
+    @_bounded
+    async def get(self, uri, query_params=None, fields=None,
+                  notFoundText=None, notFoundFail=True):
+        """Execute a get operation.
+        :param uri: The URI component (e.g. -- lease, record:a)
+        :param query_params: Key/Value query parameter dictonary.
+        :param fields: String or list of fields to return.
+        :param notFoundText: Exception text when get returns no data.
+        :param notFoundFail: Raise an exception if nothing is found.
+        """
+        params = self._return_fields(dict(query_params or {}), fields)
+        r = await self.session.request('GET', self.base_url + '/' + uri,
+                                       params=params)
+        try:
+            r_json = r.json()
+        except ValueError:
+            raise InfobloxGeneralException(r)
+        if len(r_json) > 0:
+            return r_json
+        elif notFoundFail:
+            raise InfobloxNotFoundException(notFoundText)
+        return None
+
+    @_bounded
+    async def put(self, record, payload, confirm=True):
+        """Execute a put operation to update a record.
+        :param record: The record to update.
+        :param payload: payload to be updated.
+        """
+        ref = record['_ref']
+        rest_url = self.base_url + '/' + ref
+        print("Update [%s] with [%s]" % (rest_url, payload))
+        if not confirm:
+            print("DRY-RUN -- NO CHANGES MADE")
+            return
+        r = await self.session.request('PUT', rest_url,
+                                       data=json.dumps(payload))
+        if r.status_code == 200:
+            return
+        raise InfobloxNotUpdatedException("Failed to update " + ref)
+
+    @_bounded
+    async def post(self, uri, payload, fields, confirm=True):
+        rest_url = self.base_url + '/' + uri
+        print("Create [%s] with [%s] returning [%s]" %
+              (rest_url, payload, fields))
+        if not confirm:
+            print("DRY-RUN -- NO CHANGES MADE")
+            return
+        r = await self.session.request(
+            'POST', rest_url, params=self._return_fields({}, fields),
+            data=json.dumps(payload))
+        try:
+            return r.json()
+        except ValueError:
+            raise InfobloxGeneralException(r)
+
+    @_bounded
+    async def delete_by_ref(self, ref, notFoundText=None, notFoundFail=True):
+        """Execute a delete operation.
+        :param ref: Reference to object to delete.
+        :param notFoundText: Exception text when get returns no data.
+        :param notFoundFail: Raise an exception if nothing is found.
+        """
+        try:
+            await self.session.request('DELETE', self.base_url + '/' + ref)
+        except aiohttp.ClientResponseError:
+            if notFoundFail:
+                raise InfobloxNotFoundException(notFoundText)
+            raise
+
+
+class AsyncInfoblox(object):
+    """ Coroutine versions of the Infoblox methods sharing one aiohttp
+    connection pool, with at most max_concurrency requests in flight
+    """
+
+    def __init__(self,
+                 iba_ipaddr,
+                 iba_user,
+                 iba_password,
+                 iba_wapi_version,
+                 iba_dns_view,
+                 iba_network_view,
+                 iba_verify_ssl=False,
+                 max_concurrency=100,
+                 timeout=None,
+                 connect_timeout=None,
+                 cookie_auth=True,
+                 compression=True):
+        """ Class initialization method
+        :param iba_ipaddr: IBA IP address of management interface
+        :param iba_user: IBA user name
+        :param iba_password: IBA user password
+        :param iba_wapi_version: IBA WAPI version (example: 1.0)
+        :param iba_dns_view: IBA default view
+        :param iba_network_view: IBA default network view
+        :param iba_verify_ssl: IBA SSL certificate validation (example: False)
+            or path of a CA bundle
+        :param max_concurrency: maximum number of requests in flight to the
+            grid, further requests wait for a free slot
+        :param timeout: default time budget in seconds of every call
+            (optional)
+        :param connect_timeout: time allowed to establish a connection in
+            seconds (optional)
+        :param cookie_auth: authenticate once and reuse the ibapauth session
+            cookie instead of sending basic auth with every request
+        :param compression: ask the grid for gzip/deflate compressed
+            responses
+        """
+        if aiohttp is None:
+            raise ImportError('AsyncInfoblox needs aiohttp, '
+                              'pip install aiohttp')
+        self.iba_host = iba_ipaddr
+        self.iba_user = iba_user
+        self.iba_password = iba_password
+        self.iba_wapi_version = iba_wapi_version
+        self.iba_dns_view = iba_dns_view
+        self.iba_network_view = iba_network_view
+        self.iba_verify_ssl = iba_verify_ssl
+        self.timeout = timeout
+        self.base_url = "https://{0}/wapi/v{1}".format(self.iba_host,
+                                                       self.iba_wapi_version)
+        self.session = AsyncSession(iba_user, iba_password,
+                                    verify_ssl=iba_verify_ssl,
+                                    max_concurrency=max_concurrency,
+                                    timeout=timeout,
+                                    connect_timeout=connect_timeout,
+                                    cookie_auth=cookie_auth,
+                                    compression=compression)
+        self.util = AsyncUtil(self.session, self.base_url)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """ Closes the connections to the grid """
+        await self.session.close()
+
+    @property
+    def stats(self):
+        """ Requests sent, logins and requests in flight """
+        return dict(self.session.stats.snapshot(),
+                    in_flight=self.session.in_flight)
+
+    def _url(self, path):
+        return self.base_url + '/' + path
+
+    async def _get_json(self, url, params=None):
+        r = await self.session.request('GET', url, params=params)
+        try:
+            return r.json()
+        except ValueError:
+            raise InfobloxGeneralException(r)
+
+    async def _post_json(self, url, data=None):
+        r = await self.session.request('POST', url, data=data)
+        try:
+            return r.json()
+        except ValueError:
+            raise InfobloxGeneralException(r)
+
+    async def _first(self, url, not_found_text):
+        r_json = await self._get_json(url)
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(not_found_text)
+        return r_json[0]
+
+    async def _named_ref(self, url, obj, fqdn, not_found_text,
+                         unexpected_text):
+        """ Returns the first object found, checking its _ref names fqdn """
+        found = await self._first(url, not_found_text)
+        if _ref_name(found['_ref'], obj) != fqdn:
+            raise InfobloxGeneralException(unexpected_text + found['_ref'])
+        return found
+
+    async def _ref(self, url, not_found_text, unexpected_text):
+        found = await self._first(url, not_found_text)
+        if not found['_ref']:
+            raise InfobloxGeneralException(unexpected_text)
+        return found['_ref']
+
+    @_bounded
+    async def get_next_available_ip(self, network):
+        """ Implements IBA next_available_ip REST API call
+        Returns IP v4 address
+        :param network: network in CIDR format
+        """
+        net_ref = (await self._first(
+            self._url('network?network=' + network + '&network_view=' +
+                      self.iba_network_view),
+            "No requested network found: " + network))['_ref']
+        try:
+            r_json = await self._post_json(
+                self._url(net_ref + '?_function=next_available_ip&num=1'))
+        except aiohttp.ClientResponseError as e:
+            _raise_ibap_error(e, InfobloxNoIPavailableException)
+        return r_json['ips'][0]
+
+    @_bounded
+    async def get_next_available_ips(self, network, count, exclude=None):
+        """ Implements IBA next_available_ip REST API call for several
+            addresses at once, in two requests whatever their number
+        Returns list of IP v4 addresses
+        :param network: network in CIDR format
+        :param count: number of addresses to return
+        :param exclude: IP v4 addresses not to return (optional)
+        """
+        if count < 1:
+            raise InfobloxBadInputParameter('Expected a count of at least 1')
+        net_ref = (await self._first(
+            self._url('network?network=' + network + '&network_view=' +
+                      self.iba_network_view),
+            "No requested network found: " + network))['_ref']
+        payload = {'num': count}
+        if exclude:
+            payload['exclude'] = list(exclude)
+        try:
+            r_json = await self._post_json(
+                self._url(net_ref + '?_function=next_available_ip'),
+                json.dumps(payload))
+        except aiohttp.ClientResponseError as e:
+            _raise_ibap_error(e, InfobloxNoIPavailableException)
+        return r_json['ips']
+
+    @_bounded
+    async def create_host_record(self, address, fqdn, payload=None):
+        """ Implements IBA REST API call to create IBA host record
+        Returns IP v4 address assigned to the host
+        :param address: IP v4 address or NET v4 address in CIDR format
+        :param fqdn: hostname in FQDN
+        :return: next available ip
+        """
+        # CIDR or range
+        if re.match(r"^[0-9]+\.[0-9]+\.[0-9]+\.[0-9]+/[0-9]+$", address) or \
+                re.match(r"^[0-9]+\.[0-9]+\.[0-9]+\.[0-9]+-"
+                         r"[0-9]+\.[0-9]+\.[0-9]+\.[0-9]+$", address):
+            ipv4addr = 'func:nextavailableip:' + address
+        # static
+        elif re.match(r"^[0-9]+\.[0-9]+\.[0-9]+\.[0-9]+$", address):
+            ipv4addr = address
+        else:
+            raise InfobloxBadInputParameter(
+                'Expected IP or NET address in CIDR format')
+
+        if payload is None:
+            payload = {'name': fqdn,
+                       'view': self.iba_dns_view,
+                       'ipv4addrs': [{'ipv4addr': ipv4addr,
+                                      'configure_for_dhcp': False,
+                                      }]}
+        r_json = await self.util.post('record:host', payload=payload,
+                                      fields=['ipv4addrs'])
+        if r_json is None:
+            raise InfobloxGeneralException("Failed to create "
+                                           "host record for [%s]" % (address))
+        return r_json['ipv4addrs'][0]['ipv4addr']
+
+    @_bounded
+    async def get_cname_record(self, fqdn):
+        """ Retrieves a CNAME record by FQDN
+        :param fqdn: hostname in FQDN
+        """
+        return await self._named_ref(
+            self._url('record:cname?name=' + fqdn), 'record:cname', fqdn,
+            "No requested cname record found: " + fqdn,
+            "Received unexpected cname record  reference: ")
+
+    @_bounded
+    async def create_txt_record(self, text, fqdn):
+        """ Implements IBA REST API call to create IBA txt record
+        :param text: free text to be added to the record
+        :param fqdn: hostname in FQDN
+        """
+        await self._post_json(
+            self._url('record:txt'),
+            json.dumps({'text': text, 'name': fqdn,
+                        'view': self.iba_dns_view}))
+
+    @_bounded
+    async def delete_host_record(self, fqdn):
+        """ Implements IBA REST API call to delete IBA host record
+        :param fqdn: hostname in FQDN
+        """
+        host = await self._named_ref(
+            self._url('record:host?name=' + fqdn + '&view=' +
+                      self.iba_dns_view), 'record:host', fqdn,
+            "No requested host found: " + fqdn,
+            "Received unexpected host reference: ")
+        await self.session.request('DELETE', self._url(host['_ref']))
+
+    @_bounded
+    async def delete_txt_record(self, fqdn):
+        """ Implements IBA REST API call to delete IBA TXT record
+        :param fqdn: hostname in FQDN
+        """
+        txt = await self._named_ref(
+            self._url('record:txt?name=' + fqdn + '&view=' +
+                      self.iba_dns_view), 'record:txt', fqdn,
+            "No requested host found: " + fqdn,
+            "Received unexpected host reference: ")
+        await self.session.request('DELETE', self._url(txt['_ref']))
+
+    async def _host_aliases(self, host_fqdn):
+        return await self._named_ref(
+            self._url('record:host?name=' + host_fqdn + '&view=' +
+                      self.iba_dns_view + '&_return_fields=name,aliases'),
+            'record:host', host_fqdn,
+            "No requested host found: " + host_fqdn,
+            "Received unexpected host reference: ")
+
+    @_bounded
+    async def add_host_alias(self, host_fqdn, alias_fqdn):
+        """ Implements IBA REST API call to add an alias to IBA host record
+        :param host_fqdn: host record name in FQDN
+        :param alias_fqdn: host record name in FQDN
+        """
+        host = await self._host_aliases(host_fqdn)
+        aliases = host.get('aliases', []) + [alias_fqdn]
+        await self.session.request('PUT', self._url(host['_ref']),
+                                   data=json.dumps({'aliases': aliases}))
+
+    @_bounded
+    async def delete_host_alias(self, host_fqdn, alias_fqdn):
+        """ Implements IBA REST API call to remove an alias from IBA host
+            record
+        :param host_fqdn: host record name in FQDN
+        :param alias_fqdn: host record name in FQDN
+        """
+        host = await self._host_aliases(host_fqdn)
+        if alias_fqdn not in host.get('aliases', []):
+            raise InfobloxNotFoundException(
+                "No requested host alias found: " + alias_fqdn)
+        aliases = [a for a in host['aliases'] if a != alias_fqdn]
+        await self.session.request('PUT', self._url(host['_ref']),
+                                   data=json.dumps({'aliases': aliases}))
+
+    @_bounded
+    async def create_cname_record(self, canonical, name):
+        """ Implements IBA REST API call to create IBA cname record
+        :param canonical: canonical name in FQDN format
+        :param name: the name for a CNAME record in FQDN format
+        """
+        await self._post_json(self._url('record:cname'),
+                              json.dumps({"canonical": canonical,
+                                          "name": name,
+                                          "view": self.iba_dns_view}))
+
+    @_bounded
+    async def delete_cname_record(self, fqdn):
+        """ Implements IBA REST API call to delete IBA cname record
+        :param fqdn: cname in FQDN
+        """
+        cname = await self._named_ref(
+            self._url('record:cname?name=' + fqdn + '&view=' +
+                      self.iba_dns_view), 'record:cname', fqdn,
+            "No requested cname record found: " + fqdn,
+            "Received unexpected cname record  reference: ")
+        await self.session.request('DELETE', self._url(cname['_ref']))
+
+    @_bounded
+    async def update_cname_record(self, canonical, name):
+        """ Implements IBA REST API call to update or repoint IBA cname record
+        :param canonical: canonical name in FQDN format
+        :param name: the name for the new CNAME record in FQDN format
+        """
+        r_json = await self._get_json(self._url('record:cname'),
+                                      params={'name': name})
+        # RFC1912 - A CNAME can not coexist with any other data, we
+        # should expect utmost one entry
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException("CNAME: " + name + " not found.")
+        if len(r_json) > 1:
+            raise InfobloxGeneralException(
+                "More than one CNAME found: " + name)
+        await self.session.request('PUT', self._url(r_json[0]['_ref']),
+                                   data=json.dumps({'canonical': canonical}))
+
+    @_bounded
+    async def create_dhcp_range(self, start_ip_v4, end_ip_v4):
+        """ Implements IBA REST API call to add DHCP range for given
+            start and end addresses
+        :param start_ip_v4: IP v4 address
+        :param end_ip_v4: IP v4 address
+        """
+        await self._post_json(self._url('range'),
+                              json.dumps({'start_addr': start_ip_v4,
+                                          'end_addr': end_ip_v4}))
+
+    @_bounded
+    async def delete_dhcp_range(self, start_ip_v4, end_ip_v4):
+        """ Implements IBA REST API call to delete DHCP range for given
+            start and end addresses
+        :param start_ip_v4: IP v4 address
+        :param end_ip_v4: IP v4 address
+        """
+        range_ref = await self._ref(
+            self._url('range?start_addr=' + start_ip_v4 + '&end_addr=' +
+                      end_ip_v4 + '&network_view=' + self.iba_network_view),
+            "No requested range found: " + start_ip_v4 + "-" + end_ip_v4,
+            "No range reference received in IBA reply")
+        await self.session.request('DELETE', self._url(range_ref))
+
+    @_bounded
+    async def get_host(self, fqdn, fields=None, notFoundFail=True):
+        """ Implements IBA REST API call to retrieve host record fields
+        Returns hash table of fields with field name as a hash key
+        :param fqdn: hostname in FQDN
+        :param fields: comma-separated list of field names (optional)
+        """
+        r_json = await self.util.get('record:host',
+                                     query_params={
+                                         'name': fqdn,
+                                         'view': self.iba_dns_view
+                                     },
+                                     fields=fields,
+                                     notFoundText="No hosts found: " + fqdn,
+                                     notFoundFail=notFoundFail)
+        return None if r_json is None else r_json[0]
+
+    @_bounded
+    async def get_host_by_alias(self, fqdn, fields=None, notFoundFail=True):
+        """ Implements IBA REST API call to retrieve host record fields by
+            alias
+        Returns hash table of fields with field name as a hash key
+        :param fqdn: alias in FQDN
+        :param fields: comma-separated list of field names (optional)
+        """
+        r_json = await self.util.get('record:host',
+                                     query_params={
+                                         'alias': fqdn,
+                                         'view': self.iba_dns_view
+                                     },
+                                     fields=fields,
+                                     notFoundText="No hosts found: " + fqdn,
+                                     notFoundFail=notFoundFail)
+        return None if r_json is None else r_json[0]
+
+    @_bounded
+    async def get_host_by_regexp(self, fqdn):
+        """ Implements IBA REST API call to retrieve host records by fqdn
+            regexp filter
+        Returns array of host names in FQDN matched to given regexp filter
+        :param fqdn: hostname in FQDN or FQDN regexp filter
+        """
+        r_json = await self._get_json(self._url(
+            'record:host?name~=' + fqdn + '&view=' + self.iba_dns_view))
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No hosts found for regexp filter: " + fqdn)
+        return [host['name'] for host in r_json]
+
+    @_bounded
+    async def get_txt_by_regexp(self, fqdn):
+        """ Implements IBA REST API call to retrieve TXT records by fqdn
+            regexp filter
+        Returns dictonary of host names in FQDN matched to given regexp
+            filter with the TXT value
+        :param fqdn: hostname in FQDN or FQDN regexp filter
+        """
+        r_json = await self._get_json(self._url(
+            'record:txt?name~=' + fqdn + '&view=' + self.iba_dns_view))
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No txt records found for regexp filter: " + fqdn)
+        return dict((host['name'], host['text']) for host in r_json)
+
+    @_bounded
+    async def get_host_by_ip(self, ip_v4, fields=None, notFoundFail=True):
+        """ Implements IBA REST API call to find hostname by IP address
+        Returns array of host names in FQDN associated with given IP address
+        :param ip_v4: IP v4 address
+        """
+        r_json = await self.get_ipv4address_by_ip(ip_v4, fields,
+                                                  notFoundFail)
+        return None if r_json is None else r_json['names']
+
+    @_bounded
+    async def get_ipv4address_by_ip(self, ip_v4, fields=None,
+                                    notFoundFail=True):
+        """ Implements IBA REST API call to find hostname by IP address
+        Returns ipv4address details associated with given IP address
+        :param ip_v4: IP v4 address
+        """
+        r_json = await self.util.get('ipv4address',
+                                     query_params={
+                                         'ip_address': ip_v4,
+                                         'network_view': self.iba_network_view
+                                     },
+                                     fields=fields,
+                                     notFoundText="No IP found: " + ip_v4,
+                                     notFoundFail=notFoundFail)
+        return None if r_json is None else r_json[0]
+
+    @_bounded
+    async def get_ip_by_host(self, fqdn):
+        """ Implements IBA REST API call to find IP addresses by hostname
+        Returns array of IP v4 addresses associated with given hostname
+        :param fqdn: hostname in FQDN
+        """
+        host = await self._first(
+            self._url('record:host?name=' + fqdn + '&view=' +
+                      self.iba_dns_view), "No hosts found: " + fqdn)
+        if len(host['ipv4addrs']) == 0:
+            raise InfobloxNotFoundException(
+                "No host records found for FQDN: " + fqdn)
+        return [ipv4addr['ipv4addr'] for ipv4addr in host['ipv4addrs']]
+
+    @staticmethod
+    def _extattrs(found, attributes):
+        extattrs = {}
+        for attribute in attributes or found['extattrs'].keys():
+            if attribute not in found['extattrs']:
+                raise InfobloxNotFoundException(
+                    "No requested attribute found: " + attribute)
+            extattrs[attribute] = found['extattrs'][attribute]['value']
+        return extattrs
+
+    @_bounded
+    async def get_host_extattrs(self, fqdn, attributes=None):
+        """ Implements IBA REST API call to retrieve host extensible
+            attributes
+        Returns hash table of attributes with attribute name as a hash key
+        :param fqdn: hostname in FQDN
+        :param attributes: array of extensible attribute names (optional)
+        """
+        host = await self._first(
+            self._url('record:host?name=' + fqdn + '&view=' +
+                      self.iba_dns_view + '&_return_fields=name,extattrs'),
+            "No requested host found: " + fqdn)
+        return self._extattrs(host, attributes)
+
+    @_bounded
+    async def get_network(self, network, fields=None):
+        """ Implements IBA REST API call to retrieve network object fields
+        Returns hash table of fields with field name as a hash key
+        :param network: network in CIDR format
+        :param fields: comma-separated list of field names
+            (optional, returns network in CIDR format and netmask if
+             not specified)
+        """
+        if not fields:
+            fields = 'network,netmask'
+        if type(fields) is not str:
+            fields = ','.join(fields)
+        return await self._first(
+            self._url('network?network=' + network + '&network_view=' +
+                      self.iba_network_view + '&_return_fields=' + fields),
+            "No requested network found: " + network)
+
+    @_bounded
+    async def get_network_by_ip(self, ip_v4):
+        """ Implements IBA REST API call to find network by IP address which
+            belongs to this network
+        Returns network in CIDR format
+        :param ip_v4: IP v4 address
+        """
+        address = await self._first(
+            self._url('ipv4address?ip_address=' + ip_v4 + '&network_view=' +
+                      self.iba_network_view), "No IP found: " + ip_v4)
+        if 'network' not in address:
+            raise InfobloxNotFoundException(
+                "No network found for IP: " + ip_v4)
+        return address['network']
+
+    @_bounded
+    async def get_network_by_extattrs(self, attributes):
+        """ Implements IBA REST API call to find a network by it's
+            extensible attributes
+        Returns array of networks in CIDR format
+        :param attributes: comma-separated list of attrubutes name/value
+            pairs, see Infoblox.get_network_by_extattrs
+        """
+        r_json = await self._get_json(self._url(
+            'network?*' + "&*".join(attributes.split(",")) +
+            '&network_view=' + self.iba_network_view))
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No networks found for extensible attributes: " + attributes)
+        return [network['network'] for network in r_json
+                if 'network' in network]
+
+    @_bounded
+    async def get_host_by_extattrs(self, attributes):
+        """ Implements IBA REST API call to find host by it's extensible
+            attributes
+        Returns array of hosts in FQDN
+        :param attributes: comma-separated list of attrubutes name/value
+            pairs, see Infoblox.get_host_by_extattrs
+        """
+        r_json = await self._get_json(self._url(
+            'record:host?*' + "&*".join(attributes.split(",")) +
+            '&view=' + self.iba_dns_view))
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No hosts found for extensible attributes: " + attributes)
+        return [host['name'] for host in r_json if 'name' in host]
+
+    def _network_extattrs_url(self, network):
+        return self._url('network?network=' + network + '&network_view=' +
+                         self.iba_network_view +
+                         '&_return_fields=network,extattrs')
+
+    @_bounded
+    async def get_network_extattrs(self, network, attributes=None):
+        """ Implements IBA REST API call to retrieve network extensible
+            attributes
+        Returns hash table of attributes with attribute name as a hash key
+        :param network: network in CIDR format
+        :param attributes: array of extensible attribute names (optional)
+        """
+        found = await self._first(self._network_extattrs_url(network),
+                                  "No requested network found: " + network)
+        return self._extattrs(found, attributes)
+
+    async def _put_network_extattrs(self, network, update):
+        found = await self._first(self._network_extattrs_url(network),
+                                  "No requested network found: " + network)
+        if not found['_ref']:
+            raise InfobloxGeneralException(
+                "No network reference received in IBA reply for network: " +
+                network)
+        extattrs = found['extattrs']
+        update(extattrs)
+        await self.session.request('PUT', self._url(found['_ref']),
+                                   data=json.dumps({'extattrs': extattrs}))
+
+    @_bounded
+    async def update_network_extattrs(self, network, attributes):
+        """ Implements IBA REST API call to add or update network extensible
+            attributes
+        :param network: network in CIDR format
+        :param attributes: hash table of extensible attributes with attribute
+            name as a hash key
+        """
+        def update(extattrs):
+            for attr_name, attr_value in attributes.items():
+                extattrs.setdefault(attr_name, {})['value'] = attr_value
+        await self._put_network_extattrs(network, update)
+
+    @_bounded
+    async def delete_network_extattrs(self, network, attributes):
+        """ Implements IBA REST API call to delete network extensible
+            attributes
+        :param network: network in CIDR format
+        :param attributes: array of extensible attribute names
+        """
+        def update(extattrs):
+            for attribute in attributes:
+                extattrs.pop(attribute, None)
+        await self._put_network_extattrs(network, update)
+
+    @_bounded
+    async def create_network(self, network):
+        """ Implements IBA REST API call to create DHCP network object
+        :param network: network in CIDR format
+        """
+        await self._post_json(self._url('network'),
+                              json.dumps({'network': network,
+                                          'network_view':
+                                              self.iba_network_view}))
+
+    @_bounded
+    async def delete_network(self, network):
+        """ Implements IBA REST API call to delete DHCP network object
+        :param network: network in CIDR format
+        """
+        network_ref = await self._ref(
+            self._url('network?network=' + network + '&network_view=' +
+                      self.iba_network_view),
+            "No network found: " + network,
+            "No network reference received in IBA reply for network: " +
+            network)
+        await self.session.request('DELETE', self._url(network_ref))
+
+    @_bounded
+    async def create_networkcontainer(self, networkcontainer):
+        """ Implements IBA REST API call to create DHCP network container
+            object
+        :param networkcontainer: network container in CIDR format
+        """
+        await self._post_json(self._url('networkcontainer'),
+                              json.dumps({'network': networkcontainer,
+                                          'network_view':
+                                              self.iba_network_view}))
+
+    @_bounded
+    async def delete_networkcontainer(self, networkcontainer):
+        """ Implements IBA REST API call to delete DHCP network container
+            object
+        :param networkcontainer: network container in CIDR format
+        """
+        container_ref = await self._ref(
+            self._url('networkcontainer?network=' + networkcontainer +
+                      '&network_view=' + self.iba_network_view),
+            "No network container found: " + networkcontainer,
+            "No network container reference received in IBA reply for "
+            "network container: " + networkcontainer)
+        await self.session.request('DELETE', self._url(container_ref))
+
+    @_bounded
+    async def get_next_available_network(self, networkcontainer, cidr):
+        """ Implements IBA REST API call to retrieve next available network
+            of network container
+        Returns network address in CIDR format
+        :param networkcontainer: network container address in CIDR format
+        :param cidr: requested network length (from 0 to 32)
+        """
+        net_ref = (await self._first(
+            self._url('networkcontainer?network=' + networkcontainer +
+                      '&network_view=' + self.iba_network_view),
+            "No requested network container found: " +
+            networkcontainer))['_ref']
+        try:
+            r_json = await self._post_json(self._url(
+                net_ref + '?_function=next_available_network&cidr=' +
+                str(cidr) + '&num=1'))
+        except aiohttp.ClientResponseError as e:
+            _raise_ibap_error(e, InfobloxNoNetworkAvailableException)
+        return r_json['networks'][0]
+
+    @_bounded
+    async def get_a_record_by_ip(self, ipaddr, fields=None,
+                                 not_found_fail=True):
+        """Retrieve A record by IP Address
+        :param ipaddr: IP address for which we want information
+        :param fields: comma-separated list of field names (optional)
+        :param not_found_fail: Raise an exception if nothing is found.
+        """
+        return await self.util.get('record:a',
+                                   query_params={'ipv4addr': ipaddr},
+                                   fields=fields,
+                                   notFoundText="No A record found: " + ipaddr,
+                                   notFoundFail=not_found_fail)
+
+    @_bounded
+    async def get_a_record_by_fqdn(self, fqdn):
+        """Retrieve A record by FQDN
+        :param fqdn: FQDN for which we want information
+        """
+        return await self._named_ref(
+            self._url('record:a?name=' + fqdn), 'record:a', fqdn,
+            "No requested A record found: " + fqdn,
+            "Received unexpected A record  reference: ")
+
+    @_bounded
+    async def update_record(self, record, fields, confirm):
+        await self.util.put(record, fields, confirm)
+
+    @_bounded
+    async def get_dhcp_range(self, network, fields=None, not_found_fail=True):
+        """Retrieve a DHCP Range by CIDR network
+        :param network: Network (in CIDR format) to get the DHCP Range for
+        """
+        return await self.util.get(
+            'range',
+            query_params={'network': network},
+            fields=fields,
+            notFoundText="No requested network found: " + network,
+            notFoundFail=not_found_fail)
+
+    @_bounded
+    async def create_fixed_address(self, ipv4addr, mac,
+                                   fields=None, confirm=True):
+        """Create a Fixed Address Record
+        :param ipv4addr: IPv4 Address of object to put on the Record
+        :param mac: Mac Address of object to put on the Record
+        """
+        return await self.util.post(
+            'fixedaddress',
+            payload={'mac': mac, 'ipv4addr': ipv4addr},
+            fields=fields,
+            confirm=confirm)
+
+    @_bounded
+    async def get_fixed_address(self, ipv4addr, mac,
+                                fields=None, not_found_fail=True):
+        """Get a Fixed Address Record
+        :param ipv4addr: IPv4 Address of object to get
+        :param mac: Mac Address of object to get
+        """
+        return await self.util.get(
+            'fixedaddress',
+            query_params={'mac': mac, 'ipv4addr': ipv4addr},
+            fields=fields,
+            notFoundText="Fixed Address not found for IP: %s, MAC: %s" % (
+                ipv4addr, mac),
+            notFoundFail=not_found_fail)
+
+    @_bounded
+    async def delete_fixed_address(self, ipv4addr, mac, not_found_fail=True):
+        """Delete a Fixed Address Record
+        :param ipv4addr: IPv4 Address of object to delete
+        :param mac: Mac Address of object to delete
+        """
+        ref = await self.get_fixed_address(ipv4addr=ipv4addr, mac=mac,
+                                           not_found_fail=not_found_fail)
+        if ref is None:
+            return None
+        return await self.util.delete_by_ref(
+            ref[0]['_ref'],
+            notFoundText="Fixed Address not found for ref: %s" % (ref),
+            notFoundFail=not_found_fail)
+
+    @_bounded
+    async def get_grid(self, name=None, fields=None, not_found_fail=True):
+        """Get a Grid Object
+        :param name: Name of a Grid object.
+        :param fields: Fields to return from the Grid object
+        """
+        return await self.util.get(
+            'grid',
+            query_params=None if name is None else {'name': name},
+            fields=fields,
+            notFoundText="No grid found.",
+            notFoundFail=not_found_fail)
+
+    @_bounded
+    async def restart_grid_services(self, payload, name=None):
+        """Restart Grid Services
+        :param name: Name of a Grid object.
+        :param payload: Dictionary of fields used to restart services.
+        """
+        ref = await self.get_grid(name=name)
+        return await self.util.post(
+            uri='%s?_function=restartservices' % ref[0]['_ref'],
+            payload=payload,
+            fields=None)
+
+    @_bounded
+    async def get_pending_changes(self, fields=None, notFoundFail=False):
+        """ Get pending changes on the Grid
+        """
+        return await self.util.get(
+            uri='grid:servicerestart:request:changedobject',
+            fields=fields,
+            notFoundFail=notFoundFail)
+
+    @_bounded
+    async def get_lease(self, query_params=None, fields=None,
+                        not_found_fail=True):
+        """Retrieve a DHCP Lease
+        :param query_params: dictionary of fields to query lease against
+        :param fields: comma-separated list of field names (optional)
+        :param not_found_fail: Raise an exception if nothing is found.
+        """
+        return await self.util.get(
+            'lease',
+            query_params=query_params,
+            fields=fields,
+            notFoundText="No Lease found.",
+            notFoundFail=not_found_fail)
@@ -9,7 +9,8 @@ class InvalidParameter(Exception):
 
 @click.group()
 @click.option('--ipaddr', envvar='IB_IPADDR',
-              help='IP address of the infoblox API')
+              help='IP address of the infoblox API, or comma-separated '
+                   'addresses of the grid master and its candidates')
 @click.option('--user', envvar='IB_USER',
               help='Infoblox API username')
 @click.option('--password', envvar='IB_PASSWORD',
@@ -22,11 +23,17 @@ class InvalidParameter(Exception):
               help='Default network view')
 @click.option('--verify-ssl/--no-verify-ssl', envvar='IB_VERIFY_SSL',
               default=False, help='Enable SSL verification')
+@click.option('--cookie-file', envvar='IB_COOKIE_FILE', default=None,
+              help='File to keep the WAPI session cookie in between runs')
 @click.pass_context
-def cli(ctx, ipaddr, user, password, wapi_version, dns_view, network_view, verify_ssl):
+def cli(ctx, ipaddr, user, password, wapi_version, dns_view, network_view,
+        verify_ssl, cookie_file):
     '''Clinfobloxs is a command line interface for the Infoblox API.'''
+    if ipaddr and ',' in ipaddr:
+        ipaddr = ipaddr.split(',')
     ctx.obj = Infoblox(ipaddr, user, password, wapi_version,
-                       dns_view, network_view, verify_ssl)
+                       dns_view, network_view, verify_ssl,
+                       cookie_file=cookie_file)
 
 
 @cli.group()
@@ -370,6 +377,18 @@ def get_next_available_ip(api, network):
     click.echo(api.get_next_available_ip(network))
 
 
+@ip.command('next_ips')
+@click.argument('network')
+@click.argument('count', type=int)
+@click.option('--exclude', multiple=True,
+              help='Address not to return, may be repeated')
+@click.pass_obj
+def get_next_available_ips(api, network, count, exclude):
+    click.echo('getting %d next available ips in %s ' % (count, network))
+    for address in api.get_next_available_ips(network, count, exclude):
+        click.echo(address)
+
+
 @ip.command('by_host')
 @click.argument('fqdn')
 @click.pass_obj
@@ -378,6 +397,46 @@ def get_ip_by_host(api, fqdn):
     click.echo(api.get_ip_by_host(fqdn))
 
 
+@cli.command('csv_import')
+@click.argument('csv_file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--operation', default='INSERT',
+              type=click.Choice(['INSERT', 'UPDATE', 'DELETE', 'REPLACE',
+                                 'MERGE', 'OVERRIDE', 'CUSTOM']),
+              help='What the import does with the rows')
+@click.option('--on-error', default='CONTINUE',
+              type=click.Choice(['CONTINUE', 'STOP']),
+              help='Carry on or stop at the first bad row')
+@click.option('--timeout', type=float, default=None,
+              help='Seconds to wait for the import to finish')
+@click.pass_obj
+def csv_import(api, csv_file, operation, on_error, timeout):
+    '''Load an Infoblox CSV file with a CSV import job.'''
+    click.echo('importing %s' % (csv_file,))
+
+    def progress(task):
+        click.echo('%s: %s lines processed, %s failed' % (
+            task.get('status'), task.get('lines_processed'),
+            task.get('lines_failed')))
+    task = api.csv_import(csv_file, operation=operation, on_error=on_error,
+                          timeout=timeout, progress=progress)
+    click.echo('import %s %s' % (task.get('import_id'), task.get('status')))
+    for error in task['errors']:
+        click.echo(error)
+
+
+@cli.command('csv_export')
+@click.argument('object_type')
+@click.argument('csv_file', type=click.Path(dir_okay=False, writable=True))
+@click.option('--timeout', type=float, default=None,
+              help='Seconds to wait for the export to finish')
+@click.pass_obj
+def csv_export(api, object_type, csv_file, timeout):
+    '''Save all objects of a type (e.g. record:host) to a CSV file.'''
+    click.echo('exporting %s to %s' % (object_type, csv_file))
+    export = api.csv_export(object_type, csv_file, timeout=timeout)
+    click.echo('%d bytes written' % (export.size,))
+
+
 @cli.group()
 def fixedaddress():
     '''Fixed Address.'''
@@ -13,11 +13,46 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import io
+import os
+import codecs
 import re
+import csv
+import uuid
+import tempfile
+import ssl
+import time
+import socket
+import select
+import struct
+import random
 import requests
 import json
 import logging
 import collections
+import itertools
+import threading
+import email.utils
+
+from requests.adapters import HTTPAdapter
+try:
+    import queue
+except ImportError:  # pragma: no cover - python 2
+    import Queue as queue
+try:
+    from http.cookiejar import LWPCookieJar, LoadError
+    from urllib.parse import urlsplit, urlunsplit
+except ImportError:  # pragma: no cover - python 2
+    from cookielib import LWPCookieJar, LoadError
+    from urlparse import urlsplit, urlunsplit
+try:
+    from urllib3 import connection as urllib3_connection
+    from urllib3 import connectionpool, poolmanager
+    from urllib3.exceptions import ConnectTimeoutError
+except ImportError:  # pragma: no cover - old requests vendoring urllib3
+    from requests.packages.urllib3 import connection as urllib3_connection
+    from requests.packages.urllib3 import connectionpool, poolmanager
+    from requests.packages.urllib3.exceptions import ConnectTimeoutError
 
 
 logger = logging.getLogger(__name__)
@@ -51,7 +86,1151 @@ class InfobloxBadInputParameter(InfobloxException):
     pass
 
 
+class InfobloxTimeoutException(InfobloxException):
+    pass
+
+
+class InfobloxUnavailableException(InfobloxException):
+    pass
+
+
+_now = getattr(time, 'monotonic', time.time)
+
+_IPV4 = r"[0-9]+\.[0-9]+\.[0-9]+\.[0-9]+"
+_CIDR_RE = re.compile(r"^%s/[0-9]+$" % _IPV4)
+_RANGE_RE = re.compile(r"^%s-%s$" % (_IPV4, _IPV4))
+_ADDRESS_RE = re.compile(r"^%s$" % _IPV4)
+# a search of one object type, as opposed to a _ref or a file download
+_SEARCH_PATH_RE = re.compile(r"^/wapi/v[^/]+/[^/]+/?$")
+
+
+class Stats(object):
+    """ Thread-safe set of named counters exposed by the client """
+
+    def __init__(self, *names):
+        self._lock = threading.Lock()
+        self._counters = dict.fromkeys(names, 0)
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def __getitem__(self, name):
+        return self._counters.get(name, 0)
+
+    def snapshot(self):
+        """ Returns a point-in-time copy of all counters as a dict """
+        with self._lock:
+            return dict(self._counters)
+
+
+class Timings(object):
+    """ Thread-safe running totals of the time spent in named phases """
+
+    def __init__(self, *phases):
+        self._lock = threading.Lock()
+        self._phases = dict((phase, [0, 0.0, 0.0]) for phase in phases)
+
+    def record(self, phase, seconds):
+        with self._lock:
+            totals = self._phases.setdefault(phase, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] = max(totals[2], seconds)
+
+    def snapshot(self):
+        """ Returns count, total, average and max seconds of every phase """
+        with self._lock:
+            return dict((phase, {'count': count, 'total': total,
+                                 'average': total / count if count else 0.0,
+                                 'max': peak})
+                        for phase, (count, total, peak)
+                        in self._phases.items())
+
+
+if hasattr(ssl, 'SSLContext'):
+    class _ResumingSSLContext(ssl.SSLContext):
+        """ SSLContext offering the last TLS session of a host when connecting
+        to it again, so that the server can do an abbreviated handshake
+        """
+
+        def remember(self, sock):
+            session = getattr(sock, 'session', None)
+            if session is None:
+                return
+            with self._sessions_lock:
+                self._sessions[sock.server_hostname] = session
+
+        def wrap_socket(self, sock, *args, **kwargs):
+            if kwargs.get('session') is None:
+                with self._sessions_lock:
+                    kwargs['session'] = self._sessions.get(
+                        kwargs.get('server_hostname'))
+            return super(_ResumingSSLContext, self).wrap_socket(sock, *args,
+                                                                **kwargs)
+
+        @classmethod
+        def create(cls):
+            """ Returns a context set up like the urllib3 default one """
+            context = cls(getattr(ssl, 'PROTOCOL_TLS_CLIENT',
+                                  ssl.PROTOCOL_SSLv23))
+            # urllib3 sets verify_mode and matches the host name itself
+            context.check_hostname = False
+            context.options |= getattr(ssl, 'OP_NO_COMPRESSION', 0)
+            if hasattr(ssl, 'TLSVersion'):
+                context.minimum_version = ssl.TLSVersion.TLSv1_2
+            context._sessions = {}
+            context._sessions_lock = threading.Lock()
+            return context
+else:  # python < 2.7.9
+    class _ResumingSSLContext(object):
+        """ Stand-in without SSLContext: TLS sessions are never resumed """
+
+
+class _CountingConnectionMixin(object):
+    """ Counts sockets opened and closed by a pooled connection and times
+    the DNS, TCP connect, TLS handshake and first byte phases
+    """
+
+    pool_stats = None
+    timings = None
+    tls_stats = None
+    _connect_time = None
+    _sent = None
+
+    def _new_conn(self):
+        host = getattr(self, '_dns_host', None)
+        if self.timings is None or host is None:
+            return super(_CountingConnectionMixin, self)._new_conn()
+        start = _now()
+        try:
+            addresses = socket.getaddrinfo(host, self.port, 0,
+                                           socket.SOCK_STREAM)
+        except socket.gaierror:
+            # let urllib3 raise its own resolution error
+            return super(_CountingConnectionMixin, self)._new_conn()
+        self.timings.record('dns', _now() - start)
+        start = _now()
+        error = None
+        try:
+            # connect to the resolved addresses so the lookup is not repeated
+            for address in addresses:
+                self._dns_host = address[4][0]
+                try:
+                    sock = super(_CountingConnectionMixin, self)._new_conn()
+                    break
+                except Exception as e:
+                    error = e
+            else:
+                raise error
+        finally:
+            self._dns_host = host
+        self._connect_time = _now() - start
+        self.timings.record('connect', self._connect_time)
+        return sock
+
+    def connect(self):
+        self._connect_time = None
+        start = _now()
+        super(_CountingConnectionMixin, self).connect()
+        elapsed = _now() - start
+        if self.pool_stats is not None:
+            self.pool_stats.incr('created')
+        ssl_context = getattr(self, 'ssl_context', None)
+        if not hasattr(self.sock, 'session_reused'):
+            return
+        if self.timings is not None and self._connect_time is not None:
+            self.timings.record('tls', max(elapsed - self._connect_time, 0))
+        if self.tls_stats is not None:
+            self.tls_stats.incr('handshakes')
+            if self.sock.session_reused:
+                self.tls_stats.incr('resumed')
+        if isinstance(ssl_context, _ResumingSSLContext):
+            ssl_context.remember(self.sock)
+
+    def request(self, *args, **kwargs):
+        super(_CountingConnectionMixin, self).request(*args, **kwargs)
+        self._sent = _now()
+
+    def getresponse(self, *args, **kwargs):
+        response = super(_CountingConnectionMixin, self).getresponse(
+            *args, **kwargs)
+        if self.timings is not None and self._sent is not None:
+            self.timings.record('first_byte', _now() - self._sent)
+        self._sent = None
+        return response
+
+    def settle(self):
+        """ Reads the TLS 1.3 session tickets the server sends after the
+        handshake, otherwise the pool mistakes the idle connection for a
+        dropped one. Returns False if the connection is no longer usable.
+        """
+        sock = getattr(self, 'sock', None)
+        if sock is None or not hasattr(sock, 'session_reused') or \
+                sock.version() != 'TLSv1.3':
+            return sock is not None
+        # the tickets follow the handshake by about one round trip
+        wait = max(2 * (self._connect_time or 0.0), 0.05)
+        if not select.select([sock], [], [], wait)[0]:
+            return True
+        timeout = sock.gettimeout()
+        sock.setblocking(False)
+        try:
+            sock.recv(1)
+        except ssl.SSLWantReadError:
+            self.remember_tls_session()
+            return True
+        except (socket.error, ssl.SSLError):
+            pass
+        finally:
+            sock.settimeout(timeout)
+        return False
+
+    def remember_tls_session(self):
+        """ Keeps the TLS session (and ticket) for the next connection """
+        ssl_context = getattr(self, 'ssl_context', None)
+        sock = getattr(self, 'sock', None)
+        if sock is not None and isinstance(ssl_context, _ResumingSSLContext):
+            ssl_context.remember(sock)
+
+    def close(self):
+        was_open = getattr(self, 'sock', None) is not None
+        self.remember_tls_session()
+        super(_CountingConnectionMixin, self).close()
+        if was_open and self.pool_stats is not None:
+            self.pool_stats.incr('dropped')
+
+
+class _CountingHTTPConnection(_CountingConnectionMixin,
+                              urllib3_connection.HTTPConnection):
+    pass
+
+
+class _CountingHTTPSConnection(_CountingConnectionMixin,
+                               urllib3_connection.HTTPSConnection):
+    pass
+
+
+class _CountingPoolMixin(object):
+    """ Hands the pool statistics to its connections and counts reuse """
+
+    pool_stats = None
+    timings = None
+    tls_stats = None
+
+    def _new_conn(self):
+        conn = super(_CountingPoolMixin, self)._new_conn()
+        conn.pool_stats = self.pool_stats
+        conn.timings = self.timings
+        conn.tls_stats = self.tls_stats
+        return conn
+
+    def _get_conn(self, timeout=None):
+        conn = super(_CountingPoolMixin, self)._get_conn(timeout=timeout)
+        if getattr(conn, 'sock', None) is not None and \
+                self.pool_stats is not None:
+            self.pool_stats.incr('reused')
+        return conn
+
+    def _put_conn(self, conn):
+        # TLS 1.3 tickets arrive after the handshake, with the first response
+        if conn is not None and hasattr(conn, 'remember_tls_session'):
+            conn.remember_tls_session()
+        super(_CountingPoolMixin, self)._put_conn(conn)
+
+
+class _CountingHTTPConnectionPool(_CountingPoolMixin,
+                                  connectionpool.HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(_CountingPoolMixin,
+                                   connectionpool.HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class _CountingPoolManager(poolmanager.PoolManager):
+
+    def __init__(self, adapter, *args, **kwargs):
+        super(_CountingPoolManager, self).__init__(*args, **kwargs)
+        self.adapter = adapter
+        self.pool_classes_by_scheme = {
+            'http': _CountingHTTPConnectionPool,
+            'https': _CountingHTTPSConnectionPool,
+        }
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super(_CountingPoolManager, self)._new_pool(
+            scheme, host, port, request_context=request_context)
+        pool.pool_stats = self.adapter.pool_stats
+        pool.timings = self.adapter.timings
+        pool.tls_stats = self.adapter.tls_stats
+        return pool
+
+
+class PoolingAdapter(HTTPAdapter):
+    """ HTTPAdapter keeping statistics about its connection pool
+    created: new connections (TCP and TLS handshakes) established
+    reused: requests served on an already established connection
+    dropped: established connections closed (pool full, errors, server close)
+
+    With tls_resumption the TLS session of a host is offered again on the
+    next connection to it, to skip the full handshake.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.pool_stats = Stats('created', 'reused', 'dropped')
+        self.tls_stats = Stats('handshakes', 'resumed')
+        self.timings = Timings('dns', 'connect', 'tls', 'first_byte')
+        self.tls_resumption = kwargs.pop('tls_resumption', True) and \
+            hasattr(ssl, 'SSLSession')
+        super(PoolingAdapter, self).__init__(*args, **kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False,
+                         **pool_kwargs):
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        if self.tls_resumption:
+            pool_kwargs.setdefault('ssl_context',
+                                   _ResumingSSLContext.create())
+        self.poolmanager = _CountingPoolManager(self,
+                                                num_pools=connections,
+                                                maxsize=maxsize,
+                                                block=block,
+                                                **pool_kwargs)
+
+    def connect(self, session, url, connections=1, timeout=None):
+        """ Opens connections to the host of url and keeps them in the pool
+
+        :param session: requests session whose proxies and TLS settings apply
+        :param url: any url of the host
+        :param connections: number of connections opened in parallel, at
+            most the pool size
+        :param timeout: connect timeout in seconds
+        :return: list of the connections opened
+        """
+        request = requests.Request('GET', url).prepare()
+        settings = session.merge_environment_settings(url, {}, None, None,
+                                                      None)
+        verify, cert = settings['verify'], settings['cert']
+        if hasattr(self, 'get_connection_with_tls_context'):
+            pool = self.get_connection_with_tls_context(
+                request, verify, settings['proxies'], cert)
+        else:  # pragma: no cover - requests < 2.32.2
+            pool = self.get_connection(url, settings['proxies'])
+        self.cert_verify(pool, url, verify, cert)
+        # take the connections out of the pool first so that every thread
+        # gets a different one
+        conns = [pool._get_conn()
+                 for _ in range(min(connections, self._pool_maxsize))]
+        opened = []
+
+        def open_one(conn):
+            try:
+                if getattr(conn, 'sock', None) is None:
+                    if timeout is not None:
+                        conn.timeout = timeout
+                    conn.connect()
+                    if not conn.settle():
+                        raise IOError('connection closed by the server')
+                    opened.append(conn)
+            except Exception as e:
+                logger.warning('Could not open a connection to %s: %r',
+                               url, e)
+                conn.close()
+
+        threads = [threading.Thread(target=open_one, args=(conn,))
+                   for conn in conns]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for conn in conns:
+            pool._put_conn(conn)
+        return opened
+
+
+def is_idempotent(method, url):
+    """ Returns True if sending the request twice has the effect of
+        sending it once: reads, and updates or deletes of one _ref
+    """
+    method = method.upper()
+    if method in ('GET', 'HEAD', 'OPTIONS'):
+        return True
+    if method not in ('PUT', 'DELETE'):
+        return False
+    parts = urlsplit(url)
+    if '_function' in parts.query:
+        return False
+    # /wapi/v1.6/<object type>/<reference>
+    path = parts.path.split('/wapi/', 1)[-1]
+    return len(path.strip('/').split('/', 2)) == 3
+
+
+def is_connect_error(error):
+    """ Returns True if the request failed before reaching the server """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    # NewConnectionError (refused, unreachable, DNS) is a ConnectTimeoutError
+    return isinstance(reason, ConnectTimeoutError)
+
+
+def is_conflict(error):
+    """ Returns True if the HTTPError reports that the object conflicts with
+        an existing one, such as an IP address already in use
+    """
+    try:
+        code = error.response.json().get('code')
+    except (AttributeError, ValueError):
+        return False
+    return code == 'Client.Ibap.Data.Conflict'
+
+
+def is_not_found(error):
+    """ Returns True if the HTTPError reports that the object addressed does
+        not exist (anymore), such as a stale _ref
+    """
+    response = getattr(error, 'response', None)
+    if response is None:
+        return False
+    if response.status_code == 404:
+        return True
+    try:
+        code = response.json().get('code')
+    except (AttributeError, ValueError):
+        return False
+    return code == 'Client.Ibap.Data.NotFound'
+
+
+class Deadline(object):
+    """ Time budget shared by all requests made by one API call
+
+    Every request gets the remaining budget as its read timeout and at most
+    connect_timeout to establish the connection, so an operation made of
+    several requests never takes much longer than its timeout.
+    """
+
+    def __init__(self, timeout=None, connect_timeout=None):
+        """ Class initialization method
+        :param timeout: total time budget in seconds (None for unbounded)
+        :param connect_timeout: connect timeout of each request in seconds
+        """
+        self.expires = None if timeout is None else _now() + timeout
+        self.connect_timeout = connect_timeout
+
+    def remaining(self):
+        """ Returns the seconds left, or None if unbounded """
+        if self.expires is None:
+            return None
+        return self.expires - _now()
+
+    def allows(self, delay):
+        """ Returns True if waiting delay seconds leaves time to retry """
+        remaining = self.remaining()
+        return remaining is None or remaining > delay
+
+    def timeout(self):
+        """ Returns the (connect, read) timeout for the next request """
+        remaining = self.remaining()
+        if remaining is None:
+            return (self.connect_timeout, None)
+        if remaining <= 0:
+            raise InfobloxTimeoutException('Deadline exceeded')
+        connect = remaining
+        if self.connect_timeout is not None:
+            connect = min(self.connect_timeout, remaining)
+        return (connect, remaining)
+
+
+class RetryPolicy(object):
+    """ Retries idempotent WAPI calls failing with transient errors
+
+    GET requests and PUT/DELETE requests addressing an object by its _ref
+    are retried on connection errors, timeouts and 502/503/429 responses.
+    Any request is retried on 429 and on connect timeouts since the grid
+    never saw it. Waits use exponential backoff with full jitter unless the
+    grid sends Retry-After.
+
+    Retries are paid from a budget: every request adds budget_ratio tokens
+    (up to budget_max) and every retry takes one, so during an outage the
+    retries add at most budget_ratio extra load instead of multiplying it.
+    """
+
+    def __init__(self, max_retries=3, backoff_factor=0.5, max_backoff=30.0,
+                 status_forcelist=(429, 502, 503), budget_ratio=0.1,
+                 budget_max=10.0):
+        """ Class initialization method
+        :param max_retries: maximum number of retries of a single request
+        :param backoff_factor: base delay in seconds, doubled every retry
+        :param max_backoff: longest delay in seconds; a longer Retry-After
+            stops the retries
+        :param status_forcelist: response statuses worth retrying
+        :param budget_ratio: retry tokens earned by every request
+        :param budget_max: maximum (and initial) number of retry tokens
+        """
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.status_forcelist = frozenset(status_forcelist)
+        self.budget_ratio = budget_ratio
+        self.budget_max = budget_max
+        self.stats = Stats('retries', 'budget_exhausted')
+        self._tokens = float(budget_max)
+        self._lock = threading.Lock()
+
+    def is_idempotent(self, method, url):
+        return is_idempotent(method, url)
+
+    def is_retryable(self, method, url, attempt, error=None, status=None):
+        """ Returns True if a request may be retried and takes a retry
+            token from the budget
+        """
+        if attempt >= self.max_retries:
+            return False
+        if status is not None:
+            if status not in self.status_forcelist:
+                return False
+            safe = status == 429 or self.is_idempotent(method, url)
+        else:
+            safe = (isinstance(error, requests.exceptions.ConnectTimeout) or
+                    self.is_idempotent(method, url))
+        if not safe:
+            return False
+        with self._lock:
+            if self._tokens < 1:
+                self.stats.incr('budget_exhausted')
+                return False
+            self._tokens -= 1
+        return True
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.budget_max,
+                               self._tokens + self.budget_ratio)
+
+    def backoff(self, attempt, response=None):
+        """ Returns the delay before the next attempt in seconds, or None
+            if the grid asked to wait longer than max_backoff
+        """
+        retry_after = None
+        if response is not None:
+            retry_after = self.parse_retry_after(
+                response.headers.get('Retry-After'))
+        if retry_after is not None:
+            return retry_after if retry_after <= self.max_backoff else None
+        return random.uniform(0, min(self.max_backoff,
+                                     self.backoff_factor * (2 ** attempt)))
+
+    @staticmethod
+    def parse_retry_after(value):
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        date = email.utils.parsedate_tz(value)
+        if date is None:
+            return None
+        return max(0.0, email.utils.mktime_tz(date) - time.time())
+
+
+class AdaptiveLimiter(object):
+    """ Caps the number of WAPI requests in flight to one grid (AIMD)
+
+    The limit grows by `increase` every time a full window of requests
+    completes with a healthy latency and is multiplied by `decrease` when a
+    request fails with 429 or 5xx, errors out, or takes more than
+    latency_tolerance times the smoothed latency. Decreases happen at most
+    once per smoothed latency so a burst of failures counts as one signal.
+    Share one instance between clients talking to the same grid.
+    """
+
+    def __init__(self, initial_limit=8, min_limit=1, max_limit=256,
+                 increase=1.0, decrease=0.5, latency_tolerance=2.0,
+                 smoothing=0.1):
+        """ Class initialization method
+        :param initial_limit: requests allowed in flight at start
+        :param min_limit: lowest limit
+        :param max_limit: highest limit
+        :param increase: limit added per window of healthy requests
+        :param decrease: factor applied to the limit on overload
+        :param latency_tolerance: latency over smoothed latency ratio
+            considered a spike
+        :param smoothing: weight of a new sample in the smoothed latency
+        """
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.latency = None
+        self.stats = Stats('requests', 'decreases', 'wait_time')
+        self._in_flight = 0
+        self._waiting = 0
+        self._hold_until = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """ Waits for a free request slot
+        :param timeout: seconds to wait at most (None waits forever)
+        """
+        start = _now()
+        with self._cond:
+            self._waiting += 1
+            try:
+                while self._in_flight >= int(self.limit):
+                    remaining = None
+                    if timeout is not None:
+                        remaining = timeout - (_now() - start)
+                        if remaining <= 0:
+                            raise InfobloxTimeoutException(
+                                'Timed out waiting for a request slot')
+                    self._cond.wait(remaining)
+                self._in_flight += 1
+            finally:
+                self._waiting -= 1
+        self.stats.incr('requests')
+        self.stats.incr('wait_time', _now() - start)
+
+    def release(self, latency, overloaded=False):
+        """ Frees a request slot and adjusts the limit
+        :param latency: duration of the request in seconds
+        :param overloaded: the grid answered 429/5xx or the request failed,
+            None if the request was never sent
+        """
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+            if overloaded is None:
+                return
+            spike = (self.latency is not None and
+                     latency > self.latency * self.latency_tolerance)
+            if overloaded or spike:
+                now = _now()
+                if now >= self._hold_until:
+                    self.limit = max(self.min_limit,
+                                     self.limit * self.decrease)
+                    self._hold_until = now + (self.latency or latency)
+                    self.stats.incr('decreases')
+            else:
+                self.limit = min(self.max_limit,
+                                 self.limit + self.increase / self.limit)
+            if not overloaded:
+                if self.latency is None:
+                    self.latency = latency
+                else:
+                    self.latency += self.smoothing * (latency - self.latency)
+
+    @property
+    def metrics(self):
+        """ Current limit, requests in flight and waiting, and totals """
+        with self._cond:
+            metrics = {'limit': int(self.limit),
+                       'in_flight': self._in_flight,
+                       'queue_depth': self._waiting,
+                       'latency': self.latency}
+        metrics.update(self.stats.snapshot())
+        return metrics
+
+
+class CircuitBreaker(object):
+    """ Stops sending requests to an endpoint after consecutive failures
+
+    After failure_threshold consecutive failures the breaker opens and the
+    endpoint is skipped. Once reset_timeout seconds have passed a single
+    probe request is let through (half-open): success closes the breaker,
+    failure opens it again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        """ Class initialization method
+        :param failure_threshold: consecutive failures opening the breaker
+        :param reset_timeout: seconds before probing an open endpoint
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """ Returns True if a request may be sent through the breaker """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if _now() - self._opened_at >= self.reset_timeout:
+                # one probe per reset_timeout while open or half-open
+                self.state = self.HALF_OPEN
+                self._opened_at = _now()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if (self.state == self.HALF_OPEN or
+                    self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self._opened_at = _now()
+
+
+class Endpoint(object):
+    """ A grid member answering WAPI requests """
+
+    smoothing = 0.2
+
+    def __init__(self, host, breaker):
+        self.host = host
+        self.breaker = breaker
+        self.latency = None
+        self.stats = Stats('requests', 'failures')
+        self._lock = threading.Lock()
+
+    def observe(self, latency):
+        """ Updates the smoothed latency with a successful request """
+        with self._lock:
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += self.smoothing * (latency - self.latency)
+
+    def __repr__(self):
+        return 'Endpoint(%r, %s)' % (self.host, self.breaker.state)
+
+
+class Endpoints(object):
+    """ Set of grid members a request may be sent to
+
+    With the 'ordered' routing (grid master and candidates) the first
+    healthy endpoint is used; 'round-robin' and 'least-latency' spread
+    requests over read-only members. URLs are built for the primary host
+    and rewritten to the endpoint actually serving the request.
+    """
+
+    ROUTINGS = ('ordered', 'round-robin', 'least-latency')
+
+    def __init__(self, hosts, failure_threshold=5, reset_timeout=30.0,
+                 routing='ordered', primary=None):
+        if routing not in self.ROUTINGS:
+            raise InfobloxBadInputParameter(
+                'Unknown endpoint routing: %s' % routing)
+        self.endpoints = [
+            Endpoint(host, CircuitBreaker(failure_threshold, reset_timeout))
+            for host in hosts]
+        self.routing = routing
+        self.primary = primary or self.endpoints[0].host
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _ordered(self):
+        if self.routing == 'round-robin':
+            with self._lock:
+                start = self._next
+                self._next = (self._next + 1) % len(self.endpoints)
+            return self.endpoints[start:] + self.endpoints[:start]
+        if self.routing == 'least-latency':
+            # endpoints never measured come first so they get a sample
+            return sorted(self.endpoints,
+                          key=lambda e: (e.latency is not None, e.latency))
+        return self.endpoints
+
+    def available(self):
+        """ Yields the endpoints whose breaker lets a request through """
+        for endpoint in self._ordered():
+            if endpoint.breaker.allow():
+                yield endpoint
+
+    def serves(self, host):
+        """ Returns True if host is one of the endpoints, other than the
+            primary host URLs are built for
+        """
+        return host != self.primary and \
+            any(endpoint.host == host for endpoint in self.endpoints)
+
+    def url_for(self, endpoint, url):
+        parts = urlsplit(url)
+        if parts.netloc != self.primary or endpoint.host == self.primary:
+            return url
+        return urlunsplit(parts[:1] + (endpoint.host,) + parts[2:])
+
+    @property
+    def stats(self):
+        return [dict(endpoint.stats.snapshot(), host=endpoint.host,
+                     state=endpoint.breaker.state, latency=endpoint.latency)
+                for endpoint in self.endpoints]
+
+
 class Session(requests.Session):
+    """ requests.Session shared by all the threads using an Infoblox client
+
+    The connection pool, cookie jar and statistics are shared and guarded by
+    locks; the state of a single call (deadline, retry attempt) stays on the
+    stack of the calling thread. Only one thread logs in at a time, the
+    others wait for its session cookie.
+    """
+
+    auth_cookie = 'ibapauth'
+
+    def __init__(self):
+        super(Session, self).__init__()
+        self._lock = threading.RLock()
+        self._login_cond = threading.Condition()
+        self._logging_in = False
+        # When credentials are set the session logs in once with basic auth
+        # and then reuses the ibapauth cookie handed out by the grid.
+        self.credentials = None
+        self.cookie_file = None
+        self.retry_policy = None
+        self.limiter = None
+        self.endpoints = None
+        # GET requests go to these members when set
+        self.read_endpoints = None
+        self.proxy_search = None
+        # client-wide timeouts applied to requests made without one
+        self.default_timeout = None
+        self.connect_timeout = None
+        self.transfer_stats = Stats('responses', 'compressed', 'wire_bytes',
+                                    'decoded_bytes')
+        self.set_compression(True)
+
+    def use_cookie_file(self, filename):
+        """Persist the WAPI session cookie in a file.
+
+        Cookies already saved in the file are loaded, so another process
+        using the same file skips the login.
+
+        :param str filename: path of the cookie file
+        """
+        jar = LWPCookieJar(filename)
+        if os.path.exists(filename):
+            try:
+                jar.load(ignore_discard=True)
+            except (IOError, LoadError) as e:
+                logger.warning('Ignoring unreadable cookie file %s: %s',
+                               filename, e)
+        self.cookies = jar
+        self.cookie_file = filename
+
+    def _auth_cookies(self, url=None):
+        host = urlsplit(url).hostname if url else None
+        # cookielib stores dotless host names with a .local suffix
+        hosts = (host, '%s.local' % host)
+        with self._cookies_lock():
+            return [cookie for cookie in self.cookies
+                    if cookie.name == self.auth_cookie and
+                    (host is None or cookie.domain.lstrip('.') in hosts)]
+
+    def _auth_cookie_values(self, url):
+        return sorted(cookie.value for cookie in self._auth_cookies(url))
+
+    def _cookies_lock(self):
+        # the lock cookielib takes when a response sets cookies
+        return getattr(self.cookies, '_cookies_lock', self._lock)
+
+    def has_auth_cookie(self, url=None):
+        """ Returns True if a session cookie is held (for the url host) """
+        return bool(self._auth_cookies(url))
+
+    def clear_auth_cookie(self, url=None):
+        """ Forgets the session cookie (of the url host) """
+        with self._cookies_lock():
+            for cookie in self._auth_cookies(url):
+                self.cookies.clear(cookie.domain, cookie.path, cookie.name)
+
+    def save_cookies(self):
+        if self.cookie_file is None:
+            return
+        with self._cookies_lock():
+            # create the file readable by the owner only before writing
+            os.close(os.open(self.cookie_file, os.O_WRONLY | os.O_CREAT,
+                             0o600))
+            self.cookies.save(ignore_discard=True)
+
+    def _send(self, method, url, *args, **kwargs):
+        retry = self.retry_policy
+        if retry is None:
+            return self._route(method, url, *args, **kwargs)
+        retry.deposit()
+        deadline = kwargs.get('timeout')
+        if not isinstance(deadline, Deadline):
+            deadline = None
+        attempt = 0
+        while True:
+            try:
+                response = self._route(method, url, *args, **kwargs)
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout) as e:
+                if not retry.is_retryable(method, url, attempt, error=e):
+                    raise
+                delay = retry.backoff(attempt)
+                if deadline is not None and not deadline.allows(delay):
+                    raise
+                logger.warning('Retrying %s %s in %.2fs after %r',
+                               method, url, delay, e)
+            else:
+                status = response.status_code
+                if not retry.is_retryable(method, url, attempt,
+                                          status=status):
+                    return response
+                delay = retry.backoff(attempt, response)
+                if delay is None or (deadline is not None and
+                                     not deadline.allows(delay)):
+                    return response
+                logger.warning('Retrying %s %s in %.2fs after status %s',
+                               method, url, delay, status)
+                response.close()
+            retry.stats.incr('retries')
+            attempt += 1
+            time.sleep(delay)
+
+    def is_read(self, method, url, params=None):
+        """ Returns True for searches that any grid member can answer
+
+        Only searches of an object type (/wapi/v2.5/record:host) qualify:
+        reads of a _ref, such as CSV task polls, and file downloads from
+        http_direct_file_io stay on the grid master, which holds them.
+        The first page of a paged search is a search, the next pages are
+        not: their cursor lives on the member that served the first page,
+        and Util.iter_get sends them to that member.
+        """
+        if method.upper() != 'GET':
+            return False
+        if not _SEARCH_PATH_RE.match(urlsplit(url).path):
+            return False
+        for name in ('_function', '_page_id'):
+            if name in url or (params and name in params):
+                return False
+        return True
+
+    def _read_url(self, url):
+        if self.proxy_search:
+            url += ('&' if '?' in url else '?') + \
+                '_proxy_search=' + self.proxy_search
+        return url
+
+    def _route(self, method, url, *args, **kwargs):
+        if self.read_endpoints is not None and \
+                self.read_endpoints.serves(urlsplit(url).netloc):
+            # the next page of a search paged by this read member
+            return self._send_once(method, self._read_url(url), *args,
+                                   **kwargs)
+        if self.read_endpoints is not None and \
+                self.is_read(method, url, kwargs.get('params')):
+            read_url = self._read_url(url)
+            try:
+                response = self._try_endpoints(self.read_endpoints, method,
+                                               read_url, *args, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                logger.warning('No read endpoint reachable, '
+                               'using the grid master: %r', e)
+                response = None
+            if response is not None:
+                return response
+        if self.endpoints is None:
+            return self._send_once(method, url, *args, **kwargs)
+        response = self._try_endpoints(self.endpoints, method, url,
+                                       *args, **kwargs)
+        if response is None:
+            raise InfobloxUnavailableException(
+                'No grid endpoint available: %r' % self.endpoints.endpoints)
+        return response
+
+    def _try_endpoints(self, endpoints, method, url, *args, **kwargs):
+        """ Sends the request to the first endpoint able to take it,
+            returns None if every breaker is open
+        """
+        error = None
+        for endpoint in endpoints.available():
+            endpoint.stats.incr('requests')
+            start = _now()
+            try:
+                response = self._send_once(
+                    method, endpoints.url_for(endpoint, url),
+                    *args, **kwargs)
+            except requests.exceptions.RequestException as e:
+                endpoint.stats.incr('failures')
+                endpoint.breaker.record_failure()
+                if not isinstance(e, requests.exceptions.ConnectionError):
+                    raise
+                if not (is_connect_error(e) or is_idempotent(method, url)):
+                    raise
+                logger.warning('Grid endpoint %s failed, trying next: %r',
+                               endpoint.host, e)
+                error = e
+                continue
+            if response.status_code >= 500:
+                endpoint.stats.incr('failures')
+                endpoint.breaker.record_failure()
+            else:
+                endpoint.observe(_now() - start)
+                endpoint.breaker.record_success()
+            return response
+        if error is not None:
+            raise error
+        return None
+
+    def _send_once(self, method, url, *args, **kwargs):
+        if self.credentials is None or 'auth' in kwargs:
+            return self._http(method, url, *args, **kwargs)
+        cookies = self._auth_cookie_values(url)
+        if not cookies:
+            response = self._login(cookies, method, url, *args, **kwargs)
+        else:
+            response = self._http(method, url, *args, auth=None, **kwargs)
+            if response.status_code == 401:
+                # the session timed out on the grid, log in again
+                response = self._login(cookies, method, url, *args,
+                                       **kwargs)
+        if self.auth_cookie in response.cookies:
+            self.save_cookies()
+        return response
+
+    def _login(self, stale, method, url, *args, **kwargs):
+        """ Sends the request with the credentials to get a new session
+            cookie, unless another thread replaced the stale one meanwhile;
+            waits for the login of another thread within the deadline only
+        """
+        deadline = kwargs.get('timeout')
+        if not isinstance(deadline, Deadline):
+            deadline = None
+        with self._login_cond:
+            while self._logging_in:
+                remaining = None if deadline is None else deadline.remaining()
+                if remaining is not None and remaining <= 0:
+                    raise InfobloxTimeoutException(
+                        'Timed out waiting for the login of another request')
+                self._login_cond.wait(remaining)
+            cookies = self._auth_cookie_values(url)
+            refreshed = bool(cookies) and cookies != stale
+            if not refreshed:
+                self._logging_in = True
+                self.clear_auth_cookie(url)
+        if refreshed:
+            return self._http(method, url, *args, auth=None, **kwargs)
+        try:
+            return self._http(method, url, *args, auth=self.credentials,
+                              **kwargs)
+        finally:
+            with self._login_cond:
+                self._logging_in = False
+                self._login_cond.notify_all()
+
+    def _http(self, method, url, *args, **kwargs):
+        deadline = kwargs.get('timeout')
+        if not isinstance(deadline, Deadline):
+            deadline = None
+        limiter = self.limiter
+        if limiter is None:
+            if deadline is not None:
+                kwargs['timeout'] = deadline.timeout()
+            return self._transfer(method, url, *args, **kwargs)
+        limiter.acquire(None if deadline is None else deadline.remaining())
+        start = _now()
+        overloaded = None
+        try:
+            if deadline is not None:
+                kwargs['timeout'] = deadline.timeout()
+            try:
+                response = self._transfer(method, url, *args, **kwargs)
+            except requests.exceptions.RequestException:
+                overloaded = True
+                raise
+            overloaded = (response.status_code == 429 or
+                          response.status_code >= 500)
+            return response
+        finally:
+            limiter.release(_now() - start, overloaded)
+
+    def set_compression(self, enabled):
+        """ Asks the grid for gzip/deflate compressed responses or not """
+        self.headers['Accept-Encoding'] = \
+            'gzip, deflate' if enabled else 'identity'
+
+    @staticmethod
+    def uncompressed(headers=None):
+        """ Returns headers asking the grid for an uncompressed response,
+            for one request only
+        """
+        headers = dict(headers or {})
+        headers['Accept-Encoding'] = 'identity'
+        return headers
+
+    def _transfer(self, method, url, *args, **kwargs):
+        rewind = getattr(kwargs.get('data'), 'rewind', None)
+        if rewind is not None:
+            # a streamed body read by a previous attempt, such as a
+            # request sent again after logging in
+            rewind()
+        try:
+            response = super(Session, self).request(method, url, *args,
+                                                    **kwargs)
+        except requests.exceptions.ContentDecodingError as e:
+            encoding = (kwargs.get('headers') or {}).get(
+                'Accept-Encoding', self.headers.get('Accept-Encoding'))
+            if encoding == 'identity':
+                raise
+            if not is_idempotent(method, url):
+                # the grid has carried the request out, sending it again
+                # could create a second object
+                raise InfobloxGeneralException(
+                    'Undecodable compressed response to %s %s, the request '
+                    'was not resent: %r' % (method, url, e))
+            logger.warning('Undecodable compressed response from %s, '
+                           'resending it uncompressed: %r', url, e)
+            if rewind is not None:
+                rewind()
+            kwargs['headers'] = self.uncompressed(kwargs.get('headers'))
+            response = super(Session, self).request(method, url, *args,
+                                                    **kwargs)
+        if not kwargs.get('stream'):
+            self._account(response)
+        return response
+
+    def iter_content(self, response, chunk_size):
+        """ Yields the body of a streamed response in decoded chunks and
+            records its bytes once it is read
+        """
+        decoded = 0
+        try:
+            for chunk in response.iter_content(chunk_size):
+                decoded += len(chunk)
+                yield chunk
+        except requests.exceptions.ContentDecodingError as e:
+            logger.warning('Undecodable compressed response from %s: %r',
+                           response.url, e)
+            raise
+        self._account(response, decoded)
+
+    def _account(self, response, decoded=None):
+        """ Records the bytes received on the wire and once decoded """
+        try:
+            wire = response.raw.tell()
+        except (AttributeError, ValueError):
+            return
+        if decoded is None:
+            decoded = len(response.content)
+        response.wire_bytes = wire
+        response.decoded_bytes = decoded
+        self.transfer_stats.incr('responses')
+        if response.headers.get('Content-Encoding', 'identity') != 'identity':
+            self.transfer_stats.incr('compressed')
+        self.transfer_stats.incr('wire_bytes', wire)
+        self.transfer_stats.incr('decoded_bytes', decoded)
 
     def request(self, method, url, *args, **kwargs):
         """Do a request and return the response.
@@ -63,11 +1242,18 @@ class Session(requests.Session):
         :return: response data
         :rtype: object
         """
+        if kwargs.get('timeout') is None and (
+                self.default_timeout is not None or
+                self.connect_timeout is not None):
+            kwargs['timeout'] = Deadline(self.default_timeout,
+                                         self.connect_timeout)
         try:
-            response = super(Session, self).request(method, url, *args, **kwargs)
+            response = self._send(method, url, *args, **kwargs)
             # inject things into the locals namespace for potential logging
-            content = response.content
             status = response.status_code
+            if not kwargs.get('stream') or status >= 400:
+                # streamed bodies are left for the caller to read
+                content = response.content
             response.raise_for_status()
         except Exception as e:
             logger.exception(e)
@@ -80,6 +1266,945 @@ class Session(requests.Session):
         return response
 
 
+class RefCache(object):
+    """ Bounded cache of object _refs by object type, name and view
+
+    Methods looking up an object only to get its _ref, such as the delete_*
+    methods, use a cached _ref and skip the search. The cache is filled
+    with the _ref of every object the client reads, creates or updates, and
+    forgets the _refs the client deletes or renames and those the grid
+    answers 404 for. Entries expire after ttl seconds, and the least
+    recently used are evicted beyond maxsize, so changes made by other
+    clients are seen within ttl seconds or at the first failed use.
+    """
+
+    def __init__(self, maxsize=10000, ttl=300.0):
+        """ Class initialization method
+        :param maxsize: maximum number of _refs kept
+        :param ttl: seconds a _ref is used before looking it up again
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = Stats('hits', 'misses', 'evictions', 'invalidations')
+        self._lock = threading.Lock()
+        self._refs = collections.OrderedDict()
+        self._keys = {}
+
+    def __len__(self):
+        return len(self._refs)
+
+    @staticmethod
+    def key(ref):
+        """ Returns the (object type, name, view) of a _ref such as
+            record:host/ZG5z...:host.domain.com/default, view being None
+            for objects without one, or None if ref is no _ref
+        """
+        obj, _, rest = ref.partition('/')
+        _, found, rest = rest.partition(':')
+        if not obj or not found:
+            return None
+        name, found, view = rest.rpartition('/')
+        if not found:
+            return obj, view, None
+        return obj, name, view
+
+    def get(self, obj, name, view=None):
+        """ Returns the cached _ref of an object, or None """
+        key = (obj, name, view)
+        with self._lock:
+            entry = self._refs.pop(key, None)
+            if entry is not None and entry[1] > _now():
+                # most recently used last
+                self._refs[key] = entry
+                self.stats.incr('hits')
+                return entry[0]
+            if entry is not None:
+                self._unlink(entry[0], key)
+        self.stats.incr('misses')
+        return None
+
+    def put(self, ref, key=None):
+        """ Caches a _ref under the key parsed from it, or under key
+        :param ref: _ref of an object
+        :param key: (object type, name, view) searched for (optional)
+        """
+        if key is None:
+            key = self.key(ref)
+            if key is None:
+                return
+        with self._lock:
+            entry = self._refs.pop(key, None)
+            if entry is not None:
+                self._unlink(entry[0], key)
+            self._refs[key] = (ref, _now() + self.ttl)
+            self._keys.setdefault(ref, set()).add(key)
+            while len(self._refs) > self.maxsize:
+                old_key, (old_ref, _) = self._refs.popitem(last=False)
+                self._unlink(old_ref, old_key)
+                self.stats.incr('evictions')
+
+    def update(self, r_json):
+        """ Caches the _ref of every object of a WAPI response """
+        if isinstance(r_json, dict):
+            r_json = [r_json]
+        elif isinstance(r_json, (str, type(u''))):
+            r_json = [{'_ref': r_json}]
+        elif not isinstance(r_json, list):
+            return
+        for obj in r_json:
+            if isinstance(obj, dict) and '_ref' in obj:
+                self.put(obj['_ref'])
+
+    def discard(self, ref):
+        """ Forgets a _ref deleted, renamed or unknown to the grid """
+        with self._lock:
+            keys = self._keys.pop(ref, ())
+            for key in keys:
+                self._refs.pop(key, None)
+        if keys:
+            self.stats.incr('invalidations')
+
+    def clear(self):
+        with self._lock:
+            self._refs.clear()
+            self._keys.clear()
+
+    def _unlink(self, ref, key):
+        keys = self._keys.get(ref)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys[ref]
+
+
+class NegativeCache(object):
+    """ Short lived cache of the lookups that found nothing
+
+    Lookups of objects that mostly do not exist, such as get_host with
+    notFoundFail=False, answer a search found empty less than ttl seconds
+    ago without a request. Entries are scoped by object type and view:
+    objects the client creates or renames invalidate the scope of their
+    type and view, and the lookups across all views of that type.
+    Objects created by other clients are seen once the entry expires.
+    """
+
+    def __init__(self, maxsize=10000, ttl=30.0):
+        """ Class initialization method
+        :param maxsize: maximum number of empty searches kept
+        :param ttl: seconds an empty search is answered from the cache
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = Stats('hits', 'misses', 'evictions', 'invalidations')
+        self._lock = threading.Lock()
+        self._misses = collections.OrderedDict()
+        # bumped to invalidate every entry of an (object type, view) scope
+        self._generations = {}
+
+    def __len__(self):
+        return len(self._misses)
+
+    @staticmethod
+    def _key(obj, view, query_params):
+        query = tuple(sorted((k, str(v)) for k, v in query_params.items()))
+        return obj, view, query
+
+    def missing(self, obj, view, query_params):
+        """ Returns True if the search was found empty within ttl seconds
+        :param obj: object type searched
+        :param view: view searched, None for searches across views
+        :param query_params: search dictionary
+        """
+        key = self._key(obj, view, query_params)
+        with self._lock:
+            entry = self._misses.pop(key, None)
+            if (entry is not None and entry[0] > _now() and
+                    entry[1] == self._generations.get((obj, view), 0)):
+                # most recently used last
+                self._misses[key] = entry
+                self.stats.incr('hits')
+                return True
+        self.stats.incr('misses')
+        return False
+
+    def put(self, obj, view, query_params):
+        """ Caches a search found empty """
+        key = self._key(obj, view, query_params)
+        with self._lock:
+            generation = self._generations.setdefault((obj, view), 0)
+            self._misses.pop(key, None)
+            self._misses[key] = (_now() + self.ttl, generation)
+            while len(self._misses) > self.maxsize:
+                self._misses.popitem(last=False)
+                self.stats.incr('evictions')
+
+    def invalidate(self, obj, view=None):
+        """ Forgets the empty searches an object created or renamed may
+            now match
+        :param obj: object type of the object
+        :param view: view of the object, None for every view
+        """
+        with self._lock:
+            scopes = [scope for scope in self._generations
+                      if scope[0] == obj and
+                      (view is None or scope[1] in (view, None))]
+            for scope in scopes:
+                self._generations[scope] += 1
+        if scopes:
+            self.stats.incr('invalidations')
+
+    def clear(self):
+        with self._lock:
+            self._misses.clear()
+
+
+class NetworkIndex(object):
+    """ Longest prefix match index of the networks of a network view
+
+    Answers which network an IPv4 address belongs to locally, with one
+    dict lookup per prefix length in use, instead of an ipv4address search
+    per address. The client loads it by paging through the networks of its
+    network view, keeps it current with the networks it creates and
+    deletes, and reloads it once refresh_interval seconds have passed.
+    """
+
+    def __init__(self, networks=(), refresh_interval=300.0):
+        """ Class initialization method
+        :param networks: networks in CIDR format to index (optional)
+        :param refresh_interval: seconds before the client reloads the
+            index, None to only reload it on refresh_network_index
+        """
+        self.refresh_interval = refresh_interval
+        self.loaded = None
+        self._lock = threading.Lock()
+        # prefix length -> network address -> CIDR, and the prefix lengths
+        # longest first, swapped together
+        self._index = ({}, [])
+        if networks:
+            self.load(networks)
+
+    def __len__(self):
+        return sum(len(networks) for networks in self._index[0].values())
+
+    @staticmethod
+    def address(ip_v4):
+        """ Returns an IPv4 address as an integer """
+        try:
+            return struct.unpack('!I', socket.inet_pton(socket.AF_INET,
+                                                        ip_v4))[0]
+        except (socket.error, TypeError, ValueError):
+            raise InfobloxBadInputParameter('Invalid IPv4 address: %r' %
+                                            (ip_v4,))
+
+    @classmethod
+    def prefix(cls, network):
+        """ Returns the (prefix length, network address) of a CIDR """
+        ip_v4, found, length = network.partition('/')
+        if not found or not length.isdigit() or int(length) > 32:
+            raise InfobloxBadInputParameter('Invalid IPv4 network: %r' %
+                                            (network,))
+        length = int(length)
+        return length, cls.address(ip_v4) & cls._mask(length)
+
+    @staticmethod
+    def _mask(length):
+        return (0xffffffff << (32 - length)) & 0xffffffff
+
+    def load(self, networks):
+        """ Replaces the indexed networks
+        :param networks: networks in CIDR format
+        """
+        prefixes = {}
+        for network in networks:
+            length, key = self.prefix(network)
+            prefixes.setdefault(length, {})[key] = network
+        with self._lock:
+            # lookups in progress keep using the previous index
+            self._index = (prefixes, sorted(prefixes, reverse=True))
+            self.loaded = _now()
+
+    def add(self, network):
+        """ Indexes a network in CIDR format """
+        length, key = self.prefix(network)
+        with self._lock:
+            prefixes, lengths = self._index
+            prefixes.setdefault(length, {})[key] = network
+            if length not in lengths:
+                self._index = (prefixes, sorted(prefixes, reverse=True))
+
+    def discard(self, network):
+        """ Removes a network in CIDR format from the index """
+        length, key = self.prefix(network)
+        with self._lock:
+            self._index[0].get(length, {}).pop(key, None)
+
+    def stale(self):
+        """ Returns True if the index was never loaded or is due a reload """
+        if self.loaded is None:
+            return True
+        return (self.refresh_interval is not None and
+                _now() - self.loaded >= self.refresh_interval)
+
+    def lookup(self, ip_v4):
+        """ Returns the longest network in CIDR format containing an IPv4
+            address, or None
+        """
+        address = self.address(ip_v4)
+        prefixes, lengths = self._index
+        for length in lengths:
+            network = prefixes[length].get(address & self._mask(length))
+            if network is not None:
+                return network
+        return None
+
+
+class BatchResult(object):
+    """ Result of an operation queued in a Batch, set when it is sent """
+
+    def __init__(self, transform=None):
+        self._transform = transform
+        self._done = False
+        self._value = None
+        self._exception = None
+
+    def done(self):
+        return self._done
+
+    def result(self):
+        """ Returns the result of the operation or raises its error """
+        if not self._done:
+            raise InfobloxException('Batch not sent yet')
+        if self._exception is not None:
+            raise self._exception
+        return self._value
+
+    def exception(self):
+        return self._exception
+
+    def _set_result(self, value):
+        if self._transform is not None and value is not None:
+            value = self._transform(value)
+        self._value = value
+        self._done = True
+
+    def _set_exception(self, exception):
+        self._exception = exception
+        self._done = True
+
+
+class Batch(object):
+    """ Queue of WAPI operations sent together as multi-requests
+
+        with iba_api.batch() as batch:
+            addresses = [batch.create_host_record(ip, fqdn)
+                         for ip, fqdn in hosts]
+        print([address.result() for address in addresses])
+
+    Every size operations are sent in one POST to the request object. The
+    grid runs them in order as a single transaction: if one fails none of
+    them is applied and the results of all of them raise the error.
+    """
+
+    def __init__(self, iba_api, size=100, confirm=True, timeout=None):
+        """
+        :param iba_api: Infoblox client sending the operations
+        :param size: maximum number of operations per request
+        :param confirm: False to print the requests without sending them
+        :param timeout: request timeout in seconds or Deadline (optional)
+        """
+        self.iba_api = iba_api
+        self.size = size
+        self.confirm = confirm
+        self.timeout = timeout
+        self.stats = Stats('operations', 'requests', 'failed')
+        self._queue = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        else:
+            self.discard()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def add(self, method, obj, data=None, args=None, transform=None):
+        """ Queues an operation and returns its BatchResult, sending the
+            queue when it holds size operations
+        :param method: GET, POST, PUT or DELETE
+        :param obj: object type or _ref the operation applies to
+        :param data: payload, or search fields of a GET (optional)
+        :param args: query arguments such as _return_fields (optional)
+        :param transform: function applied to the operation result (optional)
+        """
+        operation = {'method': method, 'object': obj}
+        if data is not None:
+            operation['data'] = data
+        if args:
+            operation['args'] = args
+        result = BatchResult(transform)
+        with self._lock:
+            self._queue.append((operation, result))
+            full = len(self._queue) >= self.size
+        if full:
+            self.flush()
+        return result
+
+    def flush(self):
+        """ Sends the queued operations, size at a time, and sets their
+            results; raises the first error once every request is sent
+        """
+        error = None
+        while True:
+            with self._lock:
+                chunk = self._queue[:self.size]
+                del self._queue[:self.size]
+            if not chunk:
+                break
+            try:
+                self._send(chunk)
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+
+    def discard(self):
+        """ Drops the queued operations without sending them """
+        with self._lock:
+            chunk, self._queue = self._queue, []
+        for _, result in chunk:
+            result._set_exception(InfobloxException('Batch discarded'))
+
+    def _send(self, chunk):
+        self.stats.incr('requests')
+        self.stats.incr('operations', len(chunk))
+        try:
+            r_json = self.iba_api.util.multi_request(
+                [operation for operation, _ in chunk],
+                confirm=self.confirm, timeout=self.timeout)
+        except Exception as e:
+            self.stats.incr('failed')
+            for _, result in chunk:
+                result._set_exception(e)
+            raise
+        if r_json is None:
+            r_json = [None] * len(chunk)
+        for (_, result), value in zip(chunk, r_json):
+            result._set_result(value)
+
+    @staticmethod
+    def _return_fields(fields):
+        if fields is None:
+            return None
+        if type(fields) == str:
+            return {'_return_fields': fields}
+        return {'_return_fields': ','.join(fields)}
+
+    def get(self, uri, query_params=None, fields=None):
+        """ Queues a search, its result is the list of objects found
+        :param uri: The URI component (e.g. -- lease, record:a)
+        :param query_params: Key/Value search field dictonary.
+        :param fields: String or list of fields to return.
+        """
+        return self.add('GET', uri, data=dict(query_params or {}),
+                        args=self._return_fields(fields))
+
+    def post(self, uri, payload, fields=None):
+        """ Queues the creation of an object, its result is the _ref or the
+            fields asked for
+        """
+        return self.add('POST', uri, data=payload,
+                        args=self._return_fields(fields))
+
+    def put(self, record, payload):
+        """ Queues the update of a record, its result is the _ref """
+        return self.add('PUT', record['_ref'], data=payload)
+
+    def delete_by_ref(self, ref):
+        """ Queues the deletion of an object, its result is the _ref """
+        self.iba_api._forget_ref(ref)
+        return self.add('DELETE', ref)
+
+    def create_host_record(self, address, fqdn, payload=None):
+        """ Queues Infoblox.create_host_record, its result is the IP v4
+            address assigned to the host
+        """
+        if payload is None:
+            payload = self.iba_api._host_record_payload(address, fqdn)
+        return self.add('POST', 'record:host', data=payload,
+                        args=self._return_fields(['ipv4addrs']),
+                        transform=lambda r: r['ipv4addrs'][0]['ipv4addr'])
+
+
+class AddressPool(object):
+    """ Addresses of one network fetched ahead and handed out locally
+
+        pool = iba_api.address_pool('10.0.0.0/24')
+        address = pool.allocate()
+
+    A block of block_size free addresses is fetched with one
+    next_available_ip call and refilled in a background thread once
+    low_water or fewer are left. The grid does not know about the addresses
+    the pool holds or handed out in the last hold seconds yet, so they are
+    excluded from the next fetch.
+    """
+
+    # fetches an allocate call makes before giving up
+    max_refills = 3
+
+    def __init__(self, iba_api, network, block_size=64, low_water=16,
+                 hold=300.0, background=True):
+        """
+        :param iba_api: Infoblox client fetching the addresses
+        :param network: network in CIDR format
+        :param block_size: number of addresses fetched at once
+        :param low_water: number of addresses left that triggers a refill
+        :param hold: seconds a handed out address is excluded from fetches
+        :param background: refill in a background thread rather than in
+            the allocate call that crosses low_water
+        """
+        self.iba_api = iba_api
+        self.network = network
+        self.block_size = block_size
+        self.low_water = low_water
+        self.hold = hold
+        self.background = background
+        self.stats = Stats('fetches', 'allocated', 'released', 'conflicts')
+        self._free = collections.deque()
+        self._handed_out = collections.OrderedDict()
+        self._cond = threading.Condition()
+        self._refilling = False
+
+    def __len__(self):
+        return len(self._free)
+
+    def allocate(self, timeout=None):
+        """ Returns a free address of the network, fetching a block from
+            the grid if none is left
+        :param timeout: time budget in seconds (optional)
+        """
+        deadline = self.iba_api._deadline(timeout)
+        refills = 0
+        while True:
+            refill = False
+            with self._cond:
+                while not self._free and self._refilling:
+                    remaining = deadline.remaining()
+                    if remaining is not None and remaining <= 0:
+                        raise InfobloxTimeoutException('Deadline exceeded')
+                    self._cond.wait(remaining)
+                if self._free:
+                    address = self._free.popleft()
+                    self._handed_out[address] = _now() + self.hold
+                    if len(self._free) <= self.low_water and \
+                            not self._refilling:
+                        self._refilling = refill = True
+                else:
+                    address = None
+                    self._refilling = True
+            if address is None:
+                refills += 1
+                if not self._refill(deadline) or refills >= self.max_refills:
+                    raise InfobloxNoIPavailableException(
+                        "No new free address fetched in %s" % self.network)
+                continue
+            self.stats.incr('allocated')
+            if refill and self.background:
+                thread = threading.Thread(target=self._background_refill)
+                thread.daemon = True
+                thread.start()
+            elif refill:
+                self._background_refill(deadline)
+            return address
+
+    def release(self, address):
+        """ Gives back an address that was not used """
+        with self._cond:
+            self._handed_out.pop(address, None)
+            self._free.appendleft(address)
+            self._cond.notify()
+        self.stats.incr('released')
+
+    def confirm(self, address):
+        """ Forgets an address now in use on the grid """
+        with self._cond:
+            self._handed_out.pop(address, None)
+
+    def conflict(self, address):
+        """ Drops an address found in use on the grid """
+        self.confirm(address)
+        self.stats.incr('conflicts')
+
+    def create_host_record(self, fqdn, attempts=3, timeout=None):
+        """ Creates a host record with an address of the pool, trying the
+            next one when the address turns out to be in use already
+        Returns the IP v4 address of the host
+        :param fqdn: hostname in FQDN
+        :param attempts: number of addresses tried
+        :param timeout: time budget in seconds for the whole call (optional)
+        """
+        deadline = self.iba_api._deadline(timeout)
+        for _ in range(attempts):
+            address = self.allocate(deadline)
+            try:
+                self.iba_api.create_host_record(address, fqdn)
+            except requests.exceptions.HTTPError as e:
+                if not is_conflict(e):
+                    self.release(address)
+                    raise
+                self.conflict(address)
+                continue
+            except Exception:
+                self.release(address)
+                raise
+            self.confirm(address)
+            return address
+        raise InfobloxNoIPavailableException(
+            "No free address found in %d attempts in %s" % (attempts,
+                                                            self.network))
+
+    def _refill(self, deadline):
+        """ Fetches addresses the pool does not know yet
+        Returns the number of addresses added to the pool
+        """
+        with self._cond:
+            now = _now()
+            while self._handed_out:
+                address, expires = next(iter(self._handed_out.items()))
+                if expires > now:
+                    break
+                del self._handed_out[address]
+            exclude = list(self._free) + list(self._handed_out)
+        try:
+            try:
+                addresses = self.iba_api.get_next_available_ips(
+                    self.network, self.block_size, exclude, timeout=deadline)
+            except InfobloxNoIPavailableException:
+                if self.block_size == 1:
+                    raise
+                # fewer than block_size left, take them one at a time
+                addresses = self.iba_api.get_next_available_ips(
+                    self.network, 1, exclude, timeout=deadline)
+        except Exception:
+            with self._cond:
+                self._refilling = False
+                self._cond.notify_all()
+            raise
+        self.stats.incr('fetches')
+        with self._cond:
+            known = set(self._free)
+            known.update(self._handed_out)
+            added = [a for a in addresses if a not in known]
+            self._free.extend(added)
+            self._refilling = False
+            self._cond.notify_all()
+        return len(added)
+
+    def _background_refill(self, deadline=None):
+        # the address is handed out already, a later allocate reports errors
+        if deadline is None:
+            deadline = Deadline(self.iba_api.timeout,
+                                self.iba_api.connect_timeout)
+        try:
+            self._refill(deadline)
+        except Exception as e:
+            logger.warning('Refilling the address pool of %s failed: %s',
+                           self.network, e)
+
+
+HostRecordResult = collections.namedtuple(
+    'HostRecordResult', ['fqdn', 'address', 'status', 'ipv4addr', 'error'])
+
+
+class HostRecordsCreation(object):
+    """ Results of Infoblox.create_host_records, one HostRecordResult per
+    host whose status is 'success', 'conflict' (the name or address is in
+    use) or 'error'
+
+    The hosts are read chunk by chunk as the results are consumed, at most
+    workers chunks being in memory, so a large file can be fed lazily.
+    """
+
+    SUCCESS = 'success'
+    CONFLICT = 'conflict'
+    ERROR = 'error'
+
+    def __init__(self, iba_api, hosts, chunk_size=100, workers=1,
+                 multi_request=True, timeout=None):
+        self.iba_api = iba_api
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.multi_request = multi_request
+        self.timeout = timeout
+        self.stats = Stats(self.SUCCESS, self.CONFLICT, self.ERROR,
+                           'requests')
+        self.started = None
+        self.finished = None
+        self._results = self._run(iter(hosts))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._results)
+
+    next = __next__
+
+    @property
+    def elapsed(self):
+        """ Seconds spent since the first chunk was read """
+        if self.started is None:
+            return 0.0
+        return (self.finished or _now()) - self.started
+
+    @property
+    def throughput(self):
+        """ Hosts processed per second """
+        done = self.stats[self.SUCCESS] + self.stats[self.CONFLICT] + \
+            self.stats[self.ERROR]
+        elapsed = self.elapsed
+        return done / elapsed if elapsed > 0 else 0.0
+
+    def _run(self, hosts):
+        self.started = _now()
+        pending = collections.deque()
+        while True:
+            chunk = []
+            for address, fqdn in itertools.islice(hosts, self.chunk_size):
+                try:
+                    payload = self.iba_api._host_record_payload(address,
+                                                                fqdn)
+                except InfobloxBadInputParameter as e:
+                    payload = e
+                chunk.append((address, fqdn, payload))
+            if chunk:
+                results = []
+                thread = threading.Thread(target=self._create,
+                                          args=(chunk, results))
+                thread.daemon = True
+                thread.start()
+                pending.append((thread, results))
+            if pending and (not chunk or len(pending) >= self.workers):
+                thread, results = pending.popleft()
+                thread.join()
+                for result in results:
+                    self.stats.incr(result.status)
+                    yield result
+            if not chunk and not pending:
+                break
+        self.finished = _now()
+        logger.info('Created %d host records in %.1fs (%.1f/s), '
+                    '%d conflicts, %d errors', self.stats[self.SUCCESS],
+                    self.elapsed, self.throughput, self.stats[self.CONFLICT],
+                    self.stats[self.ERROR])
+
+    def _create(self, chunk, results):
+        # runs in its own thread: every host of chunk must get a result
+        try:
+            self._create_results(chunk, results)
+        except Exception as e:
+            logger.warning('Creating %d host records failed: %s',
+                           len(chunk) - len(results), e)
+            for address, fqdn, payload in chunk[len(results):]:
+                error = payload if isinstance(payload, Exception) else e
+                results.append(HostRecordResult(fqdn, address, self.ERROR,
+                                                None, error))
+
+    def _create_results(self, chunk, results):
+        valid = [item for item in chunk
+                 if not isinstance(item[2], Exception)]
+        created = None
+        if self.multi_request and len(valid) > 1:
+            created = self._create_chunk(valid)
+        if created is not None:
+            created = iter(created)
+        for address, fqdn, payload in chunk:
+            if isinstance(payload, Exception):
+                result = HostRecordResult(fqdn, address, self.ERROR, None,
+                                          payload)
+            elif created is not None:
+                result = HostRecordResult(fqdn, address, self.SUCCESS,
+                                          next(created), None)
+            else:
+                result = self._create_one(address, fqdn, payload)
+            results.append(result)
+
+    def _create_chunk(self, chunk):
+        """ Returns the addresses of the hosts created by one multi-request,
+            in the order of chunk, or None if the grid rejected it; raises
+            when the request may have been applied (timeout, connection
+            failure, unexpected reply) as creating the hosts one by one
+            would then report them as conflicts
+        """
+        operations = [{'method': 'POST', 'object': 'record:host',
+                       'data': payload,
+                       'args': {'_return_fields': 'ipv4addrs'}}
+                      for _, _, payload in chunk]
+        self.stats.incr('requests')
+        try:
+            r_json = self.iba_api.util.multi_request(operations,
+                                                     timeout=self.timeout)
+        except (InfobloxTimeoutException, InfobloxUnavailableException,
+                requests.exceptions.Timeout,
+                requests.exceptions.ConnectionError):
+            raise
+        except (InfobloxException, requests.exceptions.RequestException) \
+                as e:
+            logger.info('Creating %d host records in one request failed, '
+                        'creating them one by one: %s', len(chunk), e)
+            return None
+        if not isinstance(r_json, list) or len(r_json) != len(chunk):
+            raise InfobloxGeneralException(
+                'Expected %d host records from the multi-request, got: %r' %
+                (len(chunk), r_json))
+        return [host['ipv4addrs'][0]['ipv4addr'] for host in r_json]
+
+    def _create_one(self, address, fqdn, payload):
+        self.stats.incr('requests')
+        try:
+            r_json = self.iba_api.util.post('record:host', payload=payload,
+                                            fields=['ipv4addrs'],
+                                            timeout=self.timeout)
+            return HostRecordResult(fqdn, address, self.SUCCESS,
+                                    r_json['ipv4addrs'][0]['ipv4addr'], None)
+        except requests.exceptions.HTTPError as e:
+            status = self.CONFLICT if is_conflict(e) else self.ERROR
+            return HostRecordResult(fqdn, address, status, None, e)
+        except Exception as e:
+            return HostRecordResult(fqdn, address, self.ERROR, None, e)
+
+
+CSV_RECORD_TYPES = {
+    # type: (CSV import object, required fields, default view field)
+    'host': ('hostrecord', ('fqdn',), 'view'),
+    'a': ('arecord', ('fqdn', 'address'), 'view'),
+    'cname': ('cnamerecord', ('fqdn', 'canonical_name'), 'view'),
+    'fixedaddress': ('fixedaddress', ('ip_address',), 'network_view'),
+}
+
+
+def csv_import_rows(records, dns_view='default', network_view='default'):
+    """ Yields the CSV import rows of record dicts, each with a type key
+        (host, a, cname or fixedaddress) and CSV import field names as
+        other keys, a header row preceding every change of type or fields
+    :param records: iterable of dicts
+    :param dns_view: view of the DNS records not giving one
+    :param network_view: network view of the fixed addresses not giving one
+    """
+    header = None
+    for record in records:
+        record = dict(record)
+        try:
+            obj, required, view_field = CSV_RECORD_TYPES[record.pop('type')]
+        except KeyError:
+            raise InfobloxBadInputParameter(
+                'Expected a type among %s in %r' %
+                (', '.join(sorted(CSV_RECORD_TYPES)), record))
+        for field in required:
+            if not record.get(field):
+                raise InfobloxBadInputParameter(
+                    'Missing %s in %s record %r' % (field, obj, record))
+        record.setdefault(view_field, dns_view if view_field == 'view'
+                          else network_view)
+        fields = list(required) + sorted(f for f in record
+                                         if f not in required)
+        if header != (obj, fields):
+            header = (obj, fields)
+            yield ['header-' + obj] + [
+                f + '*' if f in required else f for f in fields]
+        yield [obj] + [_csv_value(record[f]) for f in fields]
+
+
+def csv_records(lines):
+    """ Yields the data rows of Infoblox CSV lines as dicts of their fields
+        by header name, the object type under type and the values beyond
+        the header fields, such as the reason of an import error, joined
+        under error
+    :param lines: iterable of CSV lines
+    """
+    fields = []
+    for row in csv.reader(lines):
+        if not row:
+            continue
+        if row[0].lower().startswith('header-'):
+            fields = [f.rstrip('*') for f in row[1:]]
+            continue
+        record = dict(zip(fields, row[1:]))
+        record['type'] = row[0]
+        if len(row) - 1 > len(fields):
+            record['error'] = ','.join(row[len(fields) + 1:])
+        yield record
+
+
+def _csv_value(value):
+    if isinstance(value, (list, tuple)):
+        return ','.join(value)
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    return '' if value is None else value
+
+
+class _MultipartFile(object):
+    """ multipart/form-data body reading the file as it is sent, so that
+    uploads never hold more than a block of it in memory; the session
+    rewinds it before every send, so that a retried upload is complete
+    """
+
+    def __init__(self, fileobj, size, filename):
+        boundary = uuid.uuid4().hex
+        self.content_type = 'multipart/form-data; boundary=' + boundary
+        self._head = ('--%s\r\nContent-Disposition: form-data; name="file"; '
+                      'filename="%s"\r\nContent-Type: text/csv\r\n\r\n' %
+                      (boundary, filename)).encode('utf-8')
+        self._tail = ('\r\n--%s--\r\n' % boundary).encode('ascii')
+        self._fileobj = fileobj
+        self._start = fileobj.tell()
+        self._length = len(self._head) + size + len(self._tail)
+        self.rewind()
+
+    def rewind(self):
+        """ Starts the body over from its first byte """
+        self._fileobj.seek(self._start)
+        self._parts = [io.BytesIO(self._head), self._fileobj,
+                       io.BytesIO(self._tail)]
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        data = b''
+        while self._parts and (size < 0 or len(data) < size):
+            chunk = self._parts[0].read(size - len(data) if size >= 0
+                                        else -1)
+            if not chunk:
+                self._parts.pop(0)
+            data += chunk
+        return data
+
+
+class CsvExport(object):
+    """ CSV export of the grid saved to a file by Infoblox.csv_export,
+    iterating over its rows reads them from the file one at a time
+    (see csv_records)
+    """
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+
+    def __iter__(self):
+        return self.rows()
+
+    def rows(self):
+        with io.open(self.path, encoding='utf-8', newline='') as lines:
+            for record in csv_records(lines):
+                yield record
+
+
 class Infoblox(object):
 
     """ Implements the following subset of Infoblox IPAM API via REST API
@@ -89,6 +2214,9 @@ class Infoblox(object):
     delete_networkcontainer
     get_next_available_network
     create_host_record
+    create_host_records
+    csv_import
+    csv_export
     create_txt_record
     delete_txt_record
     delete_host_record
@@ -103,17 +2231,27 @@ class Infoblox(object):
     create_dhcp_range
     delete_dhcp_range
     get_next_available_ip
+    get_next_available_ips
     get_host
     get_host_by_ip
     get_ip_by_host
     get_host_by_regexp
+    iter_host_by_regexp
     get_txt_by_regexp
+    iter_txt_by_regexp
     get_host_by_extattrs
+    iter_host_by_extattrs
     get_host_extattrs
     get_network
     get_network_by_ip
+    get_networks_by_ips
+    refresh_network_index
     get_network_by_extattrs
+    iter_network_by_extattrs
     get_network_extattrs
+    scan
+    zone_shards
+    network_shards
     update_network_extattrs
     delete_network_extattrs
     get_dhcp_range
@@ -133,16 +2271,132 @@ class Infoblox(object):
                  iba_wapi_version,
                  iba_dns_view,
                  iba_network_view,
-                 iba_verify_ssl=False):
+                 iba_verify_ssl=False,
+                 pool_connections=10,
+                 pool_maxsize=10,
+                 pool_block=False,
+                 keep_alive=True,
+                 cookie_auth=True,
+                 cookie_file=None,
+                 retries=None,
+                 timeout=None,
+                 connect_timeout=None,
+                 limiter=None,
+                 breaker_failures=5,
+                 breaker_reset_timeout=30.0,
+                 read_endpoints=None,
+                 read_routing='round-robin',
+                 proxy_search='LOCAL',
+                 compression=True,
+                 tls_resumption=True,
+                 warmup=0,
+                 single_request_deletes=False,
+                 page_size=None,
+                 ref_cache=None,
+                 network_index=None,
+                 negative_cache=None):
         """ Class initialization method
-        :param iba_ipaddr: IBA IP address of management interface
+        :param iba_ipaddr: IBA IP address of management interface, or an
+            ordered list of the grid master and grid master candidates
         :param iba_user: IBA user name
         :param iba_password: IBA user password
         :param iba_wapi_version: IBA WAPI version (example: 1.0)
         :param iba_dns_view: IBA default view
         :param iba_network_view: IBA default network view
         :param iba_verify_ssl: IBA SSL certificate validation (example: False)
+        :param pool_connections: number of per-host connection pools to cache
+        :param pool_maxsize: maximum number of connections kept per host,
+            should be at least the number of threads sharing the client
+        :param pool_block: wait for a free connection instead of opening
+            one that will be discarded when the pool is full
+        :param keep_alive: keep connections open between requests
+        :param cookie_auth: authenticate once and reuse the ibapauth session
+            cookie instead of sending basic auth with every request
+        :param cookie_file: file to persist the session cookie in, so that
+            other processes using the same file skip the login (optional)
+        :param retries: RetryPolicy, maximum number of retries with the
+            default policy, or True for the default policy, for transient
+            errors (optional, no retries)
+        :param timeout: default time budget in seconds of every API call,
+            shared by all the requests the call makes (optional)
+        :param connect_timeout: time allowed to establish a connection in
+            seconds (optional)
+        :param limiter: AdaptiveLimiter capping the requests in flight, or
+            True for one with default settings (optional)
+        :param breaker_failures: consecutive failures after which an
+            endpoint of the iba_ipaddr list is skipped
+        :param breaker_reset_timeout: seconds before a skipped endpoint is
+            probed again
+        :param read_endpoints: grid members serving the searches (GET
+            requests without _function), writes stay on the grid master
+            (optional)
+        :param read_routing: 'round-robin' or 'least-latency' spreading of
+            the searches over read_endpoints
+        :param proxy_search: _proxy_search value sent with searches routed
+            to read_endpoints ('LOCAL' answers from the member database,
+            None leaves the member default)
+        :param compression: ask the grid for gzip/deflate compressed
+            responses; a response that cannot be decoded is asked for again
+            uncompressed
+        :param tls_resumption: offer the TLS session of the previous
+            connection to a host when connecting to it again, so that the
+            grid can skip the full handshake
+        :param warmup: number of connections opened to the grid (and to
+            each read endpoint) in parallel before the first request
+        :param single_request_deletes: delete_network,
+            delete_networkcontainer and delete_dhcp_range send the search
+            and the delete in one chained request instead of two (needs
+            multi-request support, WAPI 1.7+)
+        :param page_size: number of objects fetched per request by the
+            searches returning lists, which then page through the results
+            (needs WAPI 1.5+, default None sends every search unpaged)
+        :param ref_cache: RefCache of the _refs of the objects seen, used
+            instead of searching for the object to delete, or True for one
+            with default settings (optional)
+        :param network_index: NetworkIndex answering get_network_by_ip and
+            get_networks_by_ips locally, or True for one loaded on first use
+            and reloaded every 5 minutes (optional). Networks created or
+            deleted by other clients are only seen at the next reload,
+            until then lookups may miss them or return a deleted network.
+        :param negative_cache: NegativeCache answering get_host,
+            get_a_record_by_ip and get_fixed_address lookups found empty
+            shortly before without a request, or True for one with default
+            settings (optional)
         """
+        self.endpoints = None
+        if isinstance(iba_ipaddr, (list, tuple)):
+            self.endpoints = Endpoints(iba_ipaddr, breaker_failures,
+                                       breaker_reset_timeout)
+            iba_ipaddr = iba_ipaddr[0]
+        self.read_endpoints = None
+        if read_endpoints:
+            self.read_endpoints = Endpoints(read_endpoints, breaker_failures,
+                                            breaker_reset_timeout,
+                                            routing=read_routing,
+                                            primary=iba_ipaddr)
+        self.proxy_search = proxy_search
+        self.compression = compression
+        self.tls_resumption = tls_resumption
+        self.single_request_deletes = single_request_deletes
+        self.page_size = page_size
+        if ref_cache is True:
+            ref_cache = RefCache()
+        elif ref_cache is False:
+            ref_cache = None
+        self.ref_cache = ref_cache
+        if network_index is True:
+            network_index = NetworkIndex()
+        elif network_index is False:
+            network_index = None
+        self.network_index = network_index
+        if negative_cache is True:
+            negative_cache = NegativeCache()
+        elif negative_cache is False:
+            negative_cache = None
+        self.negative_cache = negative_cache
+        self._network_index_lock = threading.Lock()
+        self._address_pools = {}
+        self._address_pools_lock = threading.Lock()
         self.iba_host = iba_ipaddr
         self.iba_user = iba_user
         self.iba_password = iba_password
@@ -150,6 +2404,25 @@ class Infoblox(object):
         self.iba_dns_view = iba_dns_view
         self.iba_network_view = iba_network_view
         self.iba_verify_ssl = iba_verify_ssl
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.cookie_auth = cookie_auth
+        self.cookie_file = cookie_file
+        # bool is an int: True must not mean a single retry
+        if retries is True:
+            retries = RetryPolicy()
+        elif retries is False:
+            retries = None
+        elif isinstance(retries, int):
+            retries = RetryPolicy(max_retries=retries)
+        self.retry_policy = retries
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        if limiter is True:
+            limiter = AdaptiveLimiter()
+        self.limiter = limiter or None
         self.base_url = "https://{0}/wapi/v{1}".format(self.iba_host,
                                                        self.iba_wapi_version)
         self._setup_session()
@@ -158,22 +2431,270 @@ class Infoblox(object):
                          iba_ipaddr, iba_user, iba_password,
                          iba_wapi_version, iba_dns_view, iba_network_view,
                          iba_verify_ssl)
+        self.util.ref_cache = self.ref_cache
+        self.util.negative_cache = self.negative_cache
+        if warmup:
+            self.warmup(warmup)
 
     def _setup_session(self):
         self.session = Session()
-        self.session.auth = (self.iba_user, self.iba_password)
+        if self.cookie_auth:
+            self.session.credentials = (self.iba_user, self.iba_password)
+            if self.cookie_file:
+                self.session.use_cookie_file(self.cookie_file)
+        else:
+            self.session.auth = (self.iba_user, self.iba_password)
         self.session.verify = self.iba_verify_ssl
+        self.session.retry_policy = self.retry_policy
+        self.session.default_timeout = self.timeout
+        self.session.connect_timeout = self.connect_timeout
+        self.session.limiter = self.limiter
+        self.session.endpoints = self.endpoints
+        self.session.read_endpoints = self.read_endpoints
+        self.session.proxy_search = self.proxy_search
+        self.session.set_compression(self.compression)
+        self.adapter = PoolingAdapter(pool_connections=self.pool_connections,
+                                      pool_maxsize=self.pool_maxsize,
+                                      pool_block=self.pool_block,
+                                      tls_resumption=self.tls_resumption)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        if not self.keep_alive:
+            self.session.headers['Connection'] = 'close'
+
+    def _deadline(self, timeout):
+        """ Returns the Deadline shared by the requests of one API call
+        :param timeout: time budget in seconds, or a Deadline to share
+            between several calls (defaults to the client timeout)
+        """
+        if isinstance(timeout, Deadline):
+            return timeout
+        if timeout is None:
+            timeout = self.timeout
+        return Deadline(timeout, self.connect_timeout)
+
+    def _single_request(self, single_request):
+        if single_request is None:
+            return self.single_request_deletes
+        return single_request
+
+    def _delete_found(self, obj, search, deadline):
+        """ Searches for an object and deletes it in one multi-request: the
+            _ref found is assigned to the request state and the delete
+            reads it back, all on the grid
+        Only for searches no other object can match, such as a network or
+            an address range of the network view, since the _ref cannot be
+            checked before the grid deletes it. DNS records keep a search,
+            a check of the name in the _ref and a delete of their own.
+        Returns False if the request failed, the caller then deletes with
+            a search and a delete of its own to report the error
+        :param obj: object type
+        :param search: search fields matching exactly the object to delete
+        :param deadline: Deadline of the call
+        """
+        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
+            self.iba_wapi_version + '/request'
+        payload = [{'method': 'GET',
+                    'object': obj,
+                    'data': search,
+                    'assign_state': {'found_ref': '_ref'},
+                    'discard': True},
+                   {'method': 'DELETE',
+                    'object': '##STATE:found_ref:##',
+                    'enable_substitution': True}]
+        try:
+            r = self.session.post(url=rest_url, data=json.dumps(payload),
+                                  timeout=deadline)
+            ref = r.json()[0]
+        except (requests.exceptions.HTTPError, ValueError, IndexError,
+                KeyError, TypeError):
+            return False
+        self._forget_ref(ref)
+        return True
+
+    def _cached_ref(self, obj, name, view=None):
+        if self.ref_cache is None:
+            return None
+        return self.ref_cache.get(obj, name, view)
+
+    def _remember_refs(self, r_json):
+        if self.ref_cache is not None:
+            self.ref_cache.update(r_json)
+
+    def _forget_ref(self, ref):
+        if self.ref_cache is not None:
+            self.ref_cache.discard(ref)
+
+    def _lookup(self, uri, view, query_params, notFoundText=None,
+                notFoundFail=True, **kwargs):
+        """ util.get answering the searches found empty within the negative
+            cache ttl without a request
+        :param view: view the search is limited to, None for all views
+        """
+        cache = self.negative_cache
+        if cache is not None and cache.missing(uri, view, query_params):
+            r_json = None
+        else:
+            r_json = self.util.get(uri, query_params=query_params,
+                                   notFoundFail=False, **kwargs)
+            if r_json is None and cache is not None:
+                cache.put(uri, view, query_params)
+        if r_json is None and notFoundFail:
+            raise InfobloxNotFoundException(notFoundText)
+        return r_json
+
+    def _delete_cached(self, obj, name, view, deadline):
+        """ Deletes an object by its cached _ref in one request
+        Returns False if no _ref is cached or the grid no longer knows it,
+            the caller then searches for the object to delete
+        """
+        ref = self._cached_ref(obj, name, view)
+        if ref is None:
+            return False
+        try:
+            self.session.delete(url=self.base_url + '/' + ref,
+                                timeout=deadline)
+        except requests.exceptions.HTTPError as e:
+            if not is_not_found(e):
+                raise
+            return False
+        finally:
+            self._forget_ref(ref)
+        return True
+
+    def warmup(self, connections=1, timeout=None):
+        """ Opens connections to the grid ahead of the first request
+        The connections are opened in parallel and kept in the pool, the
+        first API calls then skip the DNS lookup, TCP and TLS handshakes.
+        Failures are logged and otherwise ignored.
+        :param connections: number of connections per host, at most
+            pool_maxsize
+        :param timeout: connect timeout in seconds (defaults to the client
+            connect_timeout)
+        :return: number of connections opened
+        """
+        if timeout is None:
+            timeout = self.connect_timeout
+        hosts = [self.iba_host]
+        if self.read_endpoints is not None:
+            hosts += [e.host for e in self.read_endpoints.endpoints]
+        opened = 0
+        for host in hosts:
+            opened += len(self.adapter.connect(self.session,
+                                               'https://%s/' % host,
+                                               connections, timeout))
+        return opened
+
+    def batch(self, size=100, confirm=True, timeout=None):
+        """ Returns a Batch queueing operations to send them as
+            multi-requests, size at a time; used as a context manager the
+            remaining operations are sent when the block ends
+        :param size: maximum number of operations per request
+        :param confirm: False to print the requests without sending them
+        :param timeout: time budget in seconds of each request (optional)
+        """
+        return Batch(self, size=size, confirm=confirm, timeout=timeout)
+
+    def address_pool(self, network, **kwargs):
+        """ Returns the AddressPool of a network, created on first use
+        :param network: network in CIDR format
+        :param kwargs: AddressPool options used when creating it
+        """
+        with self._address_pools_lock:
+            if network not in self._address_pools:
+                self._address_pools[network] = AddressPool(self, network,
+                                                           **kwargs)
+            return self._address_pools[network]
+
+    @property
+    def pool_stats(self):
+        """ Connection pool statistics (created, reused, dropped) """
+        return self.adapter.pool_stats.snapshot()
+
+    @property
+    def connection_timings(self):
+        """ Count, total, average and max seconds spent in DNS lookups,
+            TCP connects, TLS handshakes and waiting for the first byte of
+            responses
+        """
+        return self.adapter.timings.snapshot()
+
+    @property
+    def tls_stats(self):
+        """ TLS handshakes done, and how many resumed a previous session """
+        return self.adapter.tls_stats.snapshot()
+
+    @property
+    def limiter_stats(self):
+        """ Concurrency limiter metrics (limit, in_flight, queue_depth,
+            latency, requests, decreases, wait_time)
+        """
+        if self.limiter is None:
+            return {}
+        return self.limiter.metrics
+
+    @property
+    def endpoint_stats(self):
+        """ Requests, failures and breaker state of each grid endpoint """
+        if self.endpoints is None:
+            return []
+        return self.endpoints.stats
 
-    def get_next_available_ip(self, network):
+    @property
+    def read_endpoint_stats(self):
+        """ Requests, failures, latency and breaker state of each read
+            endpoint
+        """
+        if self.read_endpoints is None:
+            return []
+        return self.read_endpoints.stats
+
+    @property
+    def transfer_stats(self):
+        """ Responses received, how many were compressed, and their size
+            on the wire and once decoded in bytes
+        """
+        return self.session.transfer_stats.snapshot()
+
+    @property
+    def ref_cache_stats(self):
+        """ Ref cache statistics (hits, misses, evictions, invalidations,
+            size)
+        """
+        if self.ref_cache is None:
+            return {}
+        return dict(self.ref_cache.stats.snapshot(),
+                    size=len(self.ref_cache))
+
+    @property
+    def negative_cache_stats(self):
+        """ Negative cache statistics (hits, misses, evictions,
+            invalidations, size)
+        """
+        if self.negative_cache is None:
+            return {}
+        return dict(self.negative_cache.stats.snapshot(),
+                    size=len(self.negative_cache))
+
+    @property
+    def retry_stats(self):
+        """ Retry statistics (retries, budget_exhausted) """
+        if self.retry_policy is None:
+            return {}
+        return self.retry_policy.stats.snapshot()
+
+    def get_next_available_ip(self, network, timeout=None):
         """ Implements IBA next_available_ip REST API call
         Returns IP v4 address
         :param network: network in CIDR format
+        :param timeout: time budget in seconds for the whole call (optional)
         """
+        deadline = self._deadline(timeout)
         rest_url = 'https://' + self.iba_host + '/wapi/v' +  \
                    self.iba_wapi_version + '/network?network=' \
                    + network + '&network_view=' + self.iba_network_view
         try:
-            r = self.session.get(url=rest_url)
+            r = self.session.get(url=rest_url, timeout=deadline)
             r_json = r.json()
             if r.status_code == 200:
                 if len(r_json) > 0:
@@ -181,7 +2702,7 @@ class Infoblox(object):
                     rest_url = 'https://' + self.iba_host + '/wapi/v' + \
                         self.iba_wapi_version + '/' + net_ref + \
                         '?_function=next_available_ip&num=1'
-                    r = self.session.post(url=rest_url)
+                    r = self.session.post(url=rest_url, timeout=deadline)
                     r_json = r.json()
                     if r.status_code == 200:
                         ip_v4 = r_json['ips'][0]
@@ -207,42 +2728,266 @@ class Infoblox(object):
         except ValueError:
             raise InfobloxGeneralException(r)
 
-    def create_host_record(self, address, fqdn, payload=None):
-        """ Implements IBA REST API call to create IBA host record
-        Returns IP v4 address assigned to the host
+    def get_next_available_ips(self, network, count, exclude=None,
+                               timeout=None):
+        """ Implements IBA next_available_ip REST API call for several
+            addresses at once, in two requests whatever their number
+        Returns list of IP v4 addresses
+        :param network: network in CIDR format
+        :param count: number of addresses to return
+        :param exclude: IP v4 addresses not to return (optional)
+        :param timeout: time budget in seconds for the whole call (optional)
+        """
+        if count < 1:
+            raise InfobloxBadInputParameter('Expected a count of at least 1')
+        deadline = self._deadline(timeout)
+        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
+            self.iba_wapi_version + '/network?network=' + network + \
+            '&network_view=' + self.iba_network_view
+        try:
+            r = self.session.get(url=rest_url, timeout=deadline)
+            r_json = r.json()
+        except ValueError:
+            raise InfobloxGeneralException(r)
+        if len(r_json) == 0:
+            raise InfobloxNotFoundException(
+                "No requested network found: " + network)
+        payload = {'num': count}
+        if exclude:
+            payload['exclude'] = list(exclude)
+        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
+            self.iba_wapi_version + '/' + r_json[0]['_ref'] + \
+            '?_function=next_available_ip'
+        try:
+            r = self.session.post(url=rest_url, data=json.dumps(payload),
+                                  timeout=deadline)
+            return r.json()['ips']
+        except requests.exceptions.HTTPError as e:
+            try:
+                r_json = e.response.json()
+            except (AttributeError, ValueError):
+                raise e
+            if r_json.get('code') == 'Client.Ibap.Data':
+                raise InfobloxNoIPavailableException(r_json.get('text'))
+            raise InfobloxGeneralException(r_json.get('text', r_json))
+        except (ValueError, KeyError):
+            raise InfobloxGeneralException(r)
+
+    def create_host_record(self, address, fqdn, payload=None):
+        """ Implements IBA REST API call to create IBA host record
+        Returns IP v4 address assigned to the host
+        :param address: IP v4 address or NET v4 address in CIDR format
+        :param fqdn: hostname in FQDN
+        :return: next available ip
+        """
+        if payload is None:
+            payload = self._host_record_payload(address, fqdn)
+
+        r_json = self.util.post('record:host', payload=payload,
+                                fields=['ipv4addrs'])
+        if r_json is None:
+            raise InfobloxGeneralException("Failed to create "
+                                           "host record for [%s]" % (address))
+        return r_json['ipv4addrs'][0]['ipv4addr']
+
+    def create_host_records(self, hosts, chunk_size=100, workers=1,
+                            multi_request=True, timeout=None):
+        """ Creates host records in chunks, sent as multi-requests or as
+            one request per host, workers chunks at a time
+        Returns a HostRecordsCreation yielding a HostRecordResult per host
+            in the order of hosts, with the throughput in its stats
+        :param hosts: iterable of (address, fqdn) pairs, address as in
+            create_host_record; read as the results are consumed
+        :param chunk_size: number of hosts per chunk
+        :param workers: number of chunks sent in parallel
+        :param multi_request: send each chunk as one multi-request; a chunk
+            the grid rejects is sent again host by host to report which
+            hosts failed
+        :param timeout: time budget in seconds of each request (optional)
+        """
+        return HostRecordsCreation(self, hosts, chunk_size, workers,
+                                   multi_request, timeout)
+
+    def csv_import(self, source, operation='INSERT', on_error='CONTINUE',
+                   poll_interval=1.0, max_poll_interval=30.0, timeout=None,
+                   progress=None):
+        """ Loads records with a CSV import job of the grid, the fastest
+            way to add very many records
+        Returns the csvimporttask fields of the finished job, with the
+            rows the grid rejected under errors
+        :param source: path or binary file of an Infoblox CSV import file,
+            or iterable of record dicts (see csv_import_rows)
+        :param operation: INSERT, UPDATE, DELETE, REPLACE, MERGE, OVERRIDE
+            or CUSTOM
+        :param on_error: CONTINUE or STOP at the first bad row
+        :param poll_interval: seconds before the first progress check,
+            growing by half at every check
+        :param max_poll_interval: longest wait between progress checks
+        :param timeout: time budget in seconds for the whole job (optional)
+        :param progress: function called with the csvimporttask fields at
+            every progress check (optional)
+        """
+        deadline = self._deadline(timeout)
+        fileobj, size, filename, opened = self._csv_file(source)
+        try:
+            r_json = self._fileop('uploadinit', {'filename': filename},
+                                  deadline)
+            body = _MultipartFile(fileobj, size, filename)
+            self.session.post(url=r_json['url'], data=body,
+                              headers={'Content-Type': body.content_type},
+                              timeout=deadline)
+        finally:
+            # the caller closes the files it passed
+            if opened:
+                fileobj.close()
+        task = self._fileop('csv_import', {'token': r_json['token'],
+                                           'action': 'START',
+                                           'operation': operation,
+                                           'on_error': on_error},
+                            deadline)['csv_import_task']
+        if self.negative_cache is not None:
+            # the imported records may match any empty search
+            self.negative_cache.clear()
+        delay = poll_interval
+        while task.get('status') not in ('COMPLETED', 'FAILED', 'STOPPED'):
+            if not deadline.allows(delay):
+                raise InfobloxTimeoutException(
+                    'CSV import %s still %s' % (task.get('import_id'),
+                                                task.get('status')))
+            time.sleep(delay)
+            delay = min(delay * 1.5, max_poll_interval)
+            r = self.session.get(url=self.base_url + '/' + task['_ref'],
+                                 timeout=deadline)
+            task = r.json()
+            if progress is not None:
+                progress(task)
+        task['errors'] = []
+        if task.get('lines_failed'):
+            task['errors'] = self._csv_errors(task['import_id'], deadline)
+        return task
+
+    def csv_export(self, obj, path, query_params=None, chunk_size=65536,
+                   timeout=None):
+        """ Saves all the objects of a type, such as record:host, network
+            or lease, to a file with a CSV export of the grid, the download
+            being written chunk by chunk as it arrives
+        Returns a CsvExport iterating over the rows of the file
+        :param obj: object type to export
+        :param path: file the export is written to
+        :param query_params: search fields limiting the objects exported
+            (optional)
+        :param chunk_size: bytes read from the download at a time
+        :param timeout: time budget in seconds for the whole export
+            (optional)
+        """
+        deadline = self._deadline(timeout)
+        payload = dict(query_params or {})
+        payload['_object'] = obj
+        r_json = self._fileop('csv_export', payload, deadline)
+        size = 0
+        try:
+            r = self.session.get(url=r_json['url'], stream=True,
+                                 timeout=deadline)
+            try:
+                with open(path, 'wb') as f:
+                    for chunk in self.session.iter_content(r, chunk_size):
+                        f.write(chunk)
+                        size += len(chunk)
+            finally:
+                r.close()
+        finally:
+            self._download_complete(r_json['token'], deadline)
+        return CsvExport(path, size)
+
+    def _download_complete(self, token, deadline):
+        """ Tells the grid a file download is over so it can delete the
+            file; a failure is logged, the download itself is done or has
+            failed with an error of its own
+        """
+        try:
+            self._fileop('downloadcomplete', {'token': token}, deadline)
+        except Exception as e:
+            logger.warning('Could not complete download %s: %r', token, e)
+
+    def _csv_file(self, source):
+        """ Returns the binary file, size and name of a CSV import source,
+            record dicts being written to a temporary file first, and
+            whether the file was opened here
+        """
+        if isinstance(source, str):
+            fileobj = open(source, 'rb')
+            return (fileobj, os.fstat(fileobj.fileno()).st_size,
+                    os.path.basename(source), True)
+        if hasattr(source, 'read'):
+            name = os.path.basename(getattr(source, 'name', 'import.csv'))
+            try:
+                start = source.tell()
+                source.seek(0, os.SEEK_END)
+                size = source.tell() - start
+                source.seek(start)
+                return source, size, name, False
+            except (AttributeError, IOError, OSError):
+                # not seekable, its size is only known once read
+                spool = tempfile.TemporaryFile()
+                for block in iter(lambda: source.read(65536), b''):
+                    spool.write(block)
+        else:
+            spool = tempfile.TemporaryFile()
+            text = io.TextIOWrapper(spool, encoding='utf-8', newline='')
+            writer = csv.writer(text)
+            for row in csv_import_rows(source, self.iba_dns_view,
+                                       self.iba_network_view):
+                writer.writerow(row)
+            text.flush()
+            text.detach()
+            name = 'import.csv'
+        size = spool.tell()
+        spool.seek(0)
+        return spool, size, name, True
+
+    def _fileop(self, function, payload, deadline):
+        rest_url = self.base_url + '/fileop?_function=' + function
+        r = self.session.post(url=rest_url, data=json.dumps(payload),
+                              timeout=deadline)
+        try:
+            return r.json()
+        except ValueError:
+            raise InfobloxGeneralException(r)
+
+    def _csv_errors(self, import_id, deadline):
+        """ Returns the rows of the error log of a CSV import as dicts of
+            their fields by header name, with the object type under type
+        """
+        r_json = self._fileop('csv_error_log', {'import_id': import_id},
+                              deadline)
+        try:
+            r = self.session.get(url=r_json['url'], stream=True,
+                                 timeout=deadline)
+            lines = (line.decode('utf-8') if isinstance(line, bytes)
+                     else line for line in r.iter_lines())
+            errors = list(csv_records(lines))
+        finally:
+            self._download_complete(r_json['token'], deadline)
+        return errors
+
+    def _host_record_payload(self, address, fqdn):
+        """ Returns the record:host payload of create_host_record
         :param address: IP v4 address or NET v4 address in CIDR format
         :param fqdn: hostname in FQDN
-        :return: next available ip
         """
-        # CIDR
-        if re.match("^[0-9]+\.[0-9]+\.[0-9]+\.[0-9]+\/[0-9]+$", address):
+        if _CIDR_RE.match(address) or _RANGE_RE.match(address):
             ipv4addr = 'func:nextavailableip:' + address
-
-        # range
-        elif re.match("^[0-9]+\.[0-9]+\.[0-9]+\.[0-9]+-[0-9]+\.[0-9]+\.[0-9]+\.[0-9]+$", address):
-            ipv4addr = 'func:nextavailableip:' + address
-
-        # static
-        elif re.match("^[0-9]+\.[0-9]+\.[0-9]+\.[0-9]+$", address):
+        elif _ADDRESS_RE.match(address):
             ipv4addr = address
-
         else:
             raise InfobloxBadInputParameter(
                 'Expected IP or NET address in CIDR format')
 
-        if payload is None:
-            payload = {'name': fqdn,
-                       'view': self.iba_dns_view,
-                       'ipv4addrs': [{'ipv4addr': ipv4addr,
-                                      'configure_for_dhcp': False,
-                                      }]}
-
-        r_json = self.util.post('record:host', payload=payload,
-                                fields=['ipv4addrs'])
-        if r_json is None:
-            raise InfobloxGeneralException("Failed to create "
-                                           "host record for [%s]" % (address))
-        return r_json['ipv4addrs'][0]['ipv4addr']
+        return {'name': fqdn,
+                'view': self.iba_dns_view,
+                'ipv4addrs': [{'ipv4addr': ipv4addr,
+                               'configure_for_dhcp': False,
+                               }]}
 
     def get_cname_record(self, fqdn):
         """ Retrieves a CNAME record by FQDN
@@ -296,15 +3041,20 @@ class Infoblox(object):
         except ValueError:
             raise InfobloxGeneralException(r)
 
-    def delete_host_record(self, fqdn):
+    def delete_host_record(self, fqdn, timeout=None):
         """ Implements IBA REST API call to delete IBA host record
         :param fqdn: hostname in FQDN
+        :param timeout: time budget in seconds for the whole call (optional)
         """
+        deadline = self._deadline(timeout)
+        if self._delete_cached('record:host', fqdn, self.iba_dns_view,
+                               deadline):
+            return
         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
             self.iba_wapi_version + '/record:host?name=' + fqdn + '&view=' \
             + self.iba_dns_view
         try:
-            r = self.session.get(url=rest_url)
+            r = self.session.get(url=rest_url, timeout=deadline)
             r_json = r.json()
             if r.status_code == 200:
                 if len(r_json) > 0:
@@ -314,7 +3064,8 @@ class Infoblox(object):
                                      host_ref).group(1) == fqdn):
                         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
                             self.iba_wapi_version + '/' + host_ref
-                        r = self.session.delete(url=rest_url)
+                        r = self.session.delete(url=rest_url, timeout=deadline)
+                        self._forget_ref(host_ref)
                         if r.status_code == 200:
                             return
                         else:
@@ -336,15 +3087,20 @@ class Infoblox(object):
         except ValueError:
             raise InfobloxGeneralException(r)
 
-    def delete_txt_record(self, fqdn):
+    def delete_txt_record(self, fqdn, timeout=None):
         """ Implements IBA REST API call to delete IBA TXT record
         :param fqdn: hostname in FQDN
+        :param timeout: time budget in seconds for the whole call (optional)
         """
+        deadline = self._deadline(timeout)
+        if self._delete_cached('record:txt', fqdn, self.iba_dns_view,
+                               deadline):
+            return
         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
             self.iba_wapi_version + '/record:txt?name=' + fqdn + \
             '&view=' + self.iba_dns_view
         try:
-            r = self.session.get(url=rest_url)
+            r = self.session.get(url=rest_url, timeout=deadline)
             r_json = r.json()
             if r.status_code == 200:
                 if len(r_json) > 0:
@@ -354,7 +3110,8 @@ class Infoblox(object):
                                  host_ref).group(1) == fqdn):
                         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
                             self.iba_wapi_version + '/' + host_ref
-                        r = self.session.delete(url=rest_url)
+                        r = self.session.delete(url=rest_url, timeout=deadline)
+                        self._forget_ref(host_ref)
                         if r.status_code == 200:
                             return
                         else:
@@ -376,17 +3133,20 @@ class Infoblox(object):
         except ValueError:
             raise InfobloxGeneralException(r)
 
-    def add_host_alias(self, host_fqdn, alias_fqdn):
+    def add_host_alias(self, host_fqdn, alias_fqdn, timeout=None):
         """ Implements IBA REST API call to add an alias to IBA host record
         :param host_fqdn: host record name in FQDN
         :param alias_fqdn: host record name in FQDN
+        :param timeout: time budget in seconds for the whole call (optional)
         """
+        deadline = self._deadline(timeout)
         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
             self.iba_wapi_version + '/record:host?name=' + host_fqdn + \
             '&view=' + self.iba_dns_view + '&_return_fields=name,aliases'
         try:
-            r = self.session.get(url=rest_url)
+            r = self.session.get(url=rest_url, timeout=deadline)
             r_json = r.json()
+            self._remember_refs(r_json)
             if r.status_code == 200:
                 if len(r_json) > 0:
                     host_ref = r_json[0]['_ref']
@@ -402,7 +3162,8 @@ class Infoblox(object):
                             payload = '{"aliases": ["' + alias_fqdn + '"]}'
                         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
                             self.iba_wapi_version + '/' + host_ref
-                        r = self.session.put(url=rest_url, data=payload)
+                        r = self.session.put(url=rest_url, data=payload,
+                                             timeout=deadline)
                         if r.status_code == 200:
                             return
                         else:
@@ -424,17 +3185,20 @@ class Infoblox(object):
         except ValueError:
             raise InfobloxGeneralException(r)
 
-    def delete_host_alias(self, host_fqdn, alias_fqdn):
+    def delete_host_alias(self, host_fqdn, alias_fqdn, timeout=None):
         """ Implements IBA REST API call to add an alias to IBA host record
         :param host_fqdn: host record name in FQDN
         :param alias_fqdn: host record name in FQDN
+        :param timeout: time budget in seconds for the whole call (optional)
         """
+        deadline = self._deadline(timeout)
         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
             self.iba_wapi_version + '/record:host?name=' + host_fqdn + \
             '&view=' + self.iba_dns_view + '&_return_fields=name,aliases'
         try:
-            r = self.session.get(url=rest_url)
+            r = self.session.get(url=rest_url, timeout=deadline)
             r_json = r.json()
+            self._remember_refs(r_json)
             if r.status_code == 200:
                 if len(r_json) > 0:
                     host_ref = r_json[0]['_ref']
@@ -449,7 +3213,8 @@ class Infoblox(object):
                             rest_url = 'https://' + self.iba_host + \
                                 '/wapi/v' + self.iba_wapi_version + \
                                 '/' + host_ref
-                            r = self.session.put(url=rest_url, data=payload)
+                            r = self.session.put(url=rest_url, data=payload,
+                                                 timeout=deadline)
                             if r.status_code == 200:
                                 return
                             else:
@@ -497,14 +3262,19 @@ class Infoblox(object):
         except ValueError:
             raise InfobloxGeneralException(r)
 
-    def delete_cname_record(self, fqdn):
+    def delete_cname_record(self, fqdn, timeout=None):
         """ Implements IBA REST API call to delete IBA cname record
         :param fqdn: cname in FQDN
+        :param timeout: time budget in seconds for the whole call (optional)
         """
+        deadline = self._deadline(timeout)
+        if self._delete_cached('record:cname', fqdn, self.iba_dns_view,
+                               deadline):
+            return
         rest_url = "{0}/record:cname?name={1}&view={2}".format(
             self.base_url, fqdn, self.iba_dns_view)
         try:
-            r = self.session.get(url=rest_url)
+            r = self.session.get(url=rest_url, timeout=deadline)
             r_json = r.json()
             if r.status_code == 200:
                 if len(r_json) > 0:
@@ -513,7 +3283,8 @@ class Infoblox(object):
                             re.match("record:cname\/[^:]+:([^\/]+)\/",
                                      cname_ref).group(1) == fqdn):
                         rest_url = "{0}/{1}".format(self.base_url, cname_ref)
-                        r = self.session.delete(url=rest_url)
+                        r = self.session.delete(url=rest_url, timeout=deadline)
+                        self._forget_ref(cname_ref)
                         if r.status_code == 200:
                             return
                         else:
@@ -535,16 +3306,18 @@ class Infoblox(object):
         except ValueError:
             raise InfobloxGeneralException(r)
 
-    def update_cname_record(self, canonical, name):
+    def update_cname_record(self, canonical, name, timeout=None):
         """ Implements IBA REST API call to update or repoint IBA cname record
         :param canonical: canonical name in FQDN format
         :param name: the name for the new CNAME record in FQDN format
+        :param timeout: time budget in seconds for the whole call (optional)
         """
+        deadline = self._deadline(timeout)
         rest_url = 'https://' + self.iba_host + \
             '/wapi/v' + self.iba_wapi_version + '/record:cname'
         payload = json.dumps({'name': name})
         try:
-            r = self.session.get(url=rest_url, data=payload)
+            r = self.session.get(url=rest_url, data=payload, timeout=deadline)
             r_json = r.json()
             # RFC1912 - A CNAME can not coexist with any other data, we
             # should expect utmost one entry
@@ -555,7 +3328,8 @@ class Infoblox(object):
                     json.JSONEncoder().encode(canonical) + '}'
                 rest_url = 'https://' + self.iba_host + '/wapi/v' + \
                     self.iba_wapi_version + '/' + cname_ref
-                r = self.session.put(url=rest_url, data=payload)
+                r = self.session.put(url=rest_url, data=payload,
+                                     timeout=deadline)
                 if r.status_code == 200 or r.status_code == 201:
                     return
                 else:
@@ -594,18 +3368,32 @@ class Infoblox(object):
         except ValueError:
             raise InfobloxGeneralException(r)
 
-    def delete_dhcp_range(self, start_ip_v4, end_ip_v4):
+    def delete_dhcp_range(self, start_ip_v4, end_ip_v4, timeout=None,
+                          single_request=None):
         """ Implements IBA REST API call to delete DHCP range for given
             start and end addresses
         :param start_ip_v4: IP v4 address
         :param end_ip_v4: IP v4 address
+        :param timeout: time budget in seconds for the whole call (optional)
+        :param single_request: look up and delete in one chained request
+            (defaults to the single_request_deletes client option)
         """
+        deadline = self._deadline(timeout)
+        if self._delete_cached('range', start_ip_v4 + '/' + end_ip_v4,
+                               self.iba_network_view, deadline):
+            return
+        if self._single_request(single_request):
+            if self._delete_found(
+                    'range', {'start_addr': start_ip_v4, 'end_addr': end_ip_v4,
+                              'network_view': self.iba_network_view},
+                    deadline):
+                return
         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
             self.iba_wapi_version + '/range?start_addr=' + \
             start_ip_v4 + '?end_addr=' + end_ip_v4 + '&network_view=' + \
             self.iba_network_view
         try:
-            r = self.session.get(url=rest_url)
+            r = self.session.get(url=rest_url, timeout=deadline)
             r_json = r.json()
             if r.status_code == 200:
                 if len(r_json) > 0:
@@ -613,7 +3401,8 @@ class Infoblox(object):
                     if range_ref:
                         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
                             self.iba_wapi_version + '/' + range_ref
-                        r = self.session.delete(url=rest_url)
+                        r = self.session.delete(url=rest_url, timeout=deadline)
+                        self._forget_ref(range_ref)
                         if r.status_code == 200:
                             return
                         else:
@@ -641,15 +3430,15 @@ class Infoblox(object):
         :param fqdn: hostname in FQDN
         :param fields: comma-separated list of field names (optional)
         """
-        r_json = self.util.get('record:host',
-                               query_params={
-                                   'name': fqdn,
-                                   'view': self.iba_dns_view
-                               },
-                               fields=fields,
-                               notFoundText="No hosts found: " + fqdn,
-                               notFoundFail=notFoundFail
-                               )
+        r_json = self._lookup('record:host', self.iba_dns_view,
+                              query_params={
+                                  'name': fqdn,
+                                  'view': self.iba_dns_view
+                              },
+                              fields=fields,
+                              notFoundText="No hosts found: " + fqdn,
+                              notFoundFail=notFoundFail
+                              )
         if r_json is None and notFoundFail is False:
             return r_json
         return r_json[0]
@@ -678,28 +3467,28 @@ class Infoblox(object):
         Returns array of host names in FQDN matched to given regexp filter
         :param fqdn: hostname in FQDN or FQDN regexp filter
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/record:host?name~=' + \
-            fqdn + '&view=' + self.iba_dns_view
-        hosts = []
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    for host in r_json:
-                        hosts.append(host['name'])
-                    return hosts
-                else:
-                    raise InfobloxNotFoundException(
-                        "No hosts found for regexp filter: " + fqdn)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+        hosts = list(self.iter_host_by_regexp(fqdn))
+        if len(hosts) == 0:
+            raise InfobloxNotFoundException(
+                "No hosts found for regexp filter: " + fqdn)
+        return hosts
+
+    def iter_host_by_regexp(self, fqdn, page_size=None, timeout=None):
+        """ Implements IBA REST API call to retrieve host records by fqdn
+            regexp filter, page by page
+        Yields host names in FQDN matched to given regexp filter as the
+            pages arrive
+        :param fqdn: hostname in FQDN or FQDN regexp filter
+        :param page_size: number of records fetched per request (defaults
+            to the client page_size)
+        :param timeout: time budget in seconds of each page request
+            (optional)
+        """
+        for host in self._iter_search('record:host',
+                                      {'name~': fqdn,
+                                       'view': self.iba_dns_view},
+                                      'name', page_size, timeout):
+            yield host['name']
 
     def get_txt_by_regexp(self, fqdn):
         """ Implements IBA REST API call to retrieve TXT records by fqdn
@@ -708,28 +3497,28 @@ class Infoblox(object):
             filter with the TXT value
         :param fqdn: hostname in FQDN or FQDN regexp filter
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/record:txt?name~=' + fqdn + \
-            '&view=' + self.iba_dns_view
-        hosts = {}
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    for host in r_json:
-                        hosts[host['name']] = host['text']
-                    return hosts
-                else:
-                    raise InfobloxNotFoundException(
-                        "No txt records found for regexp filter: " + fqdn)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+        hosts = dict(self.iter_txt_by_regexp(fqdn))
+        if len(hosts) == 0:
+            raise InfobloxNotFoundException(
+                "No txt records found for regexp filter: " + fqdn)
+        return hosts
+
+    def iter_txt_by_regexp(self, fqdn, page_size=None, timeout=None):
+        """ Implements IBA REST API call to retrieve TXT records by fqdn
+            regexp filter, page by page
+        Yields (host name in FQDN, TXT value) pairs matched to given regexp
+            filter as the pages arrive
+        :param fqdn: hostname in FQDN or FQDN regexp filter
+        :param page_size: number of records fetched per request (defaults
+            to the client page_size)
+        :param timeout: time budget in seconds of each page request
+            (optional)
+        """
+        for host in self._iter_search('record:txt',
+                                      {'name~': fqdn,
+                                       'view': self.iba_dns_view},
+                                      'name,text', page_size, timeout):
+            yield host['name'], host['text']
 
     def get_host_by_ip(self, ip_v4, fields=None, notFoundFail=True):
         """ Implements IBA REST API call to find hostname by IP address
@@ -868,6 +3657,12 @@ class Infoblox(object):
         Returns network in CIDR format
         :param ip_v4: IP v4 address
         """
+        if self.network_index is not None:
+            network = self._loaded_network_index().lookup(ip_v4)
+            if network is None:
+                raise InfobloxNotFoundException(
+                    "No network found for IP: " + ip_v4)
+            return network
         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
             self.iba_wapi_version + '/ipv4address?ip_address=' + ip_v4 + \
             '&network_view=' + self.iba_network_view
@@ -891,6 +3686,56 @@ class Infoblox(object):
         except ValueError:
             raise InfobloxGeneralException(r)
 
+    def get_networks_by_ips(self, ips_v4):
+        """ Finds the networks of many IP addresses
+        Returns a list of networks in CIDR format, None for the addresses
+            in no network, in the order of ips_v4
+        :param ips_v4: iterable of IP v4 addresses
+        """
+        if self.network_index is None:
+            networks = []
+            for ip_v4 in ips_v4:
+                try:
+                    networks.append(self.get_network_by_ip(ip_v4))
+                except InfobloxNotFoundException:
+                    networks.append(None)
+            return networks
+        index = self._loaded_network_index()
+        return [index.lookup(ip_v4) for ip_v4 in ips_v4]
+
+    def refresh_network_index(self, timeout=None):
+        """ Loads every network of the network view into the network index,
+            creating it if the client has none
+        Returns the number of networks indexed
+        :param timeout: request timeout in seconds or Deadline (optional)
+        """
+        with self._network_index_lock:
+            if self.network_index is None:
+                self.network_index = NetworkIndex()
+            return self._load_network_index(timeout)
+
+    def _load_network_index(self, timeout=None):
+        # paged whatever page_size, a view may hold more networks than the
+        # grid returns in one search
+        networks = self.util.iter_get(
+            'network', {'network_view': self.iba_network_view}, 'network',
+            page_size=self.page_size or 1000, timeout=timeout)
+        self.network_index.load(network['network'] for network in networks)
+        return len(self.network_index)
+
+    def _unindex_network(self, network):
+        if self.network_index is not None:
+            self.network_index.discard(network)
+
+    def _loaded_network_index(self):
+        index = self.network_index
+        if index.stale():
+            with self._network_index_lock:
+                # another thread may have reloaded it meanwhile
+                if index.stale():
+                    self._load_network_index()
+        return index
+
     def get_network_by_extattrs(self, attributes):
         """ Implements IBA REST API call to find a network by it's
             extensible attributes
@@ -905,30 +3750,37 @@ class Infoblox(object):
             attr_name<=attr_value - search by number less than value
             attr_name!=attr_value - search by number not equal of value
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/network?*' + \
-            "&*".join(attributes.split(",")) + '&network_view=' + \
-            self.iba_network_view
-        networks = []
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    for network in r_json:
-                        if 'network' in network:
-                            networks.append(network['network'])
-                    return networks
-                else:
-                    raise InfobloxNotFoundException(
-                        "No networks found for extensible attributes: " + attributes)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxGeneralException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+        networks = list(self.iter_network_by_extattrs(attributes))
+        if len(networks) == 0:
+            raise InfobloxNotFoundException(
+                "No networks found for extensible attributes: " + attributes)
+        return networks
+
+    def iter_network_by_extattrs(self, attributes, page_size=None,
+                                 timeout=None):
+        """ Implements IBA REST API call to find networks by their
+            extensible attributes, page by page
+        Yields networks in CIDR format as the pages arrive
+        :param attributes: comma-separated list of attrubutes name/value
+            pairs in the format:
+            attr_name=attr_value - exact match for attribute value
+            attr_name:=attr_value - case insensitive match for attribute value
+            attr_name~=regular_expression - match attribute value by regular
+                expression
+            attr_name>=attr_value - search by number greater than value
+            attr_name<=attr_value - search by number less than value
+            attr_name!=attr_value - search by number not equal of value
+        :param page_size: number of records fetched per request (defaults
+            to the client page_size)
+        :param timeout: time budget in seconds of each page request
+            (optional)
+        """
+        for network in self._iter_search(
+                'network?*' + "&*".join(attributes.split(",")),
+                {'network_view': self.iba_network_view},
+                'network', page_size, timeout):
+            if 'network' in network:
+                yield network['network']
 
     def get_host_by_extattrs(self, attributes):
         """ Implements IBA REST API call to find host by it's extensible attributes
@@ -943,29 +3795,88 @@ class Infoblox(object):
             attr_name<=attr_value - search by number less than value
             attr_name!=attr_value - search by number not equal of value
         """
-        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
-            self.iba_wapi_version + '/record:host?*' + \
-            "&*".join(attributes.split(",")) + '&view=' + self.iba_dns_view
-        hosts = []
-        try:
-            r = self.session.get(url=rest_url)
-            r_json = r.json()
-            if r.status_code == 200:
-                if len(r_json) > 0:
-                    for host in r_json:
-                        if 'name' in host:
-                            hosts.append(host['name'])
-                    return hosts
-                else:
-                    raise InfobloxNotFoundException(
-                        "No hosts found for extensible attributes: " + attributes)
-            else:
-                if 'text' in r_json:
-                    raise InfobloxNotFoundException(r_json['text'])
-                else:
-                    r.raise_for_status()
-        except ValueError:
-            raise InfobloxGeneralException(r)
+        hosts = list(self.iter_host_by_extattrs(attributes))
+        if len(hosts) == 0:
+            raise InfobloxNotFoundException(
+                "No hosts found for extensible attributes: " + attributes)
+        return hosts
+
+    def iter_host_by_extattrs(self, attributes, page_size=None,
+                              timeout=None):
+        """ Implements IBA REST API call to find hosts by their extensible
+            attributes, page by page
+        Yields hosts in FQDN as the pages arrive
+        :param attributes: comma-separated list of attrubutes name/value
+            pairs in the format:
+            attr_name=attr_value - exact match for attribute value
+            attr_name:=attr_value - case insensitive match for attribute value
+            attr_name~=regular_expression - match attribute value by regular
+                expression
+            attr_name>=attr_value - search by number greater than value
+            attr_name<=attr_value - search by number less than value
+            attr_name!=attr_value - search by number not equal of value
+        :param page_size: number of records fetched per request (defaults
+            to the client page_size)
+        :param timeout: time budget in seconds of each page request
+            (optional)
+        """
+        for host in self._iter_search(
+                'record:host?*' + "&*".join(attributes.split(",")),
+                {'view': self.iba_dns_view},
+                'name', page_size, timeout):
+            if 'name' in host:
+                yield host['name']
+
+    def _iter_search(self, uri, query_params, fields, page_size, timeout):
+        if page_size is None:
+            page_size = self.page_size
+        return self.util.iter_get(uri, query_params, fields,
+                                  page_size=page_size, timeout=timeout)
+
+    def scan(self, uri, shards, query_params=None, fields=None,
+             concurrency=4, page_size=None, timeout=None):
+        """ Yields every object of a search split into shards paged
+            concurrently, in no particular order (see Util.iter_scan)
+        :param uri: object type to scan (e.g. -- record:host, ipv4address)
+        :param shards: list of dicts of query parameters selecting disjoint
+            parts of the objects, e.g. from prefix_shards, zone_shards or
+            network_shards
+        :param query_params: query parameters common to all shards
+        :param fields: comma-separated list of field names (optional)
+        :param concurrency: maximum number of requests in flight
+        :param page_size: number of objects fetched per request (defaults
+            to the client page_size, or 1000 without one)
+        :param timeout: time budget in seconds of each page request
+            (optional)
+        """
+        if page_size is None:
+            page_size = self.page_size or 1000
+        return self.util.iter_scan(uri, shards, query_params, fields,
+                                   page_size=page_size,
+                                   concurrency=concurrency, timeout=timeout)
+
+    def zone_shards(self, view=None):
+        """ Returns one scan shard per authoritative DNS zone of a view,
+            for scans of DNS records
+        :param view: DNS view (defaults to the client DNS view)
+        """
+        zones = self.util.iter_get('zone_auth',
+                                   {'view': view or self.iba_dns_view},
+                                   'fqdn', page_size=self.page_size or 1000)
+        return [{'zone': zone['fqdn']} for zone in zones]
+
+    def network_shards(self, network_container=None):
+        """ Returns one scan shard per network of the network view, for
+            scans of ipv4address or other objects searchable by network
+        :param network_container: only the networks in this container in
+            CIDR format (optional)
+        """
+        query_params = {'network_view': self.iba_network_view}
+        if network_container is not None:
+            query_params['network_container'] = network_container
+        networks = self.util.iter_get('network', query_params, 'network',
+                                      page_size=self.page_size or 1000)
+        return [{'network': network['network']} for network in networks]
 
     def get_network_extattrs(self, network, attributes=None):
         """ Implements IBA REST API call to retrieve network extensible attributes
@@ -1006,20 +3917,23 @@ class Infoblox(object):
         except ValueError:
             raise InfobloxGeneralException(r)
 
-    def update_network_extattrs(self, network, attributes):
+    def update_network_extattrs(self, network, attributes, timeout=None):
         """ Implements IBA REST API call to add or update network extensible attributes
         :param network: network in CIDR format
         :param attributes: hash table of extensible attributes with attribute
             name as a hash key
+        :param timeout: time budget in seconds for the whole call (optional)
         """
+        deadline = self._deadline(timeout)
         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
             self.iba_wapi_version + '/network?network=' + \
             network + '&network_view=' + self.iba_network_view + \
             '&_return_fields=network,extattrs'
         extattrs = {}
         try:
-            r = self.session.get(url=rest_url)
+            r = self.session.get(url=rest_url, timeout=deadline)
             r_json = r.json()
+            self._remember_refs(r_json)
             if r.status_code == 200:
                 if len(r_json) > 0:
                     network_ref = r_json[0]['_ref']
@@ -1032,7 +3946,8 @@ class Infoblox(object):
                         rest_url = 'https://' + self.iba_host + \
                             '/wapi/v' + self.iba_wapi_version + \
                             '/' + network_ref
-                        r = self.session.put(url=rest_url, data=payload)
+                        r = self.session.put(url=rest_url, data=payload,
+                                             timeout=deadline)
                         if r.status_code == 200:
                             return
                         else:
@@ -1054,18 +3969,21 @@ class Infoblox(object):
         except ValueError:
             raise InfobloxGeneralException(r)
 
-    def delete_network_extattrs(self, network, attributes):
+    def delete_network_extattrs(self, network, attributes, timeout=None):
         """ Implements IBA REST API call to delete network extensible attributes
         :param network: network in CIDR format
         :param attributes: array of extensible attribute names
+        :param timeout: time budget in seconds for the whole call (optional)
         """
+        deadline = self._deadline(timeout)
         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
             self.iba_wapi_version + '/network?network=' + \
             network + '&network_view=' + self.iba_network_view + \
             '&_return_fields=network,extattrs'
         try:
-            r = self.session.get(url=rest_url)
+            r = self.session.get(url=rest_url, timeout=deadline)
             r_json = r.json()
+            self._remember_refs(r_json)
             if r.status_code == 200:
                 if len(r_json) > 0:
                     network_ref = r_json[0]['_ref']
@@ -1078,7 +3996,8 @@ class Infoblox(object):
                             json.JSONEncoder().encode(extattrs) + '}'
                         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
                             self.iba_wapi_version + '/' + network_ref
-                        r = self.session.put(url=rest_url, data=payload)
+                        r = self.session.put(url=rest_url, data=payload,
+                                             timeout=deadline)
                         if r.status_code == 200:
                             return
                         else:
@@ -1112,6 +4031,8 @@ class Infoblox(object):
             r = self.session.post(url=rest_url, data=payload)
             r_json = r.json()
             if r.status_code == 200 or r.status_code == 201:
+                if self.network_index is not None:
+                    self.network_index.add(network)
                 return
             else:
                 if 'text' in r_json:
@@ -1121,15 +4042,31 @@ class Infoblox(object):
         except ValueError:
             raise InfobloxGeneralException(r)
 
-    def delete_network(self, network):
+    def delete_network(self, network, timeout=None,
+                       single_request=None):
         """ Implements IBA REST API call to delete DHCP network object
         :param network: network in CIDR format
+        :param timeout: time budget in seconds for the whole call (optional)
+        :param single_request: look up and delete in one chained request
+            (defaults to the single_request_deletes client option)
         """
+        deadline = self._deadline(timeout)
+        if self._delete_cached('network', network, self.iba_network_view,
+                               deadline):
+            self._unindex_network(network)
+            return
+        if self._single_request(single_request):
+            if self._delete_found(
+                    'network', {'network': network,
+                                'network_view': self.iba_network_view},
+                    deadline):
+                self._unindex_network(network)
+                return
         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
             self.iba_wapi_version + '/network?network=' + \
             network + '&network_view=' + self.iba_network_view
         try:
-            r = self.session.get(url=rest_url)
+            r = self.session.get(url=rest_url, timeout=deadline)
             r_json = r.json()
             if r.status_code == 200:
                 if len(r_json) > 0:
@@ -1137,8 +4074,10 @@ class Infoblox(object):
                     if network_ref:
                         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
                             self.iba_wapi_version + '/' + network_ref
-                        r = self.session.delete(url=rest_url)
+                        r = self.session.delete(url=rest_url, timeout=deadline)
+                        self._forget_ref(network_ref)
                         if r.status_code == 200:
+                            self._unindex_network(network)
                             return
                         else:
                             if 'text' in r_json:
@@ -1180,15 +4119,30 @@ class Infoblox(object):
         except ValueError:
             raise InfobloxGeneralException(r)
 
-    def delete_networkcontainer(self, networkcontainer):
+    def delete_networkcontainer(self, networkcontainer, timeout=None,
+                                single_request=None):
         """ Implements IBA REST API call to delete DHCP network container object
         :param networkcontainer: network container in CIDR format
+        :param timeout: time budget in seconds for the whole call (optional)
+        :param single_request: look up and delete in one chained request
+            (defaults to the single_request_deletes client option)
         """
+        deadline = self._deadline(timeout)
+        if self._delete_cached('networkcontainer', networkcontainer,
+                               self.iba_network_view, deadline):
+            return
+        if self._single_request(single_request):
+            if self._delete_found(
+                    'networkcontainer',
+                    {'network': networkcontainer,
+                     'network_view': self.iba_network_view},
+                    deadline):
+                return
         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
             self.iba_wapi_version + '/networkcontainer?network=' + \
             networkcontainer + '&network_view=' + self.iba_network_view
         try:
-            r = self.session.get(url=rest_url)
+            r = self.session.get(url=rest_url, timeout=deadline)
             r_json = r.json()
             if r.status_code == 200:
                 if len(r_json) > 0:
@@ -1196,7 +4150,8 @@ class Infoblox(object):
                     if network_ref:
                         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
                             self.iba_wapi_version + '/' + network_ref
-                        r = self.session.delete(url=rest_url)
+                        r = self.session.delete(url=rest_url, timeout=deadline)
+                        self._forget_ref(network_ref)
                         if r.status_code == 200:
                             return
                         else:
@@ -1218,18 +4173,20 @@ class Infoblox(object):
         except ValueError:
             raise InfobloxGeneralException(r)
 
-    def get_next_available_network(self, networkcontainer, cidr):
+    def get_next_available_network(self, networkcontainer, cidr, timeout=None):
         """ Implements IBA REST API call to retrieve next available network
             of network container
         Returns network address in CIDR format
         :param networkcontainer: network container address in CIDR format
         :param cidr: requested network length (from 0 to 32)
+        :param timeout: time budget in seconds for the whole call (optional)
         """
+        deadline = self._deadline(timeout)
         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
             self.iba_wapi_version + '/networkcontainer?network=' + \
             networkcontainer + '&network_view=' + self.iba_network_view
         try:
-            r = self.session.get(url=rest_url)
+            r = self.session.get(url=rest_url, timeout=deadline)
             r_json = r.json()
             if r.status_code == 200:
                 if len(r_json) > 0:
@@ -1238,7 +4195,7 @@ class Infoblox(object):
                         self.iba_wapi_version + '/' + net_ref + \
                         '?_function=next_available_network&cidr=' + \
                         str(cidr) + '&num=1'
-                    r = self.session.post(url=rest_url)
+                    r = self.session.post(url=rest_url, timeout=deadline)
                     r_json = r.json()
                     if r.status_code == 200:
                         network = r_json['networks'][0]
@@ -1271,14 +4228,15 @@ class Infoblox(object):
         :param not_found_fail: Raise an exception if nothing is found.
         """
 
-        r_json = self.util.get('record:a',
-                               query_params={
-                                   'ipv4addr': ipaddr
-                               },
-                               fields=fields,
-                               notFoundText="No A record found: " + ipaddr,
-                               notFoundFail=not_found_fail
-                               )
+        r_json = self._lookup('record:a', None,
+                              query_params={
+                                  'ipv4addr': ipaddr
+                              },
+                              fields=fields,
+                              notFoundText="No A record found: " + ipaddr,
+                              notFoundFail=not_found_fail,
+                              page_size=self.page_size
+                              )
         return r_json
 
     def get_a_record_by_fqdn(self, fqdn):
@@ -1324,7 +4282,8 @@ class Infoblox(object):
             },
             fields=fields,
             notFoundText="No requested network found: " + network,
-            notFoundFail=not_found_fail
+            notFoundFail=not_found_fail,
+            page_size=self.page_size
         )
 
         return r_json
@@ -1347,42 +4306,52 @@ class Infoblox(object):
         return r_json
 
     def get_fixed_address(self, ipv4addr, mac,
-                          fields=None, not_found_fail=True):
+                          fields=None, not_found_fail=True, timeout=None):
         """Get a Fixed Address Record
         :param ipv4addr: IPv4 Address of object to get
         :param mac: Mac Address of object to get
+        :param timeout: time budget in seconds for the whole call (optional)
         """
         notFoundText = "Fixed Address not found for IP: %s, MAC: %s" % (ipv4addr, mac)
-        r_json = self.util.get(
-            'fixedaddress',
+        r_json = self._lookup(
+            'fixedaddress', None,
             query_params={
                 'mac': mac,
                 'ipv4addr': ipv4addr,
             },
             fields=fields,
             notFoundText=notFoundText,
-            notFoundFail=not_found_fail
+            notFoundFail=not_found_fail,
+            timeout=self._deadline(timeout)
         )
         return r_json
 
-    def delete_fixed_address(self, ipv4addr, mac, not_found_fail=True):
+    def delete_fixed_address(self, ipv4addr, mac, not_found_fail=True,
+                             timeout=None):
         """Delete a Fixed Address Record
         :param ipv4addr: IPv4 Address of object to delete
         :param mac: Mac Address of object to delete
+        :param timeout: time budget in seconds for the whole call (optional)
         """
-        ref = self.get_fixed_address(ipv4addr=ipv4addr, mac=mac, not_found_fail=not_found_fail)
+        deadline = self._deadline(timeout)
+        ref = self.get_fixed_address(ipv4addr=ipv4addr, mac=mac,
+                                     not_found_fail=not_found_fail,
+                                     timeout=deadline)
         notFoundText = "Fixed Address not found for ref: %s" % (ref)
         r_json = self.util.delete_by_ref(
             ref[0]['_ref'],
             notFoundText=notFoundText,
-            notFoundFail=not_found_fail
+            notFoundFail=not_found_fail,
+            timeout=deadline
         )
         return r_json
 
-    def get_grid(self, name=None, fields=None, not_found_fail=True):
+    def get_grid(self, name=None, fields=None, not_found_fail=True,
+                 timeout=None):
         """Get a Grid Object
         :param query_params: Dictionary of searchable fields on Grid object.
         :param fields: Fields to return from the Grid object
+        :param timeout: time budget in seconds for the whole call (optional)
         """
         query_params = None
         if name is not None:
@@ -1393,21 +4362,41 @@ class Infoblox(object):
             query_params=query_params,
             fields=fields,
             notFoundText=notFoundText,
-            notFoundFail=not_found_fail
+            notFoundFail=not_found_fail,
+            timeout=self._deadline(timeout)
         )
         return r_json
 
-    def restart_grid_services(self, payload, name=None):
+    def restart_grid_services(self, payload, name=None, timeout=None):
         """Restart Grid Services
         :param name: Name of a Grid object.
         :param payload: Dictionary of fields used to restart services.
+        :param timeout: time budget in seconds for the whole call (optional)
         """
-        ref = self.get_grid(name=name)
+        deadline = self._deadline(timeout)
+        ref = self._cached_ref('grid', name)
+        if ref is not None:
+            try:
+                return self.util.post(
+                    uri='%s?_function=restartservices' % ref,
+                    payload=payload,
+                    fields=None,
+                    timeout=deadline
+                )
+            except requests.exceptions.HTTPError as e:
+                if not is_not_found(e):
+                    raise
+                self._forget_ref(ref)
+        ref = self.get_grid(name=name, timeout=deadline)
+        if self.ref_cache is not None:
+            # also cache the grid under the name searched, None included
+            self.ref_cache.put(ref[0]['_ref'], ('grid', name, None))
         uri = '%s?_function=restartservices' % ref[0]['_ref']
         r_json = self.util.post(
             uri=uri,
             payload=payload,
-            fields=None
+            fields=None,
+            timeout=deadline
         )
         return r_json
 
@@ -1418,6 +4407,7 @@ class Infoblox(object):
             uri='grid:servicerestart:request:changedobject',
             fields=fields,
             notFoundFail=notFoundFail,
+            page_size=self.page_size
         )
         return r_json
 
@@ -1432,14 +4422,209 @@ class Infoblox(object):
             query_params=query_params,
             fields=fields,
             notFoundText="No Lease found.",
-            notFoundFail=not_found_fail
+            notFoundFail=not_found_fail,
+            page_size=self.page_size
         )
 
         return r_json
 
 
+_JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class JsonStream(object):
+    """ Decodes a JSON array, or the result array of a paged WAPI response,
+    one element at a time as the body arrives
+
+    Only the text of the element being decoded is buffered, so memory use
+    does not grow with the size of the response. The other members of a
+    paged response, such as next_page_id, are collected in fields as they
+    are read. Malformed or truncated JSON raises ValueError.
+    """
+
+    def __init__(self, chunks, response=None):
+        """ Class initialization method
+        :param chunks: iterable of the bytes of the body, in order
+        :param response: response closed once the body is decoded (optional)
+        """
+        self.fields = {}
+        self.response = response
+        self._chunks = iter(chunks)
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._json = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def __iter__(self):
+        return self._elements()
+
+    def close(self):
+        if self.response is not None:
+            self.response.close()
+
+    def _elements(self):
+        try:
+            char = self._next_char()
+            if char == '[':
+                for element in self._array():
+                    yield element
+            elif char == '{':
+                for element in self._object():
+                    yield element
+            else:
+                raise ValueError('Expected a JSON array or object, got %r' %
+                                 (char,))
+            # only whitespace may follow, read up to the end of the body
+            while True:
+                self._pos = _JSON_WHITESPACE.match(self._buffer,
+                                                   self._pos).end()
+                if self._pos < len(self._buffer):
+                    raise ValueError('Extra data after the JSON value')
+                if not self._fill(1):
+                    return
+        finally:
+            self.close()
+
+    def _array(self):
+        self._pos += 1
+        if self._next_char() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            char = self._next_char()
+            self._pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError('Expected , or ] in array, got %r' % (char,))
+
+    def _object(self):
+        self._pos += 1
+        if self._next_char() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self._value()
+            if self._next_char() != ':':
+                raise ValueError('Expected : after %r' % (key,))
+            self._pos += 1
+            if key == 'result' and self._next_char() == '[':
+                for element in self._array():
+                    yield element
+            else:
+                self.fields[key] = self._value()
+            char = self._next_char()
+            self._pos += 1
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError('Expected , or } in object, got %r' %
+                                 (char,))
+
+    def _next_char(self):
+        """ Skips whitespace and returns the next character, unread """
+        while True:
+            self._pos = _JSON_WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill(1):
+                raise ValueError('Truncated JSON')
+
+    def _value(self):
+        self._next_char()
+        while True:
+            pending = len(self._buffer) - self._pos
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+            except ValueError:
+                # wait for twice the text so that a large element is not
+                # decoded again for every chunk
+                if not self._fill(2 * pending):
+                    raise
+                continue
+            # a number ending the buffer may go on in the next chunk
+            if end == len(self._buffer) and self._fill(pending + 1):
+                continue
+            self._pos = end
+            return value
+
+    def _fill(self, size):
+        """ Reads chunks until size characters are buffered past the read
+            position or the body ends, returns False if nothing was added
+        """
+        if self._eof:
+            return False
+        text = [self._buffer[self._pos:]]
+        buffered = length = len(text[0])
+        while length < size:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self._eof = True
+                chunk = self._text.decode(b'', True)
+            else:
+                chunk = self._text.decode(chunk)
+            text.append(chunk)
+            length += len(chunk)
+            if self._eof:
+                break
+        self._buffer = ''.join(text)
+        self._pos = 0
+        return length > buffered
+
+
+def prefix_shards(field='name', chars='abcdefghijklmnopqrstuvwxyz0123456789'):
+    """ Returns shards for Util.iter_scan splitting a search on the first
+        character of a field: one shard per character and one for the names
+        starting with any other, so that every object is in exactly one
+    :param field: searched field (e.g. -- name, fqdn)
+    :param chars: letters and digits starting the names of one shard each
+    """
+    if not chars or not all(c.isalnum() for c in chars):
+        raise InfobloxBadInputParameter(
+            'Shard characters must be letters or digits: %r' % (chars,))
+    chars = ''.join(sorted(set(chars)))
+    shards = [{field + '~': '^' + c} for c in chars]
+    shards.append({field + '~': '^[^' + chars + ']'})
+    return shards
+
+
+class _Prefetch(object):
+    """ Runs function(*args) in a background thread until result() """
+
+    def __init__(self, function, *args):
+        self._value = None
+        self._error = None
+        self._thread = threading.Thread(target=self._run,
+                                        args=(function, args))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, function, args):
+        try:
+            self._value = function(*args)
+        except Exception as e:
+            self._error = e
+
+    def result(self):
+        """ Waits for the function and returns its result or raises """
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
 class Util(object):
 
+    # bytes read at a time from streamed responses
+    chunk_size = 65536
+    # RefCache filled with the _refs of the responses (optional)
+    ref_cache = None
+    # NegativeCache invalidated by the objects created or renamed (optional)
+    negative_cache = None
+
     def __init__(self,
                  session,
                  iba_ipaddr,
@@ -1469,25 +4654,32 @@ class Util(object):
         self.iba_verify_ssl = iba_verify_ssl
 
     def get(self, uri, query_params=None, fields=None,
-            notFoundText=None, notFoundFail=True):
+            notFoundText=None, notFoundFail=True, timeout=None,
+            page_size=None):
         """Execute a get operation.
         :param uri: The URI component (e.g. -- lease, record:a)
         :param query_params: Key/Value query parameter dictonary.
         :param return_fields: String or list of fields to return.
         :param notFoundText: Exception text when get returns no data.
         :param notFoundFail: Raise an exception if nothing is found.
+        :param timeout: request timeout in seconds or Deadline (optional)
+        :param page_size: fetch the results in pages of this many objects
+            with iter_get instead of in one response (optional)
         """
 
+        if page_size is not None:
+            r_json = list(self.iter_get(uri, query_params, fields,
+                                        page_size=page_size,
+                                        timeout=timeout))
+            if len(r_json) > 0:
+                return r_json
+            elif notFoundFail:
+                raise InfobloxNotFoundException(notFoundText)
+            return None
+
         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
                    self.iba_wapi_version + '/' + uri
-
-        if query_params is None:
-            query_params = {}
-        if fields is not None:
-            if type(fields) == str:
-                query_params['_return_fields'] = fields
-            else:
-                query_params['_return_fields'] = ','.join(fields)
+        query_params = self._query_params(query_params, fields)
 
         try:
             if False:  # If debug is enabled, etc...
@@ -1498,9 +4690,11 @@ class Util(object):
                                for (key, val) in query_params.items()))
 
             r = self.session.get(url=rest_url,
-                                 params=query_params)
+                                 params=query_params,
+                                 timeout=timeout)
 
             r_json = r.json()
+            self._remember_refs(r_json)
 
             if False:  # If debug is enabled, etc...
                 print("RESULT")
@@ -1522,10 +4716,188 @@ class Util(object):
         except ValueError:
             raise InfobloxGeneralException(r)
 
-    def put(self, record, payload, confirm=True):
+    def iter_get(self, uri, query_params=None, fields=None, page_size=1000,
+                 prefetch=True, timeout=None):
+        """Yields the objects found by a search, fetching them page by page.
+
+        Uses WAPI paging (_paging, _max_results and _page_id, WAPI 1.5+) so
+        that no single response has to hold the whole result set, and
+        decodes every response one object at a time as it arrives (see
+        JsonStream). As soon as the id of the next page is read, that page
+        is requested in a background thread. A grid answering with a plain
+        list is taken as one page.
+        :param uri: The URI component (e.g. -- lease, record:a)
+        :param query_params: Key/Value query parameter dictonary.
+        :param fields: String or list of fields to return.
+        :param page_size: number of objects fetched per request, None to
+            send the search unpaged
+        :param prefetch: fetch the next page while the current one is read
+        :param timeout: request timeout in seconds or Deadline (optional)
+        """
+        if page_size is not None and page_size < 1:
+            raise InfobloxBadInputParameter(
+                'page_size must be at least 1: %r' % (page_size,))
+        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
+                   self.iba_wapi_version + '/' + uri
+        query_params = self._query_params(query_params, fields)
+        if page_size is not None:
+            query_params.update({'_paging': 1,
+                                 '_max_results': page_size,
+                                 '_return_as_object': 1})
+        page = self._get_page(rest_url, query_params, timeout)
+        if page.response is not None and page.response.url:
+            # the page cursor lives on the grid member that served the
+            # first page, a read endpoint or a grid master candidate
+            rest_url = urlunsplit(urlsplit(rest_url)[:1] +
+                                  urlsplit(page.response.url)[1:2] +
+                                  urlsplit(rest_url)[2:])
+        fetch = None
+        try:
+            while True:
+                try:
+                    for obj in page:
+                        self._remember_refs(obj)
+                        page_id = page.fields.get('next_page_id')
+                        if prefetch and page_id and fetch is None:
+                            fetch = _Prefetch(
+                                self._get_page, rest_url,
+                                dict(query_params, _page_id=page_id),
+                                timeout)
+                        yield obj
+                except ValueError as e:
+                    raise InfobloxGeneralException(
+                        'Invalid response to %s: %s' % (rest_url, e))
+                page_id = page.fields.get('next_page_id')
+                if not page_id:
+                    return
+                if fetch is None:
+                    page = self._get_page(rest_url,
+                                          dict(query_params,
+                                               _page_id=page_id),
+                                          timeout)
+                else:
+                    page, fetch = fetch.result(), None
+        finally:
+            page.close()
+            if fetch is not None:
+                try:
+                    fetch.result().close()
+                except Exception:
+                    pass
+
+    def _get_page(self, rest_url, query_params, timeout):
+        """ Returns a JsonStream over the objects of one page """
+        r = self.session.get(url=rest_url,
+                             params=query_params,
+                             timeout=timeout,
+                             stream=True)
+        chunks = self.session.iter_content(r, self.chunk_size)
+        try:
+            # an undecodable compressed body fails on its first chunk
+            first = [next(chunks)]
+        except StopIteration:
+            first = []
+        except requests.exceptions.ContentDecodingError:
+            r.close()
+            r = self.session.get(url=rest_url,
+                                 params=query_params,
+                                 headers=self.session.uncompressed(),
+                                 timeout=timeout,
+                                 stream=True)
+            chunks = self.session.iter_content(r, self.chunk_size)
+            first = []
+        return JsonStream(itertools.chain(first, chunks), r)
+
+    def iter_scan(self, uri, shards, query_params=None, fields=None,
+                  page_size=1000, concurrency=4, timeout=None):
+        """Yields the objects found by a search split into shards, paging
+        through up to concurrency shards at the same time.
+
+        Every shard is a dict of query parameters added to query_params to
+        select its part of the objects (see prefix_shards), the shards must
+        not overlap. Objects are yielded as the pages of any shard arrive,
+        in no particular order; at most concurrency pages wait to be read.
+        The session should keep at least concurrency connections open.
+        :param uri: The URI component (e.g. -- record:host, ipv4address)
+        :param shards: iterable of dicts of query parameters
+        :param query_params: Key/Value query parameter dictonary.
+        :param fields: String or list of fields to return.
+        :param page_size: number of objects fetched per request, None to
+            send every shard unpaged
+        :param concurrency: maximum number of requests in flight
+        :param timeout: request timeout in seconds or Deadline (optional)
+        """
+        if concurrency < 1:
+            raise InfobloxBadInputParameter(
+                'concurrency must be at least 1: %r' % (concurrency,))
+        shards = collections.deque(shards)
+        # unpaged shards are buffered as if in pages of 1000
+        results = queue.Queue(concurrency * (page_size or 1000))
+        stop = threading.Event()
+        done = object()
+
+        def scan():
+            try:
+                while not stop.is_set():
+                    try:
+                        shard = shards.popleft()
+                    except IndexError:
+                        return
+                    params = dict(query_params or {})
+                    params.update(shard)
+                    objects = self.iter_get(uri, params, fields,
+                                            page_size=page_size,
+                                            prefetch=False, timeout=timeout)
+                    try:
+                        for obj in objects:
+                            results.put((None, obj))
+                            if stop.is_set():
+                                return
+                    finally:
+                        objects.close()
+            except Exception as e:
+                results.put((e, None))
+            finally:
+                results.put(done)
+
+        running = min(concurrency, len(shards))
+        for _ in range(running):
+            thread = threading.Thread(target=scan)
+            thread.daemon = True
+            thread.start()
+        try:
+            while running:
+                item = results.get()
+                if item is done:
+                    running -= 1
+                    continue
+                error, obj = item
+                if error is not None:
+                    raise error
+                yield obj
+        finally:
+            stop.set()
+            # let the workers still putting objects see stop
+            while running:
+                if results.get() is done:
+                    running -= 1
+
+    @staticmethod
+    def _query_params(query_params, fields):
+        # the caller's dict may be shared with other threads, never modify it
+        query_params = dict(query_params or {})
+        if fields is not None:
+            if type(fields) == str:
+                query_params['_return_fields'] = fields
+            else:
+                query_params['_return_fields'] = ','.join(fields)
+        return query_params
+
+    def put(self, record, payload, confirm=True, timeout=None):
         """Execute a put operation to update a record.
         :param record: The record to update.
         :param payload: payload to be updated.
+        :param timeout: request timeout in seconds or Deadline (optional)
         """
 
         ref = record['_ref']
@@ -1537,15 +4909,25 @@ class Util(object):
             print("DRY-RUN -- NO CHANGES MADE")
             return
 
-        r = self.session.put(url=rest_url,
-                             data=json.dumps(payload))
+        try:
+            r = self.session.put(url=rest_url,
+                                 data=json.dumps(payload),
+                                 timeout=timeout)
+        finally:
+            # a rename changes the _ref of the record
+            self._forget_ref(ref)
 
         if r.status_code == 200:
+            self._invalidate_misses(ref)
+            try:
+                self._remember_refs(r.json())
+            except ValueError:
+                pass
             return
 
         raise InfobloxNotUpdatedException("Failed to update " + ref)
 
-    def post(self, uri, payload, fields, confirm=True):
+    def post(self, uri, payload, fields, confirm=True, timeout=None):
 
         rest_url = 'https://' + self.iba_host + '/wapi/v' + \
                    self.iba_wapi_version + '/' + uri
@@ -1567,9 +4949,12 @@ class Util(object):
         try:
             r = self.session.post(url=rest_url,
                                   params=query_params,
-                                  data=json.dumps(payload))
+                                  data=json.dumps(payload),
+                                  timeout=timeout)
             r_json = r.json()
             if r.status_code == 200 or r.status_code == 201:
+                self._remember_refs(r_json)
+                self._invalidate_misses(uri, payload)
                 return r_json
             else:
                 if 'text' in r_json:
@@ -1579,17 +4964,72 @@ class Util(object):
         except ValueError:
             raise InfobloxGeneralException(r)
 
-    def delete_by_ref(self, ref, notFoundText=None, notFoundFail=True):
+    def _remember_refs(self, r_json):
+        if self.ref_cache is not None:
+            self.ref_cache.update(r_json)
+
+    def _forget_ref(self, ref):
+        if self.ref_cache is not None:
+            self.ref_cache.discard(ref)
+
+    def _invalidate_misses(self, obj, payload=None):
+        if self.negative_cache is not None:
+            view = None
+            if isinstance(payload, dict):
+                view = payload.get('view')
+            # the object type of a URI, function call or _ref
+            self.negative_cache.invalidate(obj.partition('?')[0]
+                                           .partition('/')[0], view)
+
+    def multi_request(self, operations, confirm=True, timeout=None):
+        """Execute operations in one request, as a single transaction.
+        :param operations: list of dicts with the method, object and
+            optionally data and args of each operation.
+        :param timeout: request timeout in seconds or Deadline (optional)
+        Returns the list of the operation results.
+        """
+
+        rest_url = 'https://' + self.iba_host + '/wapi/v' + \
+                   self.iba_wapi_version + '/request'
+
+        logger.debug('Multi-request [%s] with [%d] operations',
+                     rest_url, len(operations))
+        if not confirm:
+            logger.debug('DRY-RUN -- NO CHANGES MADE')
+            return
+
+        try:
+            r = self.session.post(url=rest_url,
+                                  data=json.dumps(operations),
+                                  timeout=timeout)
+        except requests.exceptions.HTTPError as e:
+            try:
+                text = e.response.json()['text']
+            except (AttributeError, KeyError, TypeError, ValueError):
+                raise e
+            raise InfobloxGeneralException(text)
+        for operation in operations:
+            if operation.get('method') in ('POST', 'PUT'):
+                self._invalidate_misses(operation.get('object', ''),
+                                        operation.get('data'))
+        try:
+            return r.json()
+        except ValueError:
+            raise InfobloxGeneralException(r)
+
+    def delete_by_ref(self, ref, notFoundText=None, notFoundFail=True,
+                      timeout=None):
         """Execute a get operation.
         :param ref: Reference to object to delete.
         :param notFoundText: Exception text when get returns no data.
         :param notFoundFail: Raise an exception if nothing is found.
+        :param timeout: request timeout in seconds or Deadline (optional)
         """
 
         rest_url = 'https://%s/wapi/v%s/%s' % (self.iba_host, self.iba_wapi_version, ref)
 
         try:
-            r = self.session.delete(url=rest_url)
+            r = self.session.delete(url=rest_url, timeout=timeout)
         except requests.exceptions.HTTPError as e:
             if notFoundFail:
                 raise InfobloxNotFoundException(notFoundText)
@@ -1611,3 +5051,5 @@ class Util(object):
                     r.raise_for_status()
         except ValueError:
             raise InfobloxGeneralException(r)
+        finally:
+            self._forget_ref(ref)
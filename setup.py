@@ -49,6 +49,10 @@ setup(
     },
     include_package_data=True,
     install_requires=requirements,
+    extras_require={
+        # infoblox.asyncinfoblox needs python 3.5+
+        'async': ['aiohttp>=3.3; python_version >= "3.5"'],
+    },
     license="Apache Software License, Version 2.0",
     keywords='infoblox',
     classifiers=[
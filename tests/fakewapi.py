@@ -0,0 +1,218 @@
+""" In-memory WAPI server answering host record requests over HTTP
+
+Used by the tests and benchmarks needing real connections and threads:
+
+    server = FakeWapi()
+    server.start()
+    iba_api = server.client(pool_maxsize=16)
+    ...
+    server.stop()
+"""
+import base64
+import json
+import threading
+import time
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlsplit, parse_qs
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlsplit, parse_qs
+
+from infoblox import infoblox
+
+
+def host_ref(fqdn):
+    key = base64.b64encode(('dns.host$._default.' + fqdn).encode('utf-8'))
+    return 'record:host/%s:%s/default' % (key.decode('ascii').rstrip('='),
+                                          fqdn)
+
+
+def network_ref(network):
+    return 'network/ZG5zLm5ldHdvcmskMA:%s/default' % network
+
+
+class WapiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def reply(self, status, data, headers=None):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_request(self, method):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        with server.lock:
+            server.requests += 1
+        headers = {}
+        if 'Authorization' in self.headers:
+            with server.lock:
+                server.logins += 1
+            headers['Set-Cookie'] = 'ibapauth="session"; path=/'
+        elif 'ibapauth' not in self.headers.get('Cookie', ''):
+            return self.reply(401, {'text': 'Authorization required'})
+        parts = urlsplit(self.path)
+        obj = parts.path.split('/', 3)[3]
+        params = dict((k, v[0]) for k, v in parse_qs(parts.query).items())
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length) or 'null')
+        status, data = getattr(self.server, method)(obj, params, payload)
+        self.reply(status, data, headers)
+
+    def do_GET(self):
+        self.handle_request('get')
+
+    def do_POST(self):
+        self.handle_request('post')
+
+    def do_DELETE(self):
+        self.handle_request('delete')
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeWapi(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, latency=0.0):
+        """
+        :param latency: seconds each request takes on the server
+        """
+        HTTPServer.__init__(self, ('127.0.0.1', 0), WapiHandler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.logins = 0
+        self.requests = 0
+        self.hosts = {}
+        self.networks = {}
+
+    @property
+    def address(self):
+        return '127.0.0.1:%d' % self.server_address[1]
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever,
+                                       args=(0.05,))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def client(self, **kwargs):
+        """ Returns an Infoblox client talking to this server over HTTP """
+        iba_api = infoblox.Infoblox(self.address, 'foo', 'bar', '1.6',
+                                    'default', 'default', **kwargs)
+        iba_api.session.trust_env = False
+        send = iba_api.session.request
+
+        def request(method, url, *args, **kw):
+            # the fake grid speaks plain HTTP
+            return send(method, url.replace('https://', 'http://', 1),
+                        *args, **kw)
+        iba_api.session.request = request
+        return iba_api
+
+    def add_host(self, fqdn, address):
+        with self.lock:
+            self.hosts[fqdn] = {'_ref': host_ref(fqdn), 'name': fqdn,
+                                'view': 'default',
+                                'ipv4addrs': [{'ipv4addr': address}]}
+
+    def add_network(self, network, addresses):
+        with self.lock:
+            self.networks[network] = list(addresses)
+
+    def get(self, obj, params, payload):
+        if obj == 'network':
+            with self.lock:
+                found = params.get('network') in self.networks
+            return 200, [{'_ref': network_ref(params['network']),
+                          'network': params['network']}] if found else []
+        if obj != 'record:host':
+            return 400, {'text': 'Unknown object type %s' % obj}
+        with self.lock:
+            host = self.hosts.get(params.get('name'))
+            return 200, [dict(host)] if host else []
+
+    def post(self, obj, params, payload):
+        if obj == 'request':
+            return self.multi_request(payload)
+        if obj.startswith('network/'):
+            return self.next_available_ip(obj, params)
+        if obj != 'record:host':
+            return 400, {'text': 'Unknown object type %s' % obj}
+        address = payload['ipv4addrs'][0]['ipv4addr']
+        with self.lock:
+            exists = payload['name'] in self.hosts
+        if exists:
+            return 400, {'code': 'Client.Ibap.Data.Conflict',
+                         'text': 'The record already exists'}
+        self.add_host(payload['name'], address)
+        if '_return_fields' in params:
+            with self.lock:
+                return 201, dict(self.hosts[payload['name']])
+        return 201, host_ref(payload['name'])
+
+    def delete(self, obj, params, payload):
+        fqdn = obj.rsplit(':', 1)[1].split('/')[0]
+        with self.lock:
+            if self.hosts.pop(fqdn, None) is None:
+                return 404, {'text': 'Reference not found'}
+        return 200, obj
+
+    def next_available_ip(self, obj, params):
+        network = obj.split(':', 1)[1].rsplit('/', 1)[0]
+        with self.lock:
+            if network not in self.networks:
+                return 400, {'code': 'Client.Ibap.Proto',
+                             'text': 'Reference %s not found' % obj}
+            free = self.networks[network]
+            if not free:
+                return 400, {'code': 'Client.Ibap.Data',
+                             'text': 'No free IP available'}
+            return 200, {'ips': [free.pop(0)]}
+
+    def multi_request(self, operations):
+        """ Runs the operations in order, undoing them all if one fails """
+        with self.lock:
+            hosts = dict(self.hosts)
+        state = {}
+        results = []
+        for operation in operations:
+            obj = operation['object']
+            if operation.get('enable_substitution'):
+                for name, value in state.items():
+                    obj = obj.replace('##STATE:%s:##' % name, value)
+            params = dict(operation.get('args') or {})
+            if operation['method'] == 'GET':
+                params.update(operation.get('data') or {})
+            status, data = getattr(self, operation['method'].lower())(
+                obj, params, operation.get('data'))
+            if status < 400 and operation.get('assign_state'):
+                if not data:
+                    status, data = 400, {'text': 'State assignment failed'}
+                else:
+                    for name, field in operation['assign_state'].items():
+                        state[name] = data[0][field]
+            if status >= 400:
+                with self.lock:
+                    self.hosts = hosts
+                return 400, {'Error': 'AdmConProtoError: %s' % data['text'],
+                             'text': data['text']}
+            if not operation.get('discard'):
+                results.append(data)
+        return 200, results
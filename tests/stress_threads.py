@@ -0,0 +1,87 @@
+""" Stress benchmark of one Infoblox client shared by many threads
+
+Runs get_host lookups against a local fake WAPI with an increasing number
+of threads, checks every answer belongs to the host asked for and prints
+the throughput:
+
+    python -m tests.stress_threads --threads 1,2,4,8,16,32,64
+
+--latency simulates the time the grid takes to answer a request; with the
+default the run is bound by the network round trips like against a real
+grid rather than by the in-process server.
+"""
+import argparse
+import threading
+import time
+
+from . import fakewapi
+
+HOSTS = 256
+
+
+def run(server, threads, requests):
+    iba_api = server.client(pool_maxsize=threads)
+    iba_api.get_host('host0.domain.com')
+    corrupted = []
+    errors = []
+    per_thread = requests // threads
+
+    def worker(n):
+        for i in range(per_thread):
+            index = (n * per_thread + i) % HOSTS
+            fqdn = 'host%d.domain.com' % index
+            try:
+                host = iba_api.get_host(fqdn)
+            except Exception as e:
+                errors.append(e)
+                continue
+            if host['name'] != fqdn or \
+                    host['ipv4addrs'][0]['ipv4addr'] != address(index):
+                corrupted.append((fqdn, host))
+
+    workers = [threading.Thread(target=worker, args=(n,))
+               for n in range(threads)]
+    start = time.time()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.time() - start
+    return {'threads': threads, 'requests': per_thread * threads,
+            'seconds': elapsed, 'rate': per_thread * threads / elapsed,
+            'errors': len(errors), 'corrupted': len(corrupted),
+            'connections': iba_api.pool_stats['created']}
+
+
+def address(index):
+    return '10.0.%d.%d' % (index // 256, index % 256)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--threads', default='1,2,4,8,16,32,64',
+                        help='comma-separated thread counts')
+    parser.add_argument('--requests', type=int, default=2000,
+                        help='lookups per run')
+    parser.add_argument('--latency', type=float, default=0.01,
+                        help='seconds the fake grid takes per request')
+    args = parser.parse_args()
+
+    server = fakewapi.FakeWapi(latency=args.latency)
+    for index in range(HOSTS):
+        server.add_host('host%d.domain.com' % index, address(index))
+    server.start()
+    try:
+        print('%7s %8s %8s %10s %7s %9s %11s' % (
+            'threads', 'requests', 'seconds', 'req/s', 'errors',
+            'corrupted', 'connections'))
+        for threads in [int(t) for t in args.threads.split(',')]:
+            result = run(server, threads, args.requests)
+            print('%(threads)7d %(requests)8d %(seconds)8.2f %(rate)10.1f '
+                  '%(errors)7d %(corrupted)9d %(connections)11d' % result)
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+import json
+import threading
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import responses
+from infoblox import infoblox
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6'
+NETWORK_REF = 'network/ZG5zLm5ldHdvcmskMTAuMC4wLjAvMjQvMA:10.0.0.0/24/default'
+
+
+class FakeNetwork(object):
+    """ next_available_ip of a /24 whose addresses below start are used """
+
+    def __init__(self, start=1, end=254):
+        self.used = set('10.0.0.%d' % i for i in range(1, start))
+        self.end = end
+        self.honor_exclude = True
+        self.fetches = []
+        self.lock = threading.Lock()
+
+    def next_available_ip(self, request):
+        payload = json.loads(request.body)
+        exclude = set(payload.get('exclude', []) if self.honor_exclude
+                      else [])
+        with self.lock:
+            self.fetches.append(payload)
+            free = ['10.0.0.%d' % i for i in range(1, self.end + 1)
+                    if '10.0.0.%d' % i not in self.used and
+                    '10.0.0.%d' % i not in exclude]
+        if len(free) < payload['num']:
+            return (400, {}, json.dumps({
+                'code': 'Client.Ibap.Data',
+                'text': 'Cannot find %d available IP addresses' %
+                        payload['num']}))
+        return (200, {}, json.dumps({'ips': free[:payload['num']]}))
+
+
+class TestAddressPool(unittest.TestCase):
+
+    def setUp(self):
+        self.iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                         'default', 'default',
+                                         cookie_auth=False)
+        self.responses = responses.RequestsMock(
+            assert_all_requests_are_fired=False)
+        self.responses.start()
+        self.addCleanup(self.responses.stop)
+        self.addCleanup(self.responses.reset)
+        self.network = FakeNetwork()
+        self.responses.add(responses.GET, BASE_URL + '/network',
+                           body=json.dumps([{'_ref': NETWORK_REF}]))
+        self.responses.add_callback(responses.POST,
+                                    BASE_URL + '/' + NETWORK_REF,
+                                    callback=self.network.next_available_ip)
+
+    def make_pool(self, **kwargs):
+        kwargs.setdefault('block_size', 8)
+        kwargs.setdefault('low_water', 2)
+        kwargs.setdefault('background', False)
+        return self.iba_ipa.address_pool('10.0.0.0/24', **kwargs)
+
+    def test_addresses_handed_out_from_blocks(self):
+        pool = self.make_pool()
+        addresses = [pool.allocate() for _ in range(20)]
+        self.assertEqual(len(set(addresses)), 20)
+        self.assertEqual(addresses[:3], ['10.0.0.1', '10.0.0.2', '10.0.0.3'])
+        self.assertEqual(pool.stats['fetches'], 3)
+        self.assertEqual(len(self.network.fetches), 3)
+
+    def test_held_addresses_excluded(self):
+        pool = self.make_pool()
+        for _ in range(6):
+            pool.allocate()
+        exclude = self.network.fetches[1]['exclude']
+        self.assertEqual(sorted(exclude, key=lambda a: int(a.split('.')[3])),
+                         ['10.0.0.%d' % i for i in range(1, 9)])
+
+    def test_expired_addresses_not_excluded(self):
+        pool = self.make_pool(hold=0)
+        for _ in range(6):
+            pool.allocate()
+        self.assertEqual(len(self.network.fetches[1]['exclude']), 2)
+
+    def test_one_pool_per_network(self):
+        self.assertIs(self.make_pool(), self.iba_ipa.address_pool(
+            '10.0.0.0/24'))
+
+    def test_released_address_reused_first(self):
+        pool = self.make_pool()
+        address = pool.allocate()
+        pool.release(address)
+        self.assertEqual(pool.allocate(), address)
+
+    def test_small_network(self):
+        self.network.end = 3
+        pool = self.make_pool()
+        self.assertEqual([pool.allocate() for _ in range(3)],
+                         ['10.0.0.1', '10.0.0.2', '10.0.0.3'])
+        with self.assertRaises(infoblox.InfobloxNoIPavailableException):
+            pool.allocate()
+
+    def test_no_new_address_fetched(self):
+        self.network.honor_exclude = False
+        pool = self.make_pool(block_size=2, low_water=0)
+        self.assertEqual([pool.allocate() for _ in range(2)],
+                         ['10.0.0.1', '10.0.0.2'])
+        # the grid hands back the held addresses only
+        with self.assertRaises(infoblox.InfobloxNoIPavailableException):
+            pool.allocate()
+        self.assertEqual(len(self.network.fetches), 3)
+        self.assertEqual(len(pool), 0)
+
+    def test_background_refill(self):
+        pool = self.make_pool(background=True)
+        pool.allocate()
+        running = set(threading.enumerate())
+        for _ in range(6):
+            pool.allocate()
+        for thread in set(threading.enumerate()) - running:
+            thread.join(5)
+        self.assertEqual(pool.stats['fetches'], 2)
+        self.assertEqual(len(pool), 9)
+
+    def test_conflict_evicted(self):
+        self.network.used.add('10.0.0.1')
+        conflict = json.dumps({
+            'code': 'Client.Ibap.Data.Conflict',
+            'text': 'The IP address 10.0.0.1 is already used'})
+        created = json.dumps({'ipv4addrs': [{'ipv4addr': '10.0.0.2'}]})
+        self.responses.add(responses.POST, BASE_URL + '/record:host',
+                           status=400, body=conflict)
+        self.responses.add(responses.POST, BASE_URL + '/record:host',
+                           status=201, body=created)
+        pool = self.make_pool()
+        # the pool fetched 10.0.0.1 before another client took it
+        pool._free.append('10.0.0.1')
+        self.assertEqual(pool.create_host_record('h.domain.com'), '10.0.0.2')
+        self.assertEqual(pool.stats['conflicts'], 1)
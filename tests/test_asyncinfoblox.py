@@ -0,0 +1,131 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+try:
+    import asyncio
+    import aiohttp
+    from infoblox import asyncinfoblox
+except (ImportError, SyntaxError):
+    aiohttp = None
+from infoblox import infoblox
+from . import fakewapi
+
+HOSTS = 50
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class TestAsyncInfoblox(unittest.TestCase):
+
+    def setUp(self):
+        self.server = fakewapi.FakeWapi(latency=0.02)
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        for i in range(HOSTS):
+            self.server.add_host('host%d.domain.com' % i, '10.0.0.%d' % i)
+
+    def run_client(self, coroutine, **kwargs):
+        """ Runs coroutine(iba_api) in a new event loop and returns its
+            result, the client talking to the fake grid over HTTP
+        """
+        async def main():
+            async with asyncinfoblox.AsyncInfoblox(
+                    self.server.address, 'foo', 'bar', '1.6', 'default',
+                    'default', **kwargs) as iba_api:
+                iba_api.base_url = 'http://%s/wapi/v1.6' % (
+                    self.server.address)
+                iba_api.util.base_url = iba_api.base_url
+                self.iba_api = iba_api
+                return await coroutine(iba_api)
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(main())
+        finally:
+            loop.close()
+
+    def test_concurrent_lookups(self):
+        async def lookups(iba_api):
+            return await asyncio.gather(*[
+                iba_api.get_host('host%d.domain.com' % i)
+                for i in range(HOSTS)])
+        hosts = self.run_client(lookups)
+        for i, host in enumerate(hosts):
+            self.assertEqual(host['name'], 'host%d.domain.com' % i)
+            self.assertEqual(host['ipv4addrs'][0]['ipv4addr'],
+                             '10.0.0.%d' % i)
+        self.assertEqual(self.server.logins, 1)
+        self.assertEqual(self.iba_api.stats['requests'], HOSTS)
+
+    def test_requests_in_flight_bounded(self):
+        peak = [0]
+
+        async def lookups(iba_api):
+            http = iba_api.session._http
+
+            async def counting(*args):
+                peak[0] = max(peak[0], iba_api.session.in_flight)
+                return await http(*args)
+            iba_api.session._http = counting
+            await asyncio.gather(*[
+                iba_api.get_host('host%d.domain.com' % i)
+                for i in range(HOSTS)])
+        self.run_client(lookups, max_concurrency=5)
+        self.assertEqual(peak[0], 5)
+
+    def test_not_found(self):
+        async def lookup(iba_api):
+            return await iba_api.get_host('missing.domain.com',
+                                          notFoundFail=False)
+        self.assertIsNone(self.run_client(lookup))
+
+        async def lookup_fail(iba_api):
+            await iba_api.get_host('missing.domain.com')
+        with self.assertRaises(infoblox.InfobloxNotFoundException):
+            self.run_client(lookup_fail)
+
+    def test_call_timeout(self):
+        async def lookup(iba_api):
+            await iba_api.get_host('host0.domain.com', timeout=0.001)
+        with self.assertRaises(infoblox.InfobloxTimeoutException):
+            self.run_client(lookup)
+
+    def test_create_and_delete(self):
+        async def create_delete(iba_api):
+            address = await iba_api.create_host_record('10.1.0.1',
+                                                       'new.domain.com')
+            found = await iba_api.get_ip_by_host('new.domain.com')
+            await iba_api.delete_host_record('new.domain.com')
+            return address, found
+        address, found = self.run_client(create_delete)
+        self.assertEqual(address, '10.1.0.1')
+        self.assertEqual(found, ['10.1.0.1'])
+        self.assertNotIn('new.domain.com', self.server.hosts)
+
+    def test_next_available_ip(self):
+        self.server.add_network('10.2.0.0/24', ['10.2.0.1'])
+
+        async def next_ip(iba_api):
+            return await iba_api.get_next_available_ip('10.2.0.0/24')
+        self.assertEqual(self.run_client(next_ip), '10.2.0.1')
+        with self.assertRaises(infoblox.InfobloxNoIPavailableException):
+            self.run_client(next_ip)
+
+    def test_next_available_ip_other_error(self):
+        async def first(url, not_found_text):
+            # a network reference the grid no longer knows
+            return {'_ref': fakewapi.network_ref('10.3.0.0/24')}
+
+        async def next_ip(iba_api):
+            iba_api._first = first
+            return await iba_api.get_next_available_ip('10.3.0.0/24')
+        with self.assertRaises(infoblox.InfobloxGeneralException) as ctx:
+            self.run_client(next_ip)
+        self.assertNotIsInstance(ctx.exception,
+                                 infoblox.InfobloxNoIPavailableException)
+
+    def test_bad_input(self):
+        async def create(iba_api):
+            await iba_api.create_host_record('not-an-ip', 'new.domain.com')
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            self.run_client(create)
@@ -0,0 +1,135 @@
+import json
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import responses
+from infoblox import infoblox
+from . import fakewapi
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6'
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                         'default', 'default',
+                                         cookie_auth=False)
+
+    @responses.activate
+    def test_operations_sent_in_one_request(self):
+        responses.add(responses.POST, BASE_URL + '/request', status=200,
+                      body=json.dumps([
+                          {'ipv4addrs': [{'ipv4addr': '10.0.0.1'}]},
+                          'record:host/ZG5z:old.domain.com/default']))
+        with self.iba_ipa.batch() as batch:
+            created = batch.create_host_record('10.0.0.1', 'new.domain.com')
+            deleted = batch.delete_by_ref(
+                'record:host/ZG5z:old.domain.com/default')
+            self.assertFalse(created.done())
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(created.result(), '10.0.0.1')
+        self.assertEqual(deleted.result(),
+                         'record:host/ZG5z:old.domain.com/default')
+        self.assertEqual(json.loads(responses.calls[0].request.body), [
+            {'method': 'POST', 'object': 'record:host',
+             'data': {'name': 'new.domain.com', 'view': 'default',
+                      'ipv4addrs': [{'ipv4addr': '10.0.0.1',
+                                     'configure_for_dhcp': False}]},
+             'args': {'_return_fields': 'ipv4addrs'}},
+            {'method': 'DELETE',
+             'object': 'record:host/ZG5z:old.domain.com/default'}])
+
+    @responses.activate
+    def test_flushed_every_size_operations(self):
+        responses.add(responses.POST, BASE_URL + '/request', status=200,
+                      body=json.dumps(['ref'] * 2))
+        batch = self.iba_ipa.batch(size=2)
+        results = [batch.post('record:txt', {'name': 'txt%d' % i})
+                   for i in range(3)]
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual([r.done() for r in results], [True, True, False])
+        self.assertEqual(len(batch), 1)
+
+    @responses.activate
+    def test_failed_request_fails_all_results(self):
+        responses.add(responses.POST, BASE_URL + '/request', status=400,
+                      body=json.dumps({'Error': 'AdmConDataNotFoundError',
+                                       'text': 'Reference not found'}))
+        batch = self.iba_ipa.batch()
+        results = [batch.delete_by_ref('record:host/ZG5z:h%d/default' % i)
+                   for i in range(2)]
+        with self.assertRaises(infoblox.InfobloxGeneralException):
+            batch.flush()
+        for result in results:
+            with self.assertRaises(infoblox.InfobloxGeneralException):
+                result.result()
+        self.assertEqual(batch.stats['failed'], 1)
+
+    def test_result_before_flush(self):
+        result = self.iba_ipa.batch().delete_by_ref('record:host/ZG5z:h/v')
+        with self.assertRaises(infoblox.InfobloxException):
+            result.result()
+
+    @responses.activate
+    def test_error_in_block_discards_operations(self):
+        with self.assertRaises(KeyError):
+            with self.iba_ipa.batch() as batch:
+                result = batch.delete_by_ref('record:host/ZG5z:h/v')
+                raise KeyError('host')
+        self.assertEqual(len(responses.calls), 0)
+        self.assertTrue(result.done())
+        self.assertIsNotNone(result.exception())
+
+    @responses.activate
+    def test_dry_run(self):
+        with self.iba_ipa.batch(confirm=False) as batch:
+            result = batch.delete_by_ref('record:host/ZG5z:h/v')
+        self.assertEqual(len(responses.calls), 0)
+        self.assertIsNone(result.result())
+
+    @responses.activate
+    def test_nothing_printed(self):
+        responses.add(responses.POST, BASE_URL + '/request', status=200,
+                      body=json.dumps(['ref']))
+        with mock.patch('sys.stdout') as stdout:
+            with self.iba_ipa.batch() as batch:
+                batch.delete_by_ref('record:host/ZG5z:h/v')
+        self.assertEqual(stdout.write.call_count, 0)
+
+    def test_bad_address(self):
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            self.iba_ipa.batch().create_host_record('host', 'h.domain.com')
+
+
+class TestBatchRoundTrips(unittest.TestCase):
+
+    def setUp(self):
+        self.server = fakewapi.FakeWapi()
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.iba_ipa = self.server.client()
+
+    def test_500_host_records(self):
+        with self.iba_ipa.batch(size=100) as batch:
+            addresses = [batch.create_host_record(
+                '10.0.%d.%d' % (i // 256, i % 256), 'host%d.domain.com' % i)
+                for i in range(500)]
+        self.assertEqual(self.server.requests, 5)
+        self.assertEqual(len(self.server.hosts), 500)
+        self.assertEqual(addresses[257].result(), '10.0.1.1')
+
+    def test_transaction_rolled_back(self):
+        self.server.add_host('old.domain.com', '10.0.0.1')
+        batch = self.iba_ipa.batch()
+        batch.create_host_record('10.0.0.2', 'new.domain.com')
+        batch.delete_by_ref(fakewapi.host_ref('missing.domain.com'))
+        with self.assertRaises(infoblox.InfobloxGeneralException):
+            batch.flush()
+        self.assertEqual(list(self.server.hosts), ['old.domain.com'])
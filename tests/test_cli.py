@@ -1,3 +1,6 @@
+import os
+import tempfile
+
 from click.testing import CliRunner
 
 try:
@@ -612,6 +615,70 @@ class GetNextIPTests(unittest.TestCase):
         self.assertEqual(self.result.exit_code, 0)
 
 
+class GetNextIPsTests(unittest.TestCase):
+    @patch('infoblox.infoblox.Infoblox.get_next_available_ips',
+           return_value=['10.0.0.1', '10.0.0.2'])
+    def setUp(self, get_next_available_ips_mock):
+        self.get_next_available_ips_mock = get_next_available_ips_mock
+        self.result = invoke('ip', 'next_ips', 'a', '2',
+                             '--exclude', '10.0.0.3')
+
+    def test_get_next_available_ips_called_with_correct_arguments(self):
+        args, __ = self.get_next_available_ips_mock.call_args
+        self.assertEqual(args, ('a', 2, ('10.0.0.3',)))
+
+    def test_one_address_per_line(self):
+        self.assertEqual(self.result.output.splitlines()[1:],
+                         ['10.0.0.1', '10.0.0.2'])
+
+    def test_exit_code_is_zero(self):
+        self.assertEqual(self.result.exit_code, 0)
+
+
+class CsvImportTests(unittest.TestCase):
+    @patch('infoblox.infoblox.Infoblox.csv_import',
+           return_value={'import_id': 7, 'status': 'COMPLETED',
+                         'errors': [{'type': 'arecord', 'error': 'exists'}]})
+    def setUp(self, csv_import_mock):
+        self.csv_import_mock = csv_import_mock
+        handle, self.path = tempfile.mkstemp(suffix='.csv')
+        self.addCleanup(os.remove, self.path)
+        with os.fdopen(handle, 'w') as f:
+            f.write('header-hostrecord,fqdn*\n')
+        self.result = invoke('csv_import', self.path, '--on-error', 'STOP')
+
+    def test_csv_import_called_with_correct_arguments(self):
+        args, kwargs = self.csv_import_mock.call_args
+        self.assertEqual(args, (self.path,))
+        self.assertEqual(kwargs['operation'], 'INSERT')
+        self.assertEqual(kwargs['on_error'], 'STOP')
+
+    def test_errors_printed(self):
+        self.assertIn("'error': 'exists'", self.result.output)
+
+    def test_exit_code_is_zero(self):
+        self.assertEqual(self.result.exit_code, 0)
+
+
+class CsvExportTests(unittest.TestCase):
+    @patch('infoblox.infoblox.Infoblox.csv_export')
+    def setUp(self, csv_export_mock):
+        self.csv_export_mock = csv_export_mock
+        csv_export_mock.return_value.size = 2048
+        self.result = invoke('csv_export', 'record:host', 'hosts.csv')
+
+    def test_csv_export_called_with_correct_arguments(self):
+        args, kwargs = self.csv_export_mock.call_args
+        self.assertEqual(args, ('record:host', 'hosts.csv'))
+        self.assertIsNone(kwargs['timeout'])
+
+    def test_size_printed(self):
+        self.assertIn('2048 bytes written', self.result.output)
+
+    def test_exit_code_is_zero(self):
+        self.assertEqual(self.result.exit_code, 0)
+
+
 class GetIpByHostTests(unittest.TestCase):
     @patch('infoblox.infoblox.Infoblox.get_ip_by_host')
     def setUp(self, get_ip_by_host_mock):
@@ -843,3 +910,22 @@ class TestProcessQueryParams(unittest.TestCase):
     def test_properly_transforms_to_dict(self):
         params = cli.process_query_params(('fizz=buzz', 'foo=bar'))
         self.assertDictEqual(params, {'fizz': 'buzz', 'foo': 'bar'})
+
+
+class GridEndpointsTests(unittest.TestCase):
+
+    @patch('infoblox.infoblox.Infoblox.get_grid')
+    @patch('infoblox.infoblox.Infoblox.__init__', return_value=None)
+    def setUp(self, init_mock, get_grid_mock):
+        self.init_mock = init_mock
+        runner = CliRunner()
+        self.result = runner.invoke(cli.cli, [
+            '--ipaddr=1.2.3.4,1.2.3.5', '--user=user1', '--password=pass1',
+            'grid', 'get'])
+
+    def test_init_called_with_endpoint_list(self):
+        args, __ = self.init_mock.call_args
+        self.assertEqual(args[0], ['1.2.3.4', '1.2.3.5'])
+
+    def test_exit_code_is_zero(self):
+        self.assertEqual(self.result.exit_code, 0)
@@ -0,0 +1,102 @@
+import gzip
+import io
+
+import responses
+from infoblox import infoblox
+from . import testcasefixture
+
+LEASE_URL = 'https://10.10.10.10/wapi/v1.6/lease'
+
+
+def gzipped(data):
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb') as f:
+        f.write(data)
+    return buf.getvalue()
+
+
+class TestCompression(testcasefixture.TestCaseWithFixture):
+    fixture_name = 'lease_get'
+
+    def setUp(self):
+        self.iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar',
+                                         '1.6', 'default', 'default')
+        self.raw = self.body.encode('utf-8')
+
+    @responses.activate
+    def test_gzip_requested(self):
+        responses.add(responses.GET, LEASE_URL, body=self.body, status=200)
+        self.iba_ipa.get_lease()
+        self.assertEqual(
+            responses.calls[0].request.headers['Accept-Encoding'],
+            'gzip, deflate')
+
+    @responses.activate
+    def test_compressed_response_accounted(self):
+        compressed = gzipped(self.raw)
+        responses.add(responses.GET, LEASE_URL, body=compressed, status=200,
+                      headers={'Content-Encoding': 'gzip'})
+        lease = self.iba_ipa.get_lease()
+        self.assertTrue(len(lease) > 0)
+        stats = self.iba_ipa.transfer_stats
+        self.assertEqual(stats['responses'], 1)
+        self.assertEqual(stats['compressed'], 1)
+        self.assertEqual(stats['wire_bytes'], len(compressed))
+        self.assertEqual(stats['decoded_bytes'], len(self.raw))
+
+    @responses.activate
+    def test_uncompressed_response_accounted(self):
+        responses.add(responses.GET, LEASE_URL, body=self.body, status=200)
+        self.iba_ipa.get_lease()
+        stats = self.iba_ipa.transfer_stats
+        self.assertEqual(stats['compressed'], 0)
+        self.assertEqual(stats['wire_bytes'], len(self.raw))
+        self.assertEqual(stats['decoded_bytes'], len(self.raw))
+
+    @responses.activate
+    def test_undecodable_response_resent_uncompressed(self):
+        responses.add(responses.GET, LEASE_URL, body=b'not gzip',
+                      status=200, headers={'Content-Encoding': 'gzip'})
+        responses.add(responses.GET, LEASE_URL, body=self.body, status=200)
+        self.iba_ipa.get_lease()
+        self.iba_ipa.get_lease()
+        self.assertEqual(len(responses.calls), 3)
+        self.assertEqual(
+            [c.request.headers['Accept-Encoding'] for c in responses.calls],
+            ['gzip, deflate', 'identity', 'gzip, deflate'])
+
+    @responses.activate
+    def test_compression_disabled(self):
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default', compression=False)
+        responses.add(responses.GET, LEASE_URL, body=self.body, status=200)
+        iba_ipa.get_lease()
+        self.assertEqual(
+            responses.calls[0].request.headers['Accept-Encoding'],
+            'identity')
+
+    @responses.activate
+    def test_undecodable_create_not_resent(self):
+        responses.add(responses.POST,
+                      'https://10.10.10.10/wapi/v1.6/record:host',
+                      body=b'not gzip', status=201,
+                      headers={'Content-Encoding': 'gzip'})
+        with self.assertRaises(infoblox.InfobloxGeneralException):
+            self.iba_ipa.create_host_record('10.0.0.1', 'host.domain.com')
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(self.iba_ipa.session.headers['Accept-Encoding'],
+                         'gzip, deflate')
+
+    @responses.activate
+    def test_undecodable_page_resent_uncompressed(self):
+        responses.add(responses.GET, LEASE_URL, body=b'not gzip',
+                      status=200, headers={'Content-Encoding': 'gzip'})
+        responses.add(responses.GET, LEASE_URL,
+                      body='{"result": [{"address": "10.0.0.1"}]}')
+        leases = list(self.iba_ipa.util.iter_get('lease'))
+        self.assertEqual(leases, [{'address': '10.0.0.1'}])
+        self.assertEqual(
+            [c.request.headers['Accept-Encoding'] for c in responses.calls],
+            ['gzip, deflate', 'identity'])
+        self.assertEqual(self.iba_ipa.session.headers['Accept-Encoding'],
+                         'gzip, deflate')
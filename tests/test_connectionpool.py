@@ -0,0 +1,81 @@
+import threading
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from infoblox import infoblox
+
+
+class EmptyListHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'[]')
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingServer(('127.0.0.1', 0), EmptyListHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+        cls.url = 'http://127.0.0.1:%d/wapi/v1.6/grid' % \
+            cls.server.server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_pool_options_passed_to_adapter(self):
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default',
+                                    pool_connections=2, pool_maxsize=64,
+                                    pool_block=True)
+        adapter = iba_ipa.session.get_adapter('https://10.10.10.10/')
+        self.assertIs(adapter, iba_ipa.adapter)
+        self.assertEqual(adapter.poolmanager.connection_pool_kw['maxsize'], 64)
+        self.assertTrue(adapter.poolmanager.connection_pool_kw['block'])
+
+    def test_keep_alive_disabled_sets_connection_close(self):
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default', keep_alive=False)
+        self.assertEqual(iba_ipa.session.headers['Connection'], 'close')
+
+    def test_stats_count_created_and_reused(self):
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default')
+        for _ in range(3):
+            iba_ipa.session.get(self.url)
+        self.assertEqual(iba_ipa.pool_stats,
+                         {'created': 1, 'reused': 2, 'dropped': 0})
+
+    def test_stats_count_dropped_without_keep_alive(self):
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default', keep_alive=False)
+        for _ in range(3):
+            iba_ipa.session.get(self.url)
+        stats = iba_ipa.pool_stats
+        self.assertEqual(stats['created'], 3)
+        self.assertEqual(stats['reused'], 0)
+        self.assertGreaterEqual(stats['dropped'], 2)
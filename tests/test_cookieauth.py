@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+
+import responses
+from requests.exceptions import HTTPError
+from infoblox import infoblox
+from . import testcasefixture
+
+GRID_URL = 'https://10.10.10.10/wapi/v1.6/grid'
+LOGIN_HEADERS = {'Set-Cookie': 'ibapauth="ip=10.0.0.1,client=API"; '
+                               'httponly; Path=/; secure'}
+
+
+class TestCookieAuth(testcasefixture.TestCaseWithFixture):
+    fixture_name = 'grid_get'
+
+    def setUp(self):
+        self.iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar',
+                                         '1.6', 'default', 'default')
+
+    @responses.activate
+    def test_basic_auth_only_sent_until_cookie_received(self):
+        responses.add(responses.GET, GRID_URL, body=self.body, status=200,
+                      headers=LOGIN_HEADERS)
+        self.iba_ipa.get_grid()
+        self.iba_ipa.get_grid()
+        first, second = [c.request for c in responses.calls]
+        self.assertIn('Authorization', first.headers)
+        self.assertNotIn('Authorization', second.headers)
+        self.assertIn('ibapauth=', second.headers['Cookie'])
+
+    @responses.activate
+    def test_expired_cookie_reauthenticates(self):
+        responses.add(responses.GET, GRID_URL, body=self.body, status=200,
+                      headers=LOGIN_HEADERS)
+        self.iba_ipa.get_grid()
+        responses.replace(responses.GET, GRID_URL, status=401)
+        responses.add(responses.GET, GRID_URL, body=self.body, status=200,
+                      headers=LOGIN_HEADERS)
+        self.iba_ipa.get_grid()
+        self.assertEqual(len(responses.calls), 3)
+        self.assertIn('Authorization', responses.calls[2].request.headers)
+
+    @responses.activate
+    def test_unauthorized_without_cookie_raises(self):
+        responses.add(responses.GET, GRID_URL, status=401)
+        with self.assertRaises(HTTPError):
+            self.iba_ipa.get_grid()
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_login_wait_bounded_by_deadline(self):
+        responses.add(responses.GET, GRID_URL, body=self.body, status=200,
+                      headers=LOGIN_HEADERS)
+        # another request is logging in and does not finish in time
+        self.iba_ipa.session._logging_in = True
+        with self.assertRaises(infoblox.InfobloxTimeoutException):
+            self.iba_ipa.get_grid(timeout=0.05)
+        self.assertEqual(len(responses.calls), 0)
+        self.iba_ipa.session._logging_in = False
+        self.iba_ipa.get_grid(timeout=5)
+        self.assertIn('Authorization', responses.calls[0].request.headers)
+
+    @responses.activate
+    def test_cookie_auth_disabled_sends_basic_auth(self):
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default', cookie_auth=False)
+        responses.add(responses.GET, GRID_URL, body=self.body, status=200,
+                      headers=LOGIN_HEADERS)
+        iba_ipa.get_grid()
+        iba_ipa.get_grid()
+        self.assertIn('Authorization', responses.calls[1].request.headers)
+
+
+class TestCookieFile(testcasefixture.TestCaseWithFixture):
+    fixture_name = 'grid_get'
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.cookie_file = os.path.join(self.tmpdir, 'cookies')
+
+    def make_client(self):
+        return infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                 'default', 'default',
+                                 cookie_file=self.cookie_file)
+
+    @responses.activate
+    def test_cookie_persisted_and_reused_by_new_client(self):
+        responses.add(responses.GET, GRID_URL, body=self.body, status=200,
+                      headers=LOGIN_HEADERS)
+        self.make_client().get_grid()
+        self.assertEqual(os.stat(self.cookie_file).st_mode & 0o777, 0o600)
+        self.make_client().get_grid()
+        self.assertNotIn('Authorization', responses.calls[1].request.headers)
+
+    def test_unreadable_cookie_file_is_ignored(self):
+        with open(self.cookie_file, 'w') as f:
+            f.write('garbage')
+        iba_ipa = self.make_client()
+        self.assertFalse(iba_ipa.session.has_auth_cookie())
@@ -0,0 +1,100 @@
+import itertools
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import requests
+
+from infoblox import infoblox
+from . import fakewapi
+
+
+def hosts(count, start=0):
+    for i in range(start, start + count):
+        yield '10.0.%d.%d' % (i // 256, i % 256), 'host%d.domain.com' % i
+
+
+class TestCreateHostRecords(unittest.TestCase):
+
+    def setUp(self):
+        self.server = fakewapi.FakeWapi()
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.iba_ipa = self.server.client()
+
+    def test_chunks_sent_as_multi_requests(self):
+        creation = self.iba_ipa.create_host_records(hosts(250),
+                                                    chunk_size=100)
+        results = list(creation)
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(len(self.server.hosts), 250)
+        self.assertEqual([r.fqdn for r in results],
+                         ['host%d.domain.com' % i for i in range(250)])
+        self.assertEqual(set(r.status for r in results), set(['success']))
+        self.assertEqual(results[207].ipv4addr, '10.0.0.207')
+        self.assertEqual(creation.stats['success'], 250)
+        self.assertGreater(creation.throughput, 0)
+
+    def test_conflicts_reported_per_host(self):
+        self.server.add_host('host5.domain.com', '10.0.0.5')
+        results = list(self.iba_ipa.create_host_records(hosts(10)))
+        self.assertEqual([r.status for r in results],
+                         ['success'] * 5 + ['conflict'] + ['success'] * 4)
+        self.assertIsNone(results[5].ipv4addr)
+        self.assertEqual(len(self.server.hosts), 10)
+
+    def test_invalid_address_not_sent(self):
+        items = [('10.0.0.1', 'a.domain.com'), ('bad', 'b.domain.com'),
+                 ('10.0.0.3', 'c.domain.com')]
+        results = list(self.iba_ipa.create_host_records(items))
+        self.assertEqual([r.status for r in results],
+                         ['success', 'error', 'success'])
+        self.assertIsInstance(results[1].error,
+                              infoblox.InfobloxBadInputParameter)
+        self.assertEqual(self.server.requests, 1)
+
+    def test_hosts_read_lazily(self):
+        source = hosts(1000)
+        read = itertools.count()
+
+        def counted():
+            for item in source:
+                next(read)
+                yield item
+        creation = self.iba_ipa.create_host_records(counted(), chunk_size=10,
+                                                    workers=2)
+        next(creation)
+        self.assertLessEqual(next(read), 30)
+
+    def test_parallel_requests_per_host(self):
+        creation = self.iba_ipa.create_host_records(
+            hosts(40), chunk_size=5, workers=4, multi_request=False)
+        results = list(creation)
+        self.assertEqual([r.fqdn for r in results],
+                         ['host%d.domain.com' % i for i in range(40)])
+        self.assertEqual(self.server.requests, 40)
+        self.assertEqual(len(self.server.hosts), 40)
+
+    def test_short_reply_reported_as_errors(self):
+        with mock.patch.object(self.iba_ipa.util, 'multi_request',
+                               return_value=[{'ipv4addrs': [
+                                   {'ipv4addr': '10.0.0.0'}]}]):
+            results = list(self.iba_ipa.create_host_records(hosts(5)))
+        self.assertEqual([r.fqdn for r in results],
+                         ['host%d.domain.com' % i for i in range(5)])
+        self.assertEqual(set(r.status for r in results), set(['error']))
+        self.assertIsInstance(results[0].error,
+                              infoblox.InfobloxGeneralException)
+
+    def test_timed_out_chunk_not_resent(self):
+        with mock.patch.object(self.iba_ipa.util, 'multi_request',
+                               side_effect=requests.exceptions.ReadTimeout()):
+            results = list(self.iba_ipa.create_host_records(hosts(5)))
+        self.assertEqual(len(results), 5)
+        self.assertEqual(set(r.status for r in results), set(['error']))
+        self.assertEqual(self.server.requests, 0)
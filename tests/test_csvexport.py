@@ -0,0 +1,111 @@
+import json
+import os
+import shutil
+import tempfile
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import requests
+import responses
+from infoblox import infoblox
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6'
+EXPORT_URL = 'https://10.10.10.10/http_direct_file_io/req_id-DOWNLOAD-3/hosts'
+EXPORT = ('header-hostrecord,fqdn*,view,addresses\r\n' + ''.join(
+    'hostrecord,h%d.domain.com,default,"10.0.%d.%d"\r\n' % (i, i // 256,
+                                                           i % 256)
+    for i in range(3000)))
+
+
+class TestCsvExport(unittest.TestCase):
+
+    def setUp(self):
+        self.iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                         'default', 'default',
+                                         cookie_auth=False)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'hosts.csv')
+
+    def add_export(self):
+        responses.add(responses.POST,
+                      BASE_URL + '/fileop?_function=csv_export',
+                      body=json.dumps({'token': 'export-token',
+                                       'url': EXPORT_URL}),
+                      match_querystring=True)
+        responses.add(responses.GET, EXPORT_URL, body=EXPORT)
+        responses.add(responses.POST,
+                      BASE_URL + '/fileop?_function=downloadcomplete',
+                      body='{}', match_querystring=True)
+
+    @responses.activate
+    def test_export_written_to_file(self):
+        self.add_export()
+        export = self.iba_ipa.csv_export('record:host', self.path,
+                                         query_params={'view': 'default'},
+                                         chunk_size=1024)
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read().decode('utf-8'), EXPORT)
+        self.assertEqual(export.size, len(EXPORT))
+        self.assertEqual(json.loads(responses.calls[0].request.body),
+                         {'_object': 'record:host', 'view': 'default'})
+        self.assertEqual(json.loads(responses.calls[2].request.body),
+                         {'token': 'export-token'})
+
+    @responses.activate
+    def test_rows_read_lazily(self):
+        self.add_export()
+        rows = iter(self.iba_ipa.csv_export('record:host', self.path))
+        self.assertEqual(next(rows), {'type': 'hostrecord',
+                                      'fqdn': 'h0.domain.com',
+                                      'view': 'default',
+                                      'addresses': '10.0.0.0'})
+        self.assertEqual(sum(1 for _ in rows), 2999)
+
+    @responses.activate
+    def test_download_completed_on_error(self):
+        responses.add(responses.POST,
+                      BASE_URL + '/fileop?_function=csv_export',
+                      body=json.dumps({'token': 'export-token',
+                                       'url': EXPORT_URL}),
+                      match_querystring=True)
+        responses.add(responses.GET, EXPORT_URL, status=500)
+        responses.add(responses.POST,
+                      BASE_URL + '/fileop?_function=downloadcomplete',
+                      body='{}', match_querystring=True)
+        with self.assertRaises(requests.HTTPError):
+            self.iba_ipa.csv_export('record:host', self.path)
+        self.assertEqual(len(responses.calls), 3)
+
+    @responses.activate
+    def test_streamed_response_not_read(self):
+        responses.add(responses.GET, EXPORT_URL, body=EXPORT)
+        r = self.iba_ipa.session.get(EXPORT_URL, stream=True)
+        self.assertFalse(r._content_consumed)
+        self.assertEqual(r.raw.read().decode('utf-8'), EXPORT)
+
+    @responses.activate
+    def test_download_accounted(self):
+        self.add_export()
+        self.iba_ipa.csv_export('record:host', self.path)
+        stats = self.iba_ipa.transfer_stats
+        self.assertEqual(stats['responses'], 3)
+        self.assertGreaterEqual(stats['decoded_bytes'], len(EXPORT))
+
+    @responses.activate
+    def test_completion_failure_does_not_hide_error(self):
+        responses.add(responses.POST,
+                      BASE_URL + '/fileop?_function=csv_export',
+                      body=json.dumps({'token': 'export-token',
+                                       'url': EXPORT_URL}),
+                      match_querystring=True)
+        responses.add(responses.GET, EXPORT_URL, status=500)
+        responses.add(responses.POST,
+                      BASE_URL + '/fileop?_function=downloadcomplete',
+                      status=400, body=json.dumps({'text': 'Bad token'}),
+                      match_querystring=True)
+        with self.assertRaises(requests.HTTPError) as raised:
+            self.iba_ipa.csv_export('record:host', self.path)
+        self.assertEqual(raised.exception.response.status_code, 500)
@@ -0,0 +1,191 @@
+import io
+import json
+import os
+import tempfile
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import responses
+from infoblox import infoblox
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6'
+UPLOAD_URL = 'https://10.10.10.10/http_direct_file_io/req_id-UPLOAD-1/import'
+ERRORS_URL = 'https://10.10.10.10/http_direct_file_io/req_id-DOWNLOAD-2/err'
+TASK_REF = 'csvimporttask/b25lLmNzdl9pbXBvcnRfdGFzayQ3:7'
+
+
+def uploaded_csv(body):
+    """ Returns the part headers and CSV text of a multipart upload body """
+    if hasattr(body, 'read'):
+        body = body.read()
+    head, content = body.decode('utf-8').split('\r\n\r\n', 1)
+    return head, content.rsplit('\r\n--', 1)[0]
+
+
+class TestCsvImportRows(unittest.TestCase):
+
+    def test_header_before_each_change(self):
+        rows = list(infoblox.csv_import_rows([
+            {'type': 'host', 'fqdn': 'a.domain.com', 'addresses': '10.0.0.1'},
+            {'type': 'host', 'fqdn': 'b.domain.com', 'addresses': '10.0.0.2'},
+            {'type': 'cname', 'fqdn': 'c.domain.com',
+             'canonical_name': 'a.domain.com', 'view': 'internal'},
+            {'type': 'fixedaddress', 'ip_address': '10.0.0.9',
+             'mac_address': 'aa:bb:cc:dd:ee:ff'},
+        ]))
+        self.assertEqual(rows, [
+            ['header-hostrecord', 'fqdn*', 'addresses', 'view'],
+            ['hostrecord', 'a.domain.com', '10.0.0.1', 'default'],
+            ['hostrecord', 'b.domain.com', '10.0.0.2', 'default'],
+            ['header-cnamerecord', 'fqdn*', 'canonical_name*', 'view'],
+            ['cnamerecord', 'c.domain.com', 'a.domain.com', 'internal'],
+            ['header-fixedaddress', 'ip_address*', 'mac_address',
+             'network_view'],
+            ['fixedaddress', '10.0.0.9', 'aa:bb:cc:dd:ee:ff', 'default']])
+
+    def test_missing_required_field(self):
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            list(infoblox.csv_import_rows([{'type': 'a',
+                                            'fqdn': 'a.domain.com'}]))
+
+    def test_unknown_type(self):
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            list(infoblox.csv_import_rows([{'type': 'mx'}]))
+
+
+class TestCsvImport(unittest.TestCase):
+
+    def setUp(self):
+        self.iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                         'default', 'default',
+                                         cookie_auth=False)
+        patcher = mock.patch('infoblox.infoblox.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.uploads = []
+        self.upload_replies = []
+        self.responses = responses.RequestsMock()
+        self.responses.start()
+        self.addCleanup(self.responses.stop)
+        self.addCleanup(self.responses.reset)
+
+    def fileop(self, function, body):
+        self.responses.add(responses.POST,
+                           BASE_URL + '/fileop?_function=' + function,
+                           body=json.dumps(body), match_querystring=True)
+
+    def add_job(self, polls, lines_failed=0):
+        self.fileop('uploadinit', {'token': 'upload-token',
+                                   'url': UPLOAD_URL})
+
+        def upload(request):
+            self.uploads.append((request.headers,) +
+                                uploaded_csv(request.body))
+            if self.upload_replies:
+                return self.upload_replies.pop(0)
+            return (200, {}, '')
+        self.responses.add_callback(responses.POST, UPLOAD_URL,
+                                    callback=upload)
+        self.fileop('csv_import', {'csv_import_task': {
+            '_ref': TASK_REF, 'import_id': 7, 'status': 'PENDING'}})
+        for status in polls:
+            self.responses.add(responses.GET, BASE_URL + '/' + TASK_REF,
+                               body=json.dumps({
+                                   '_ref': TASK_REF, 'import_id': 7,
+                                   'status': status, 'lines_processed': 3,
+                                   'lines_failed': lines_failed}))
+
+    def test_records_imported(self):
+        self.add_job(['RUNNING', 'RUNNING', 'COMPLETED'])
+        seen = []
+        task = self.iba_ipa.csv_import(
+            ({'type': 'a', 'fqdn': 'h%d.domain.com' % i,
+              'address': '10.0.0.%d' % i} for i in range(3)),
+            progress=lambda task: seen.append(task['status']))
+        self.assertEqual(task['status'], 'COMPLETED')
+        self.assertEqual(task['errors'], [])
+        self.assertEqual(seen, ['RUNNING', 'RUNNING', 'COMPLETED'])
+        self.assertEqual([c[0][0] for c in self.sleep.call_args_list],
+                         [1.0, 1.5, 2.25])
+        headers, _, content = self.uploads[0]
+        self.assertEqual(content.splitlines(), [
+            'header-arecord,fqdn*,address*,view',
+            'arecord,h0.domain.com,10.0.0.0,default',
+            'arecord,h1.domain.com,10.0.0.1,default',
+            'arecord,h2.domain.com,10.0.0.2,default'])
+        self.assertTrue(headers['Content-Type'].startswith(
+            'multipart/form-data; boundary='))
+        start = json.loads(self.responses.calls[2].request.body)
+        self.assertEqual(start, {'token': 'upload-token', 'action': 'START',
+                                 'operation': 'INSERT',
+                                 'on_error': 'CONTINUE'})
+
+    def test_file_streamed(self):
+        self.add_job(['COMPLETED'])
+        content = 'header-hostrecord,fqdn*,addresses\r\n' + ''.join(
+            'hostrecord,h%d.domain.com,10.0.%d.%d\r\n' % (i, i // 256,
+                                                         i % 256)
+            for i in range(5000))
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(handle, 'w') as f:
+            f.write(content)
+        self.iba_ipa.csv_import(path)
+        headers, part, uploaded = self.uploads[0]
+        self.assertEqual(uploaded, content)
+        self.assertIn('filename="%s"' % os.path.basename(path), part)
+        self.assertGreater(int(headers['Content-Length']), len(content))
+
+    def test_error_rows_reported(self):
+        self.add_job(['COMPLETED'], lines_failed=1)
+        self.fileop('csv_error_log', {'token': 'error-token',
+                                      'url': ERRORS_URL})
+        self.responses.add(
+            responses.GET, ERRORS_URL,
+            body='header-arecord,fqdn*,address*,view\r\n'
+                 'arecord,h1.domain.com,10.0.0.1,default,'
+                 '"The record already exists"\r\n')
+        self.fileop('downloadcomplete', {})
+        task = self.iba_ipa.csv_import(io.BytesIO(
+            b'header-arecord,fqdn*,address*\r\n'
+            b'arecord,h1.domain.com,10.0.0.1\r\n'))
+        self.assertEqual(task['errors'], [
+            {'type': 'arecord', 'fqdn': 'h1.domain.com',
+             'address': '10.0.0.1', 'view': 'default',
+             'error': 'The record already exists'}])
+
+    def test_timeout(self):
+        self.responses.assert_all_requests_are_fired = False
+        self.add_job(['RUNNING'] * 3)
+        with self.assertRaises(infoblox.InfobloxTimeoutException):
+            self.iba_ipa.csv_import(io.BytesIO(b''), timeout=2)
+
+    def test_callers_file_left_open(self):
+        self.add_job(['COMPLETED'])
+        source = io.BytesIO(b'header-arecord,fqdn*,address*\r\n')
+        self.iba_ipa.csv_import(source)
+        self.assertFalse(source.closed)
+
+    def test_upload_resent_whole_after_login(self):
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default')
+        self.add_job(['COMPLETED'])
+        self.responses.replace(
+            responses.POST, BASE_URL + '/fileop?_function=uploadinit',
+            body=json.dumps({'token': 'upload-token', 'url': UPLOAD_URL}),
+            headers={'Set-Cookie': 'ibapauth="ip=10.0.0.1,client=API"; '
+                                   'Path=/; secure'},
+            match_querystring=True)
+        # the session cookie expires before the upload
+        self.upload_replies.append((401, {}, ''))
+        content = 'header-arecord,fqdn*,address*\r\n' \
+                  'arecord,h1.domain.com,10.0.0.1\r\n'
+        iba_ipa.csv_import(io.BytesIO(content.encode('utf-8')))
+        self.assertEqual([u[2] for u in self.uploads], [content, content])
+        self.assertIn('Authorization', self.uploads[1][0])
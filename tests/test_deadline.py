@@ -0,0 +1,114 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import responses
+from infoblox import infoblox
+from . import testcasefixture
+
+HOST_URL = 'https://10.10.10.10/wapi/v1.6/record:host'
+HOST_REF_URL = HOST_URL + '/ZG5zLmhvc3QkLl9kZWZhdWx0LmNvbS5lcXVpZmF4LnVzLmxhYnMuY2lhLmFhYS10ZXN0aG9zdA:host.domain.com/default'
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDeadline(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch('infoblox.infoblox._now', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_timeout_split_into_connect_and_read(self):
+        deadline = infoblox.Deadline(10, connect_timeout=3)
+        self.assertEqual(deadline.timeout(), (3, 10))
+
+    def test_connect_timeout_bounded_by_remaining_budget(self):
+        deadline = infoblox.Deadline(10, connect_timeout=3)
+        self.clock.now += 8
+        self.assertEqual(deadline.timeout(), (2, 2))
+
+    def test_unbounded_deadline(self):
+        deadline = infoblox.Deadline(connect_timeout=3)
+        self.assertEqual(deadline.timeout(), (3, None))
+        self.assertIsNone(deadline.remaining())
+
+    def test_expired_deadline_raises(self):
+        deadline = infoblox.Deadline(10)
+        self.clock.now += 10
+        with self.assertRaises(infoblox.InfobloxTimeoutException):
+            deadline.timeout()
+
+    def test_allows(self):
+        deadline = infoblox.Deadline(10)
+        self.assertTrue(deadline.allows(5))
+        self.assertFalse(deadline.allows(10))
+
+
+class TestDeadlinePropagation(testcasefixture.TestCaseWithFixture):
+    fixture_name = 'host_delete'
+
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch('infoblox.infoblox._now', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar',
+                                         '1.6', 'default', 'default',
+                                         connect_timeout=2)
+
+    @responses.activate
+    def test_remaining_budget_used_by_followup_request(self):
+        clock = self.clock
+
+        def lookup(request):
+            clock.now += 4
+            return (200, {}, self.body)
+        responses.add_callback(responses.GET, HOST_URL, callback=lookup)
+        responses.add(responses.DELETE, HOST_REF_URL, status=200)
+        self.iba_ipa.delete_host_record('host.domain.com', timeout=10)
+        timeouts = [c.request.req_kwargs['timeout'] for c in responses.calls]
+        self.assertEqual(timeouts, [(2, 10), (2, 6)])
+
+    @responses.activate
+    def test_followup_request_not_sent_after_deadline(self):
+        clock = self.clock
+
+        def lookup(request):
+            clock.now += 11
+            return (200, {}, self.body)
+        responses.add_callback(responses.GET, HOST_URL, callback=lookup)
+        responses.add(responses.DELETE, HOST_REF_URL, status=200)
+        with self.assertRaises(infoblox.InfobloxTimeoutException):
+            self.iba_ipa.delete_host_record('host.domain.com', timeout=10)
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_client_default_timeout(self):
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default',
+                                    timeout=30, connect_timeout=5)
+        responses.add(responses.GET, HOST_URL, body=self.body, status=200)
+        iba_ipa.get_host('host.domain.com')
+        self.assertEqual(responses.calls[0].request.req_kwargs['timeout'],
+                         (5, 30))
+
+    @responses.activate
+    def test_no_timeout_by_default(self):
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default')
+        responses.add(responses.GET, HOST_URL, body=self.body, status=200)
+        iba_ipa.get_host('host.domain.com')
+        self.assertIsNone(responses.calls[0].request.req_kwargs['timeout'])
@@ -0,0 +1,116 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import requests
+import responses
+from infoblox import infoblox
+from . import testcasefixture
+
+PRIMARY_URL = 'https://10.10.10.10/wapi/v1.6/grid'
+CANDIDATE_URL = 'https://10.10.10.11/wapi/v1.6/grid'
+
+
+class TestCircuitBreaker(unittest.TestCase):
+
+    def setUp(self):
+        self.now = [100.0]
+        patcher = mock.patch('infoblox.infoblox._now', lambda: self.now[0])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = infoblox.CircuitBreaker(failure_threshold=2,
+                                               reset_timeout=10)
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.state, 'open')
+
+    def test_success_resets_failures(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+
+    def test_single_probe_when_half_open(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.now[0] += 10
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, 'half-open')
+        self.assertFalse(self.breaker.allow())
+
+    def test_probe_success_closes(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.now[0] += 10
+        self.breaker.allow()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_probe_failure_reopens(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.now[0] += 10
+        self.breaker.allow()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertFalse(self.breaker.allow())
+
+
+class TestFailover(testcasefixture.TestCaseWithFixture):
+    fixture_name = 'grid_get'
+
+    def setUp(self):
+        self.iba_ipa = infoblox.Infoblox(['10.10.10.10', '10.10.10.11'],
+                                         'foo', 'bar', '1.6', 'default',
+                                         'default', breaker_failures=1)
+
+    def test_urls_built_for_primary(self):
+        self.assertEqual(self.iba_ipa.iba_host, '10.10.10.10')
+
+    @responses.activate
+    def test_connect_failure_moves_to_candidate(self):
+        responses.add(responses.GET, PRIMARY_URL,
+                      body=requests.exceptions.ConnectTimeout())
+        responses.add(responses.GET, CANDIDATE_URL, body=self.body,
+                      status=200)
+        self.iba_ipa.get_grid()
+        self.iba_ipa.get_grid()
+        urls = [c.request.url.split('?')[0] for c in responses.calls]
+        self.assertEqual(urls, [PRIMARY_URL, CANDIDATE_URL, CANDIDATE_URL])
+        states = [e['state'] for e in self.iba_ipa.endpoint_stats]
+        self.assertEqual(states, ['open', 'closed'])
+
+    @responses.activate
+    def test_post_not_failed_over_after_connection_reset(self):
+        responses.add(responses.POST,
+                      'https://10.10.10.10/wapi/v1.6/record:host',
+                      body=requests.exceptions.ConnectionError('reset'))
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.iba_ipa.create_host_record('10.0.0.1', 'host.domain.com')
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_all_endpoints_open_fails_fast(self):
+        responses.add(responses.GET, PRIMARY_URL,
+                      body=requests.exceptions.ConnectTimeout())
+        responses.add(responses.GET, CANDIDATE_URL,
+                      body=requests.exceptions.ConnectTimeout())
+        with self.assertRaises(requests.exceptions.ConnectTimeout):
+            self.iba_ipa.get_grid()
+        with self.assertRaises(infoblox.InfobloxUnavailableException):
+            self.iba_ipa.get_grid()
+        self.assertEqual(len(responses.calls), 2)
+
+    def test_single_address_has_no_endpoints(self):
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default')
+        self.assertEqual(iba_ipa.endpoint_stats, [])
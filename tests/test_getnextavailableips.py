@@ -0,0 +1,59 @@
+import json
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import responses
+from infoblox import infoblox
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6'
+NETWORK_REF = 'network/ZG5zLm5ldHdvcmskMTAuMC4wLjAvMjQvMA:10.0.0.0/24/default'
+
+
+class TestGetNextAvailableIps(unittest.TestCase):
+
+    def setUp(self):
+        self.iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                         'default', 'default',
+                                         cookie_auth=False)
+
+    def add_network(self):
+        responses.add(responses.GET, BASE_URL + '/network', status=200,
+                      body=json.dumps([{'_ref': NETWORK_REF}]))
+
+    @responses.activate
+    def test_addresses_in_two_requests(self):
+        self.add_network()
+        ips = ['10.0.0.%d' % i for i in range(4, 204)]
+        responses.add(responses.POST, BASE_URL + '/' + NETWORK_REF,
+                      status=200, body=json.dumps({'ips': ips}))
+        self.assertEqual(self.iba_ipa.get_next_available_ips(
+            '10.0.0.0/24', 200, exclude=['10.0.0.2', '10.0.0.3']), ips)
+        self.assertEqual(len(responses.calls), 2)
+        request = responses.calls[1].request
+        self.assertIn('_function=next_available_ip', request.url)
+        self.assertEqual(json.loads(request.body),
+                         {'num': 200, 'exclude': ['10.0.0.2', '10.0.0.3']})
+
+    @responses.activate
+    def test_network_not_found(self):
+        responses.add(responses.GET, BASE_URL + '/network', status=200,
+                      body='[]')
+        with self.assertRaises(infoblox.InfobloxNotFoundException):
+            self.iba_ipa.get_next_available_ips('10.0.0.0/24', 2)
+
+    @responses.activate
+    def test_not_enough_addresses(self):
+        self.add_network()
+        responses.add(responses.POST, BASE_URL + '/' + NETWORK_REF,
+                      status=400,
+                      body=json.dumps({'code': 'Client.Ibap.Data',
+                                       'text': 'Cannot find 300 available '
+                                               'IP addresses'}))
+        with self.assertRaises(infoblox.InfobloxNoIPavailableException):
+            self.iba_ipa.get_next_available_ips('10.0.0.0/24', 300)
+
+    def test_bad_count(self):
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            self.iba_ipa.get_next_available_ips('10.0.0.0/24', 0)
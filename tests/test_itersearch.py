@@ -0,0 +1,112 @@
+import json
+import threading
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from urlparse import parse_qs, urlparse
+
+import responses
+from infoblox import infoblox
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6'
+
+
+class SlowPages(object):
+    """ Serves objects in pages, holding back every page after the first
+        until released
+    """
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.queries = []
+        self.release = threading.Event()
+
+    def page(self, request):
+        query = dict((k, v[0]) for k, v in
+                     parse_qs(urlparse(request.url).query).items())
+        self.queries.append(query)
+        start = int(query.get('_page_id', 0))
+        if start:
+            self.release.wait(5)
+        end = start + int(query['_max_results'])
+        body = {'result': self.objects[start:end]}
+        if end < len(self.objects):
+            body['next_page_id'] = str(end)
+        return (200, {}, json.dumps(body))
+
+
+class TestIterSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                         'default', 'internal',
+                                         cookie_auth=False, page_size=2)
+        self.responses = responses.RequestsMock()
+        self.responses.start()
+        self.addCleanup(self.responses.stop)
+        self.addCleanup(self.responses.reset)
+
+    def serve(self, uri, objects):
+        pages = SlowPages(objects)
+        self.addCleanup(pages.release.set)
+        self.responses.add_callback(responses.GET, BASE_URL + '/' + uri,
+                                    callback=pages.page)
+        return pages
+
+    def test_first_host_before_next_page(self):
+        pages = self.serve('record:host', [{'name': 'h%d.domain.com' % i}
+                                           for i in range(5)])
+        hosts = self.iba_ipa.iter_host_by_regexp('h.*')
+        self.assertEqual(next(hosts), 'h0.domain.com')
+        self.assertEqual(next(hosts), 'h1.domain.com')
+        pages.release.set()
+        self.assertEqual(list(hosts), ['h%d.domain.com' % i
+                                       for i in range(2, 5)])
+        self.assertEqual(pages.queries[0],
+                         {'name~': 'h.*', 'view': 'default',
+                          '_return_fields': 'name', '_paging': '1',
+                          '_max_results': '2', '_return_as_object': '1'})
+
+    def test_page_size(self):
+        pages = self.serve('record:host', [{'name': 'h%d.domain.com' % i}
+                                           for i in range(5)])
+        self.assertEqual(len(list(self.iba_ipa.iter_host_by_regexp(
+            'h.*', page_size=10))), 5)
+        self.assertEqual(len(pages.queries), 1)
+        self.assertEqual(pages.queries[0]['_max_results'], '10')
+
+    def test_txt_pairs(self):
+        pages = self.serve('record:txt', [
+            {'name': 't%d.domain.com' % i, 'text': 'v=%d' % i}
+            for i in range(3)])
+        pages.release.set()
+        self.assertEqual(list(self.iba_ipa.iter_txt_by_regexp('t.*')),
+                         [('t0.domain.com', 'v=0'), ('t1.domain.com', 'v=1'),
+                          ('t2.domain.com', 'v=2')])
+        self.assertEqual(self.iba_ipa.get_txt_by_regexp('t.*'),
+                         {'t0.domain.com': 'v=0', 't1.domain.com': 'v=1',
+                          't2.domain.com': 'v=2'})
+        self.assertEqual(pages.queries[0]['_return_fields'], 'name,text')
+
+    def test_networks_by_extattrs(self):
+        pages = self.serve('network', [{'network': '10.0.%d.0/24' % i}
+                                       for i in range(3)])
+        pages.release.set()
+        self.assertEqual(list(self.iba_ipa.iter_network_by_extattrs(
+            'Site=dc1,Vlan>=10')), ['10.0.0.0/24', '10.0.1.0/24',
+                                   '10.0.2.0/24'])
+        query = pages.queries[0]
+        self.assertEqual(query['*Site'], 'dc1')
+        self.assertEqual(query['*Vlan>'], '10')
+        self.assertEqual(query['network_view'], 'internal')
+
+    def test_hosts_by_extattrs_not_found(self):
+        self.serve('record:host', [])
+        self.assertEqual(list(self.iba_ipa.iter_host_by_extattrs('Site=x')),
+                         [])
+        with self.assertRaises(infoblox.InfobloxNotFoundException):
+            self.iba_ipa.get_host_by_extattrs('Site=x')
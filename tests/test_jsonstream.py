@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+import json
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import responses
+from infoblox import infoblox
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6'
+
+
+def chunked(text, size):
+    data = text.encode('utf-8')
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestJsonStream(unittest.TestCase):
+
+    def test_array_elements(self):
+        records = [{'name': u'h\xe9中.domain.com', 'n': 10 ** 12,
+                    'aliases': ['a,]', 'b\\"}'], 'extattrs': {}},
+                   [], 1.5, None, True, u'x']
+        for size in (1, 2, 3, 7, 1024):
+            self.assertEqual(list(infoblox.JsonStream(
+                chunked(json.dumps(records), size))), records)
+
+    def test_paged_response(self):
+        body = ' {"next_page_id": "789c", "result": [{"a": 1}, {"a": 2}],' \
+               ' "count": 12345}\n'
+        stream = infoblox.JsonStream(chunked(body, 3))
+        elements = iter(stream)
+        self.assertEqual(next(elements), {'a': 1})
+        self.assertEqual(stream.fields, {'next_page_id': '789c'})
+        self.assertEqual(list(elements), [{'a': 2}])
+        self.assertEqual(stream.fields, {'next_page_id': '789c',
+                                         'count': 12345})
+
+    def test_number_split_between_chunks(self):
+        self.assertEqual(list(infoblox.JsonStream([b'[12', b'34, 5', b'6]'])),
+                         [1234, 56])
+
+    def test_empty(self):
+        self.assertEqual(list(infoblox.JsonStream([b' [ ] '])), [])
+        self.assertEqual(list(infoblox.JsonStream([b'{}'])), [])
+
+    def test_elements_yielded_as_they_arrive(self):
+        read = []
+
+        def chunks():
+            for chunk in chunked(json.dumps([{'i': i} for i in range(100)]),
+                                 16):
+                read.append(chunk)
+                yield chunk
+        elements = iter(infoblox.JsonStream(chunks()))
+        self.assertEqual(next(elements), {'i': 0})
+        self.assertLess(len(read), 3)
+        self.assertEqual(len(list(elements)), 99)
+
+    def test_large_element(self):
+        record = {'text': 'x' * (1 << 20)}
+        chunks = chunked(json.dumps([record, record]), 1024)
+        decoder = json.JSONDecoder()
+        with mock.patch.object(infoblox.json.JSONDecoder, 'raw_decode',
+                               side_effect=decoder.raw_decode) as raw_decode:
+            self.assertEqual(list(infoblox.JsonStream(chunks)),
+                             [record, record])
+        # the buffer doubles while an element is incomplete
+        self.assertLess(raw_decode.call_count, 40)
+
+    def test_malformed(self):
+        for body in (b'[{"a": 1}, {"a"', b'[1 2]', b'[1] [2]', b'"text"',
+                     b'{"result": [1], "next_page_id"}', b''):
+            with self.assertRaises(ValueError):
+                list(infoblox.JsonStream(chunked(body.decode('utf-8'), 2)))
+
+    def test_response_closed(self):
+        response = mock.Mock()
+        list(infoblox.JsonStream([b'[1, 2]'], response))
+        response.close.assert_called_once_with()
+
+
+class TestStreamedSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                         'default', 'default',
+                                         cookie_auth=False)
+        self.iba_ipa.util.chunk_size = 64
+
+    @responses.activate
+    def test_pages_decoded_in_chunks(self):
+        leases = [{'address': '10.0.%d.%d' % (i // 256, i % 256)}
+                  for i in range(600)]
+        responses.add(responses.GET, BASE_URL + '/lease',
+                      body=json.dumps({'result': leases[:300],
+                                       'next_page_id': 'p2'}))
+        responses.add(responses.GET, BASE_URL + '/lease',
+                      body=json.dumps({'result': leases[300:]}))
+        self.assertEqual(list(self.iba_ipa.util.iter_get('lease',
+                                                         page_size=300)),
+                         leases)
+        self.assertIn('_page_id=p2', responses.calls[1].request.url)
+        stats = self.iba_ipa.transfer_stats
+        self.assertEqual(stats['responses'], 2)
+
+    @responses.activate
+    def test_unpaged_search(self):
+        responses.add(responses.GET, BASE_URL + '/lease',
+                      body=json.dumps([{'address': '10.0.0.1'}]))
+        self.assertEqual(list(self.iba_ipa.util.iter_get('lease',
+                                                         page_size=None)),
+                         [{'address': '10.0.0.1'}])
+        self.assertNotIn('_paging', responses.calls[0].request.url)
+
+    @responses.activate
+    def test_invalid_response(self):
+        responses.add(responses.GET, BASE_URL + '/lease',
+                      body='[{"address": "10.0.0.1"}, <html>')
+        with self.assertRaises(infoblox.InfobloxGeneralException):
+            list(self.iba_ipa.util.iter_get('lease'))
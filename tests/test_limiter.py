@@ -0,0 +1,132 @@
+import threading
+import time
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import responses
+from requests.exceptions import HTTPError
+from infoblox import infoblox
+from . import testcasefixture
+
+GRID_URL = 'https://10.10.10.10/wapi/v1.6/grid'
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.now = [100.0]
+        patcher = mock.patch('infoblox.infoblox._now', lambda: self.now[0])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.limiter = infoblox.AdaptiveLimiter(initial_limit=4)
+
+    def request(self, latency, overloaded=False):
+        self.limiter.acquire()
+        self.now[0] += latency
+        self.limiter.release(latency, overloaded)
+
+    def test_additive_increase_per_window(self):
+        for _ in range(4):
+            self.request(0.1)
+        self.assertEqual(self.limiter.metrics['limit'], 4)
+        self.request(0.1)
+        self.assertGreater(self.limiter.limit, 4.9)
+
+    def test_multiplicative_decrease_on_overload(self):
+        self.request(0.1, overloaded=True)
+        self.assertEqual(self.limiter.limit, 2)
+        self.assertEqual(self.limiter.metrics['decreases'], 1)
+
+    def test_multiplicative_decrease_on_latency_spike(self):
+        self.request(0.1)
+        self.request(0.5)
+        self.assertLess(self.limiter.limit, 4)
+
+    def test_burst_of_failures_counts_once(self):
+        self.request(0.1)
+        limit = self.limiter.limit
+        self.limiter.acquire()
+        self.limiter.acquire()
+        self.limiter.release(0.01, True)
+        self.limiter.release(0.01, True)
+        self.assertEqual(self.limiter.limit, limit / 2)
+
+    def test_limit_never_below_min(self):
+        for _ in range(10):
+            self.now[0] += 10
+            self.request(0.1, overloaded=True)
+        self.assertEqual(self.limiter.limit, 1)
+
+    def test_unsent_request_does_not_adjust_limit(self):
+        self.limiter.acquire()
+        self.limiter.release(0.0, None)
+        self.assertEqual(self.limiter.limit, 4)
+        self.assertEqual(self.limiter.metrics['in_flight'], 0)
+
+    def test_acquire_times_out(self):
+        limiter = infoblox.AdaptiveLimiter(initial_limit=1)
+        limiter.acquire()
+        with self.assertRaises(infoblox.InfobloxTimeoutException):
+            limiter.acquire(timeout=0)
+
+
+class TestLimiterConcurrency(unittest.TestCase):
+
+    def test_in_flight_requests_capped(self):
+        limiter = infoblox.AdaptiveLimiter(initial_limit=3, max_limit=3)
+        lock = threading.Lock()
+        state = {'current': 0, 'peak': 0}
+
+        def worker():
+            limiter.acquire()
+            with lock:
+                state['current'] += 1
+                state['peak'] = max(state['peak'], state['current'])
+            time.sleep(0.01)
+            with lock:
+                state['current'] -= 1
+            limiter.release(0.01)
+
+        threads = [threading.Thread(target=worker) for _ in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(state['peak'], 3)
+        self.assertEqual(limiter.metrics['requests'], 12)
+        self.assertEqual(limiter.metrics['queue_depth'], 0)
+
+
+class TestSessionLimiter(testcasefixture.TestCaseWithFixture):
+    fixture_name = 'grid_get'
+
+    def setUp(self):
+        self.iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar',
+                                         '1.6', 'default', 'default',
+                                         limiter=True)
+
+    @responses.activate
+    def test_server_error_decreases_limit(self):
+        responses.add(responses.GET, GRID_URL, status=503)
+        with self.assertRaises(HTTPError):
+            self.iba_ipa.get_grid()
+        stats = self.iba_ipa.limiter_stats
+        self.assertEqual(stats['limit'], 4)
+        self.assertEqual(stats['in_flight'], 0)
+
+    @responses.activate
+    def test_success_counts_request(self):
+        responses.add(responses.GET, GRID_URL, body=self.body, status=200)
+        self.iba_ipa.get_grid()
+        self.assertEqual(self.iba_ipa.limiter_stats['requests'], 1)
+
+    def test_no_limiter_by_default(self):
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default')
+        self.assertEqual(iba_ipa.limiter_stats, {})
@@ -0,0 +1,143 @@
+import json
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import responses
+from infoblox import infoblox
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6'
+
+
+class TestNegativeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = [100.0]
+        patcher = mock.patch('infoblox.infoblox._now', lambda: self.now[0])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = infoblox.NegativeCache(maxsize=2, ttl=10)
+
+    def test_expiry(self):
+        self.cache.put('record:host', 'default', {'name': 'a', 'view': 1})
+        self.assertTrue(self.cache.missing('record:host', 'default',
+                                           {'view': 1, 'name': 'a'}))
+        self.assertFalse(self.cache.missing('record:host', 'default',
+                                            {'name': 'b', 'view': 1}))
+        self.now[0] += 10
+        self.assertFalse(self.cache.missing('record:host', 'default',
+                                            {'name': 'a', 'view': 1}))
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.stats.snapshot(),
+                         {'hits': 1, 'misses': 2, 'evictions': 0,
+                          'invalidations': 0})
+
+    def test_least_recently_used_evicted(self):
+        for name in ('a', 'b'):
+            self.cache.put('record:host', 'default', {'name': name})
+        self.cache.missing('record:host', 'default', {'name': 'a'})
+        self.cache.put('record:host', 'default', {'name': 'c'})
+        self.assertTrue(self.cache.missing('record:host', 'default',
+                                           {'name': 'a'}))
+        self.assertFalse(self.cache.missing('record:host', 'default',
+                                            {'name': 'b'}))
+        self.assertEqual(self.cache.stats.snapshot()['evictions'], 1)
+
+    def test_invalidate_scope(self):
+        cache = infoblox.NegativeCache()
+        cache.put('record:host', 'default', {'name': 'a'})
+        cache.put('record:host', 'internal', {'name': 'a'})
+        cache.put('record:a', None, {'ipv4addr': '10.0.0.1'})
+        cache.put('record:host', None, {'alias': 'a'})
+        cache.invalidate('record:host', 'default')
+        self.assertFalse(cache.missing('record:host', 'default',
+                                       {'name': 'a'}))
+        self.assertFalse(cache.missing('record:host', None, {'alias': 'a'}))
+        self.assertTrue(cache.missing('record:host', 'internal',
+                                      {'name': 'a'}))
+        self.assertTrue(cache.missing('record:a', None,
+                                      {'ipv4addr': '10.0.0.1'}))
+        cache.invalidate('record:a')
+        self.assertFalse(cache.missing('record:a', None,
+                                       {'ipv4addr': '10.0.0.1'}))
+
+
+class TestCachedMisses(unittest.TestCase):
+
+    def setUp(self):
+        self.iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                         'default', 'default',
+                                         cookie_auth=False,
+                                         negative_cache=True)
+
+    @responses.activate
+    def test_repeated_miss_not_sent(self):
+        responses.add(responses.GET, BASE_URL + '/record:host', body='[]')
+        for _ in range(3):
+            self.assertIsNone(self.iba_ipa.get_host('host.domain.com',
+                                                    notFoundFail=False))
+        with self.assertRaises(infoblox.InfobloxNotFoundException):
+            self.iba_ipa.get_host('host.domain.com')
+        self.assertEqual(len(responses.calls), 1)
+        self.assertIsNone(self.iba_ipa.get_host('other.domain.com',
+                                                notFoundFail=False))
+        self.assertEqual(len(responses.calls), 2)
+        stats = self.iba_ipa.negative_cache_stats
+        self.assertEqual(stats['hits'], 3)
+        self.assertEqual(stats['size'], 2)
+
+    @responses.activate
+    def test_found_not_cached(self):
+        responses.add(responses.GET, BASE_URL + '/fixedaddress',
+                      body=json.dumps([{'_ref': 'fixedaddress/ZG5z:10.0.0.1/'
+                                                'default'}]))
+        for _ in range(2):
+            self.iba_ipa.get_fixed_address('10.0.0.1', 'aa:bb:cc:dd:ee:ff')
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_create_invalidates(self):
+        responses.add(responses.GET, BASE_URL + '/fixedaddress', body='[]')
+        responses.add(responses.POST, BASE_URL + '/fixedaddress',
+                      body=json.dumps('fixedaddress/ZG5z:10.0.0.1/default'))
+        for _ in range(2):
+            self.assertIsNone(self.iba_ipa.get_fixed_address(
+                '10.0.0.1', 'aa:bb:cc:dd:ee:ff', not_found_fail=False))
+        self.iba_ipa.create_fixed_address('10.0.0.1', 'aa:bb:cc:dd:ee:ff')
+        self.iba_ipa.get_fixed_address('10.0.0.1', 'aa:bb:cc:dd:ee:ff',
+                                       not_found_fail=False)
+        self.assertEqual([c.request.method for c in responses.calls],
+                         ['GET', 'POST', 'GET'])
+
+    @responses.activate
+    def test_batched_create_invalidates(self):
+        responses.add(responses.GET, BASE_URL + '/record:host', body='[]')
+        responses.add(responses.POST, BASE_URL + '/request',
+                      body=json.dumps(['record:host/ZG5z:host.domain.com/'
+                                       'default']))
+        self.iba_ipa.get_host('host.domain.com', notFoundFail=False)
+        self.iba_ipa.util.multi_request([{
+            'method': 'POST', 'object': 'record:host',
+            'data': {'name': 'host.domain.com', 'view': 'default',
+                     'ipv4addrs': [{'ipv4addr': '10.0.0.1'}]}}])
+        self.iba_ipa.get_host('host.domain.com', notFoundFail=False)
+        self.assertEqual(len(responses.calls), 3)
+
+    @responses.activate
+    def test_a_records(self):
+        responses.add(responses.GET, BASE_URL + '/record:a', body='[]')
+        for _ in range(2):
+            with self.assertRaises(infoblox.InfobloxNotFoundException):
+                self.iba_ipa.get_a_record_by_ip('10.0.0.1')
+        self.assertEqual(len(responses.calls), 1)
+
+    def test_disabled_by_default(self):
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default', cookie_auth=False)
+        self.assertIsNone(iba_ipa.negative_cache)
+        self.assertEqual(iba_ipa.negative_cache_stats, {})
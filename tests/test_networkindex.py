@@ -0,0 +1,165 @@
+import json
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+try:
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from urlparse import parse_qs, urlparse
+
+import responses
+from infoblox import infoblox
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6'
+NETWORKS = ['10.0.0.0/8', '10.1.0.0/16', '10.1.2.0/24', '10.1.2.128/25',
+            '192.168.0.0/24']
+
+
+class TestNetworkIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = infoblox.NetworkIndex(NETWORKS)
+
+    def test_longest_prefix_match(self):
+        self.assertEqual(self.index.lookup('10.1.2.200'), '10.1.2.128/25')
+        self.assertEqual(self.index.lookup('10.1.2.3'), '10.1.2.0/24')
+        self.assertEqual(self.index.lookup('10.1.200.3'), '10.1.0.0/16')
+        self.assertEqual(self.index.lookup('10.200.0.1'), '10.0.0.0/8')
+        self.assertEqual(self.index.lookup('192.168.0.255'), '192.168.0.0/24')
+        self.assertIsNone(self.index.lookup('192.168.1.0'))
+        self.assertEqual(len(self.index), 5)
+
+    def test_add_and_discard(self):
+        self.index.add('10.1.2.0/28')
+        self.assertEqual(self.index.lookup('10.1.2.3'), '10.1.2.0/28')
+        self.index.discard('10.1.2.0/28')
+        self.index.discard('10.0.0.0/8')
+        self.assertEqual(self.index.lookup('10.1.2.3'), '10.1.2.0/24')
+        self.assertIsNone(self.index.lookup('10.200.0.1'))
+
+    def test_bad_input(self):
+        for ip_v4 in ('10.1', '10.1.2.256', 'host', None):
+            with self.assertRaises(infoblox.InfobloxBadInputParameter):
+                self.index.lookup(ip_v4)
+        for network in ('10.0.0.0', '10.0.0.0/33', '10.0.0.0/x'):
+            with self.assertRaises(infoblox.InfobloxBadInputParameter):
+                self.index.add(network)
+
+    def test_stale(self):
+        now = [100.0]
+        with mock.patch('infoblox.infoblox._now', lambda: now[0]):
+            index = infoblox.NetworkIndex(refresh_interval=60)
+            self.assertTrue(index.stale())
+            index.load(NETWORKS)
+            self.assertFalse(index.stale())
+            now[0] += 60
+            self.assertTrue(index.stale())
+
+
+class TestIndexedLookups(unittest.TestCase):
+
+    def setUp(self):
+        self.iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                         'default', 'internal',
+                                         cookie_auth=False, page_size=2,
+                                         network_index=True)
+        self.responses = responses.RequestsMock(
+            assert_all_requests_are_fired=False)
+        self.responses.start()
+        self.addCleanup(self.responses.stop)
+        self.addCleanup(self.responses.reset)
+        self.queries = []
+        self.responses.add_callback(responses.GET, BASE_URL + '/network',
+                                    callback=self.networks)
+
+    def networks(self, request):
+        query = dict((k, v[0]) for k, v in
+                     parse_qs(urlparse(request.url).query).items())
+        self.queries.append(query)
+        start = int(query.get('_page_id', 0))
+        end = start + int(query['_max_results'])
+        body = {'result': [{'network': n} for n in NETWORKS[start:end]]}
+        if end < len(NETWORKS):
+            body['next_page_id'] = str(end)
+        return (200, {}, json.dumps(body))
+
+    def test_loaded_once(self):
+        self.assertEqual(self.iba_ipa.get_network_by_ip('10.1.2.3'),
+                         '10.1.2.0/24')
+        self.assertEqual(self.iba_ipa.get_networks_by_ips(
+            ['10.1.2.200', '172.16.0.1', '192.168.0.7']),
+            ['10.1.2.128/25', None, '192.168.0.0/24'])
+        with self.assertRaises(infoblox.InfobloxNotFoundException):
+            self.iba_ipa.get_network_by_ip('172.16.0.1')
+        # one walk through three pages of networks
+        self.assertEqual(len(self.queries), 3)
+        self.assertEqual(self.queries[0]['network_view'], 'internal')
+        self.assertEqual(self.queries[0]['_return_fields'], 'network')
+
+    def test_paged_without_page_size(self):
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'internal', cookie_auth=False,
+                                    network_index=True)
+        self.assertEqual(iba_ipa.refresh_network_index(), 5)
+        self.assertEqual(self.queries[0]['_paging'], '1')
+        self.assertEqual(self.queries[0]['_max_results'], '1000')
+
+    def test_refresh(self):
+        self.assertEqual(self.iba_ipa.refresh_network_index(), 5)
+        NETWORKS.append('172.16.0.0/12')
+        self.addCleanup(NETWORKS.pop)
+        self.assertIsNone(self.iba_ipa.get_networks_by_ips(['172.16.0.1'])[0])
+        self.assertEqual(self.iba_ipa.refresh_network_index(), 6)
+        self.assertEqual(self.iba_ipa.get_network_by_ip('172.16.0.1'),
+                         '172.16.0.0/12')
+        self.assertEqual(len(self.queries), 6)
+
+    def test_reloaded_periodically(self):
+        now = [100.0]
+        with mock.patch('infoblox.infoblox._now', lambda: now[0]):
+            self.iba_ipa.get_network_by_ip('10.1.2.3')
+            NETWORKS.append('172.16.0.0/12')
+            self.addCleanup(NETWORKS.pop)
+            now[0] += 299
+            self.assertEqual(self.iba_ipa.get_networks_by_ips(
+                ['172.16.0.1']), [None])
+            now[0] += 1
+            self.assertEqual(self.iba_ipa.get_network_by_ip('172.16.0.1'),
+                             '172.16.0.0/12')
+        self.assertEqual(len(self.queries), 6)
+
+    def test_created_and_deleted_networks(self):
+        self.iba_ipa.refresh_network_index()
+        self.responses.add(responses.POST, BASE_URL + '/network',
+                           body=json.dumps('network/ZG5z:172.16.0.0/12/'
+                                           'internal'))
+        self.iba_ipa.create_network('172.16.0.0/12')
+        self.assertEqual(self.iba_ipa.get_network_by_ip('172.16.0.1'),
+                         '172.16.0.0/12')
+        self.responses.add(responses.DELETE,
+                           BASE_URL + '/network/ZG5z:10.1.2.0/24/internal',
+                           body='""')
+        self.responses.replace(responses.GET, BASE_URL + '/network',
+                               body=json.dumps([{
+                                   '_ref': 'network/ZG5z:10.1.2.0/24/'
+                                           'internal'}]))
+        self.iba_ipa.delete_network('10.1.2.0/24')
+        self.assertEqual(self.iba_ipa.get_network_by_ip('10.1.2.3'),
+                         '10.1.0.0/16')
+
+    def test_without_index(self):
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'internal', cookie_auth=False)
+        self.responses.add(responses.GET, BASE_URL + '/ipv4address',
+                           body=json.dumps([{'network': '10.1.2.0/24'}]))
+        self.responses.add(responses.GET, BASE_URL + '/ipv4address',
+                           body='[]')
+        self.assertEqual(iba_ipa.get_networks_by_ips(['10.1.2.3',
+                                                      '172.16.0.1']),
+                         ['10.1.2.0/24', None])
+        self.assertEqual(self.queries, [])
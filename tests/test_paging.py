@@ -0,0 +1,159 @@
+import collections
+import json
+import threading
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from urlparse import parse_qs, urlparse
+
+import responses
+from requests.exceptions import HTTPError
+from infoblox import infoblox
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6'
+
+
+class FakePages(object):
+    """ Serves objects in pages of _max_results like a paging grid """
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.queries = []
+        self.served = threading.Event()
+
+    def page(self, request):
+        query = dict((k, v[0]) for k, v in
+                     parse_qs(urlparse(request.url).query).items())
+        self.queries.append(query)
+        start = int(query.get('_page_id', 0))
+        end = start + int(query['_max_results'])
+        # like the grid, send the id of the next page before the objects
+        body = collections.OrderedDict()
+        if end < len(self.objects):
+            body['next_page_id'] = str(end)
+        body['result'] = self.objects[start:end]
+        if start:
+            self.served.set()
+        return (200, {}, json.dumps(body))
+
+
+class TestIterGet(unittest.TestCase):
+
+    def setUp(self):
+        self.iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                         'default', 'default',
+                                         cookie_auth=False, page_size=2)
+        self.responses = responses.RequestsMock()
+        self.responses.start()
+        self.addCleanup(self.responses.stop)
+        self.addCleanup(self.responses.reset)
+        self.hosts = FakePages([{'name': 'h%d.domain.com' % i}
+                                for i in range(5)])
+        self.responses.add_callback(responses.GET, BASE_URL + '/record:host',
+                                    callback=self.hosts.page)
+
+    def test_objects_from_all_pages(self):
+        hosts = list(self.iba_ipa.util.iter_get(
+            'record:host', {'view': 'default'}, fields=['name'],
+            page_size=2))
+        self.assertEqual([h['name'] for h in hosts],
+                         ['h%d.domain.com' % i for i in range(5)])
+        self.assertEqual(len(self.hosts.queries), 3)
+        first = self.hosts.queries[0]
+        self.assertEqual(first, {'view': 'default', '_return_fields': 'name',
+                                 '_paging': '1', '_max_results': '2',
+                                 '_return_as_object': '1'})
+        self.assertEqual(self.hosts.queries[2],
+                         dict(first, _page_id='4'))
+
+    def test_next_page_prefetched(self):
+        hosts = self.iba_ipa.util.iter_get('record:host', page_size=2)
+        next(hosts)
+        self.assertTrue(self.hosts.served.wait(5))
+        self.assertEqual(len(list(hosts)), 4)
+
+    def test_no_prefetch(self):
+        hosts = self.iba_ipa.util.iter_get('record:host', page_size=2,
+                                           prefetch=False)
+        next(hosts)
+        next(hosts)
+        self.assertEqual(len(self.hosts.queries), 1)
+        next(hosts)
+        self.assertEqual(len(self.hosts.queries), 2)
+
+    def test_plain_list_is_one_page(self):
+        self.responses.add(responses.GET, BASE_URL + '/lease',
+                           body=json.dumps([{'address': '10.0.0.1'}]))
+        self.assertEqual(list(self.iba_ipa.util.iter_get('lease')),
+                         [{'address': '10.0.0.1'}])
+
+    def test_page_error_raised(self):
+        self.responses.add(responses.GET, BASE_URL + '/lease',
+                           body=json.dumps({'result': [{'address': 'a'}],
+                                            'next_page_id': 'x'}))
+        self.responses.add(responses.GET, BASE_URL + '/lease', status=400,
+                           body=json.dumps({'text': 'Page expired'}))
+        leases = self.iba_ipa.util.iter_get('lease')
+        self.assertEqual(next(leases), {'address': 'a'})
+        with self.assertRaises(HTTPError):
+            next(leases)
+
+    def test_bad_page_size(self):
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            list(self.iba_ipa.util.iter_get('record:host', page_size=0))
+
+    def test_search_paged(self):
+        self.assertEqual(self.iba_ipa.get_host_by_regexp('h.*'),
+                         ['h%d.domain.com' % i for i in range(5)])
+        self.assertEqual(self.hosts.queries[0]['name~'], 'h.*')
+        self.assertEqual(self.hosts.queries[0]['_max_results'], '2')
+
+    def test_search_not_found(self):
+        self.hosts.objects = []
+        with self.assertRaises(infoblox.InfobloxNotFoundException):
+            self.iba_ipa.get_host_by_extattrs('Site=none')
+        self.assertEqual(self.hosts.queries[0]['*Site'], 'none')
+
+    def test_unpaged_by_default(self):
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default', cookie_auth=False)
+        self.responses.add(responses.GET, BASE_URL + '/lease',
+                           body=json.dumps([{'address': '10.0.0.1'}]))
+        self.assertEqual(iba_ipa.get_lease(), [{'address': '10.0.0.1'}])
+        self.assertNotIn('_paging',
+                         self.responses.calls[0].request.url)
+
+    def test_next_pages_not_routed_as_searches(self):
+        session = self.iba_ipa.session
+        self.assertTrue(session.is_read('GET', BASE_URL + '/record:host'))
+        self.assertTrue(session.is_read('GET', BASE_URL + '/record:host',
+                                        {'_paging': 1}))
+        self.assertFalse(session.is_read(
+            'GET', BASE_URL + '/record:host?_page_id=4'))
+
+
+class TestPagedReadRouting(unittest.TestCase):
+
+    @responses.activate
+    def test_pages_from_the_member_of_the_first_page(self):
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default', cookie_auth=False,
+                                    read_endpoints=['10.10.10.21',
+                                                    '10.10.10.22'],
+                                    page_size=2)
+        hosts = FakePages([{'name': 'h%d.domain.com' % i} for i in range(5)])
+        for member in ('10.10.10.21', '10.10.10.22'):
+            responses.add_callback(
+                responses.GET,
+                'https://%s/wapi/v1.6/record:host' % member,
+                callback=hosts.page)
+        self.assertEqual(len(iba_ipa.get_host_by_regexp('h.*')), 5)
+        # round-robin would alternate, the cursor keeps the pages on .21
+        self.assertEqual([c.request.url.split('/')[2]
+                          for c in responses.calls], ['10.10.10.21'] * 3)
+        self.assertTrue(all('_proxy_search=LOCAL' in c.request.url
+                            for c in responses.calls))
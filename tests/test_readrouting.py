@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+
+import requests
+import responses
+from infoblox import infoblox
+from . import testcasefixture
+
+GM_HOST_URL = 'https://10.10.10.10/wapi/v1.6/record:host'
+MEMBER1_HOST_URL = 'https://10.10.10.21/wapi/v1.6/record:host'
+MEMBER2_HOST_URL = 'https://10.10.10.22/wapi/v1.6/record:host'
+
+
+class TestReadRouting(testcasefixture.TestCaseWithFixture):
+    fixture_name = 'host_get'
+
+    def make_client(self, **kwargs):
+        return infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                 'default', 'default',
+                                 read_endpoints=['10.10.10.21',
+                                                 '10.10.10.22'],
+                                 **kwargs)
+
+    def called_hosts(self):
+        return [c.request.url.split('/')[2] for c in responses.calls]
+
+    @responses.activate
+    def test_reads_round_robin_over_members(self):
+        iba_ipa = self.make_client()
+        for url in (MEMBER1_HOST_URL, MEMBER2_HOST_URL):
+            responses.add(responses.GET, url, body=self.body, status=200)
+        for _ in range(3):
+            iba_ipa.get_host('host.domain.com')
+        self.assertEqual(self.called_hosts(),
+                         ['10.10.10.21', '10.10.10.22', '10.10.10.21'])
+
+    @responses.activate
+    def test_reads_use_local_proxy_search(self):
+        iba_ipa = self.make_client()
+        responses.add(responses.GET, MEMBER1_HOST_URL, body=self.body,
+                      status=200)
+        iba_ipa.get_host('host.domain.com')
+        self.assertIn('_proxy_search=LOCAL', responses.calls[0].request.url)
+
+    @responses.activate
+    def test_writes_stay_on_grid_master(self):
+        iba_ipa = self.make_client()
+        responses.add(responses.POST, GM_HOST_URL,
+                      body='{"ipv4addrs": [{"ipv4addr": "10.0.0.1"}]}',
+                      status=201)
+        iba_ipa.create_host_record('10.0.0.1', 'host.domain.com')
+        self.assertEqual(self.called_hosts(), ['10.10.10.10'])
+
+    @responses.activate
+    def test_function_calls_stay_on_grid_master(self):
+        iba_ipa = self.make_client()
+        session = iba_ipa.session
+        self.assertFalse(session.is_read('GET', GM_HOST_URL,
+                                         {'_function': 'foo'}))
+        self.assertFalse(session.is_read('POST', GM_HOST_URL))
+        self.assertTrue(session.is_read('GET', GM_HOST_URL, {'name': 'a'}))
+
+    def test_refs_and_downloads_stay_on_grid_master(self):
+        session = self.make_client().session
+        self.assertFalse(session.is_read(
+            'GET', 'https://10.10.10.10/wapi/v1.6/csvimporttask/'
+                   'Y3N2aW1wb3J0:1'))
+        self.assertFalse(session.is_read(
+            'GET', 'https://10.10.10.10/http_direct_file_io/'
+                   'req_id-DOWNLOAD-1/hosts.csv'))
+
+    @responses.activate
+    def test_export_downloaded_from_grid_master(self):
+        iba_ipa = self.make_client()
+        download = 'https://10.10.10.10/http_direct_file_io/' \
+                   'req_id-DOWNLOAD-1/hosts.csv'
+        responses.add(responses.POST, 'https://10.10.10.10/wapi/v1.6/fileop',
+                      body='{"token": "t", "url": "%s"}' % download)
+        responses.add(responses.GET, download, body='header-hostrecord\r\n')
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        iba_ipa.csv_export('record:host', os.path.join(directory, 'h.csv'))
+        self.assertEqual(self.called_hosts(), ['10.10.10.10'] * 3)
+        self.assertEqual(responses.calls[1].request.url, download)
+
+    @responses.activate
+    def test_unreachable_member_skipped(self):
+        iba_ipa = self.make_client(breaker_failures=1)
+        responses.add(responses.GET, MEMBER1_HOST_URL,
+                      body=requests.exceptions.ConnectTimeout())
+        responses.add(responses.GET, MEMBER2_HOST_URL, body=self.body,
+                      status=200)
+        iba_ipa.get_host('host.domain.com')
+        iba_ipa.get_host('host.domain.com')
+        self.assertEqual(self.called_hosts(),
+                         ['10.10.10.21', '10.10.10.22', '10.10.10.22'])
+
+    @responses.activate
+    def test_grid_master_used_when_no_member_reachable(self):
+        iba_ipa = self.make_client()
+        for url in (MEMBER1_HOST_URL, MEMBER2_HOST_URL):
+            responses.add(responses.GET, url,
+                          body=requests.exceptions.ConnectTimeout())
+        responses.add(responses.GET, GM_HOST_URL, body=self.body, status=200)
+        iba_ipa.get_host('host.domain.com')
+        self.assertEqual(self.called_hosts()[-1], '10.10.10.10')
+        self.assertNotIn('_proxy_search', responses.calls[-1].request.url)
+
+    @responses.activate
+    def test_least_latency_prefers_fastest_member(self):
+        iba_ipa = self.make_client(read_routing='least-latency')
+        members = iba_ipa.read_endpoints.endpoints
+        members[0].observe(0.5)
+        members[1].observe(0.1)
+        responses.add(responses.GET, MEMBER2_HOST_URL, body=self.body,
+                      status=200)
+        iba_ipa.get_host('host.domain.com')
+        self.assertEqual(self.called_hosts(), ['10.10.10.22'])
+        stats = iba_ipa.read_endpoint_stats
+        self.assertEqual(stats[1]['requests'], 1)
+
+    def test_unknown_routing_rejected(self):
+        with self.assertRaises(infoblox.InfobloxBadInputParameter):
+            self.make_client(read_routing='random')
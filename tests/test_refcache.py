@@ -0,0 +1,141 @@
+import json
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import responses
+from infoblox import infoblox
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6'
+HOST_REF = 'record:host/ZG5zLmhvc3Q:host.domain.com/default'
+GRID_REF = 'grid/b25lLmNsdXN0ZXIkMA:Infoblox'
+
+
+class TestRefCache(unittest.TestCase):
+
+    def setUp(self):
+        self.now = [100.0]
+        patcher = mock.patch('infoblox.infoblox._now', lambda: self.now[0])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = infoblox.RefCache(maxsize=2, ttl=10)
+
+    def test_key(self):
+        self.assertEqual(infoblox.RefCache.key(HOST_REF),
+                         ('record:host', 'host.domain.com', 'default'))
+        self.assertEqual(infoblox.RefCache.key(
+            'network/ZG5z:10.0.0.0/24/default'),
+            ('network', '10.0.0.0/24', 'default'))
+        self.assertEqual(infoblox.RefCache.key(GRID_REF),
+                         ('grid', 'Infoblox', None))
+        self.assertIsNone(infoblox.RefCache.key('record:host'))
+
+    def test_hit_and_expiry(self):
+        self.cache.put(HOST_REF)
+        self.assertEqual(self.cache.get('record:host', 'host.domain.com',
+                                        'default'), HOST_REF)
+        self.now[0] += 11
+        self.assertIsNone(self.cache.get('record:host', 'host.domain.com',
+                                         'default'))
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.stats.snapshot(),
+                         {'hits': 1, 'misses': 1, 'evictions': 0,
+                          'invalidations': 0})
+
+    def test_least_recently_used_evicted(self):
+        self.cache.update([{'_ref': 'record:a/1:a.domain.com/default'},
+                           {'_ref': 'record:a/2:b.domain.com/default'}])
+        self.cache.get('record:a', 'a.domain.com', 'default')
+        self.cache.put('record:a/3:c.domain.com/default')
+        self.assertIsNone(self.cache.get('record:a', 'b.domain.com',
+                                         'default'))
+        self.assertIsNotNone(self.cache.get('record:a', 'a.domain.com',
+                                            'default'))
+        self.assertEqual(self.cache.stats.snapshot()['evictions'], 1)
+
+    def test_discard(self):
+        self.cache.put(GRID_REF)
+        self.cache.put(GRID_REF, ('grid', None, None))
+        self.cache.discard(GRID_REF)
+        self.assertIsNone(self.cache.get('grid', 'Infoblox'))
+        self.assertIsNone(self.cache.get('grid', None))
+        self.assertEqual(self.cache.stats.snapshot()['invalidations'], 1)
+
+
+class TestCachedRefs(unittest.TestCase):
+
+    def setUp(self):
+        self.iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                         'default', 'default',
+                                         cookie_auth=False, ref_cache=True)
+
+    def add_host(self):
+        responses.add(responses.GET, BASE_URL + '/record:host',
+                      body=json.dumps([{'_ref': HOST_REF,
+                                        'name': 'host.domain.com'}]))
+
+    @responses.activate
+    def test_delete_skips_search(self):
+        self.add_host()
+        responses.add(responses.DELETE, BASE_URL + '/' + HOST_REF,
+                      body=json.dumps(HOST_REF))
+        self.iba_ipa.get_host('host.domain.com')
+        self.iba_ipa.delete_host_record('host.domain.com')
+        self.assertEqual([c.request.method for c in responses.calls],
+                         ['GET', 'DELETE'])
+        stats = self.iba_ipa.ref_cache_stats
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['size'], 0)
+
+    @responses.activate
+    def test_stale_ref_looked_up(self):
+        self.add_host()
+        self.iba_ipa.get_host('host.domain.com')
+        new_ref = HOST_REF.replace('ZG5zLmhvc3Q', 'bmV3')
+        responses.add(responses.DELETE, BASE_URL + '/' + HOST_REF,
+                      status=404, body=json.dumps({
+                          'code': 'Client.Ibap.Data.NotFound'}))
+        responses.replace(responses.GET, BASE_URL + '/record:host',
+                          body=json.dumps([{'_ref': new_ref}]))
+        responses.add(responses.DELETE, BASE_URL + '/' + new_ref,
+                      body=json.dumps(new_ref))
+        self.iba_ipa.delete_host_record('host.domain.com')
+        self.assertEqual([c.request.method for c in responses.calls],
+                         ['GET', 'DELETE', 'GET', 'DELETE'])
+        self.assertEqual(self.iba_ipa.ref_cache_stats['invalidations'], 1)
+
+    @responses.activate
+    def test_grid_ref_reused(self):
+        responses.add(responses.GET, BASE_URL + '/grid',
+                      body=json.dumps([{'_ref': GRID_REF}]))
+        responses.add(responses.POST,
+                      BASE_URL + '/' + GRID_REF, body='{}')
+        self.iba_ipa.restart_grid_services({'member_order': 'SIMULTANEOUSLY'})
+        self.iba_ipa.restart_grid_services({'member_order': 'SIMULTANEOUSLY'})
+        self.assertEqual([c.request.method for c in responses.calls],
+                         ['GET', 'POST', 'POST'])
+
+    @responses.activate
+    def test_renamed_ref_forgotten(self):
+        self.add_host()
+        responses.add(responses.PUT, BASE_URL + '/' + HOST_REF,
+                      body=json.dumps(
+                          'record:host/ZG5zLmhvc3Q:new.domain.com/default'))
+        self.iba_ipa.get_host('host.domain.com')
+        self.iba_ipa.util.put({'_ref': HOST_REF}, {'name': 'new.domain.com'})
+        cache = self.iba_ipa.ref_cache
+        self.assertIsNone(cache.get('record:host', 'host.domain.com',
+                                    'default'))
+        self.assertIsNotNone(cache.get('record:host', 'new.domain.com',
+                                       'default'))
+
+    def test_disabled_by_default(self):
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default', cookie_auth=False)
+        self.assertIsNone(iba_ipa.ref_cache)
+        self.assertEqual(iba_ipa.ref_cache_stats, {})
@@ -0,0 +1,156 @@
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+import requests
+import responses
+from requests.exceptions import HTTPError
+from infoblox import infoblox
+from . import testcasefixture
+
+GRID_URL = 'https://10.10.10.10/wapi/v1.6/grid'
+HOST_REF = 'record:host/ZG5zLmhvc3Q:host.domain.com/default'
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = infoblox.RetryPolicy(max_retries=3)
+
+    def test_get_is_idempotent(self):
+        self.assertTrue(self.policy.is_idempotent('GET', GRID_URL))
+
+    def test_delete_by_ref_is_idempotent(self):
+        self.assertTrue(self.policy.is_idempotent(
+            'DELETE', 'https://10.10.10.10/wapi/v1.6/' + HOST_REF))
+
+    def test_delete_by_search_is_not_idempotent(self):
+        self.assertFalse(self.policy.is_idempotent(
+            'DELETE', 'https://10.10.10.10/wapi/v1.6/record:host'))
+
+    def test_function_call_is_not_idempotent(self):
+        self.assertFalse(self.policy.is_idempotent(
+            'PUT', 'https://10.10.10.10/wapi/v1.6/' + HOST_REF +
+            '?_function=foo'))
+
+    def test_post_is_not_idempotent(self):
+        self.assertFalse(self.policy.is_idempotent(
+            'POST', 'https://10.10.10.10/wapi/v1.6/record:host'))
+
+    def test_post_retried_on_429(self):
+        self.assertTrue(self.policy.is_retryable(
+            'POST', 'https://10.10.10.10/wapi/v1.6/record:host', 0,
+            status=429))
+
+    def test_post_not_retried_on_503(self):
+        self.assertFalse(self.policy.is_retryable(
+            'POST', 'https://10.10.10.10/wapi/v1.6/record:host', 0,
+            status=503))
+
+    def test_not_retried_after_max_retries(self):
+        self.assertFalse(self.policy.is_retryable('GET', GRID_URL, 3,
+                                                  status=503))
+
+    def test_retry_after_seconds(self):
+        response = mock.Mock(headers={'Retry-After': '2'})
+        self.assertEqual(self.policy.backoff(0, response), 2.0)
+
+    def test_retry_after_beyond_max_backoff_stops_retries(self):
+        response = mock.Mock(headers={'Retry-After': '3600'})
+        self.assertIsNone(self.policy.backoff(0, response))
+
+    def test_retry_after_http_date(self):
+        delay = self.policy.parse_retry_after(
+            'Wed, 21 Oct 2015 07:28:00 GMT')
+        self.assertEqual(delay, 0.0)
+
+    def test_backoff_is_capped_and_jittered(self):
+        delays = [self.policy.backoff(10) for _ in range(100)]
+        self.assertTrue(all(0 <= d <= self.policy.max_backoff
+                            for d in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    def test_budget_exhausted(self):
+        policy = infoblox.RetryPolicy(budget_max=2)
+        results = [policy.is_retryable('GET', GRID_URL, 0, status=503)
+                   for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(policy.stats['budget_exhausted'], 1)
+
+
+class TestSessionRetry(testcasefixture.TestCaseWithFixture):
+    fixture_name = 'grid_get'
+
+    def setUp(self):
+        patcher = mock.patch('infoblox.infoblox.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar',
+                                         '1.6', 'default', 'default',
+                                         retries=2)
+
+    def test_retries_flag(self):
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default', retries=True)
+        self.assertEqual(iba_ipa.retry_policy.max_retries,
+                         infoblox.RetryPolicy().max_retries)
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default', retries=False)
+        self.assertIsNone(iba_ipa.retry_policy)
+
+    @responses.activate
+    def test_get_retried_after_503(self):
+        responses.add(responses.GET, GRID_URL, status=503)
+        responses.add(responses.GET, GRID_URL, body=self.body, status=200)
+        grid = self.iba_ipa.get_grid()
+        self.assertEqual(grid[0]['_ref'], 'grid/b25lLmNsdXN0ZXIkMA:GridMember')
+        self.assertEqual(len(responses.calls), 2)
+        self.assertEqual(self.iba_ipa.retry_stats['retries'], 1)
+        self.assertEqual(self.sleep.call_count, 1)
+
+    @responses.activate
+    def test_get_retried_after_connection_error(self):
+        responses.add(responses.GET, GRID_URL,
+                      body=requests.ConnectionError())
+        responses.add(responses.GET, GRID_URL, body=self.body, status=200)
+        self.iba_ipa.get_grid()
+        self.assertEqual(self.iba_ipa.retry_stats['retries'], 1)
+
+    @responses.activate
+    def test_retry_after_honored(self):
+        responses.add(responses.GET, GRID_URL, status=429,
+                      headers={'Retry-After': '7'})
+        responses.add(responses.GET, GRID_URL, body=self.body, status=200)
+        self.iba_ipa.get_grid()
+        self.sleep.assert_called_once_with(7.0)
+
+    @responses.activate
+    def test_gives_up_after_max_retries(self):
+        responses.add(responses.GET, GRID_URL, status=502)
+        with self.assertRaises(HTTPError):
+            self.iba_ipa.get_grid()
+        self.assertEqual(len(responses.calls), 3)
+
+    @responses.activate
+    def test_post_not_retried(self):
+        responses.add(responses.POST,
+                      'https://10.10.10.10/wapi/v1.6/record:host',
+                      status=503)
+        with self.assertRaises(HTTPError):
+            self.iba_ipa.create_host_record('10.0.0.1', 'host.domain.com')
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_no_retries_by_default(self):
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default')
+        responses.add(responses.GET, GRID_URL, status=503)
+        with self.assertRaises(HTTPError):
+            iba_ipa.get_grid()
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(iba_ipa.retry_stats, {})
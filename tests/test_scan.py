@@ -0,0 +1,164 @@
+import json
+import re
+import threading
+import time
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from urlparse import parse_qs, urlparse
+
+import responses
+from requests.exceptions import HTTPError
+from infoblox import infoblox
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6'
+
+
+class FakeInventory(object):
+    """ Pages through the hosts matching a name~ regexp, counting the
+        requests in flight
+    """
+
+    def __init__(self, names, delay=0.02):
+        self.names = names
+        self.delay = delay
+        self.queries = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def page(self, request):
+        query = dict((k, v[0]) for k, v in
+                     parse_qs(urlparse(request.url).query).items())
+        with self.lock:
+            self.queries.append(query)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if query.get('name~') == '^f':
+                return (400, {}, json.dumps({'text': 'Search failed'}))
+            names = [n for n in self.names
+                     if re.match(query.get('name~', ''), n)]
+            start = int(query.get('_page_id', 0))
+            end = start + int(query['_max_results'])
+            body = {'result': [{'name': n} for n in names[start:end]]}
+            if end < len(names):
+                body['next_page_id'] = str(end)
+            return (200, {}, json.dumps(body))
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class TestPrefixShards(unittest.TestCase):
+
+    def test_every_name_in_one_shard(self):
+        shards = infoblox.prefix_shards('name', 'ba1')
+        self.assertEqual(shards, [{'name~': '^1'}, {'name~': '^a'},
+                                  {'name~': '^b'}, {'name~': '^[^1ab]'}])
+        for name in ('a.domain.com', 'b', '1host', '_sip', 'c', '*.wild'):
+            self.assertEqual(sum(1 for shard in shards
+                                 if re.match(shard['name~'], name)), 1)
+
+    def test_bad_characters(self):
+        for chars in ('', 'a.', 'a]'):
+            with self.assertRaises(infoblox.InfobloxBadInputParameter):
+                infoblox.prefix_shards('name', chars)
+
+
+class TestScan(unittest.TestCase):
+
+    def setUp(self):
+        self.iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                         'default', 'default',
+                                         cookie_auth=False)
+        self.responses = responses.RequestsMock(
+            assert_all_requests_are_fired=False)
+        self.responses.start()
+        self.addCleanup(self.responses.stop)
+        self.addCleanup(self.responses.reset)
+        self.names = ['%s%d.domain.com' % (c, i)
+                      for c in 'abcd_' for i in range(7)]
+        self.inventory = FakeInventory(self.names)
+        self.responses.add_callback(responses.GET, BASE_URL + '/record:host',
+                                    callback=self.inventory.page)
+
+    def test_all_objects_once(self):
+        hosts = list(self.iba_ipa.scan(
+            'record:host', infoblox.prefix_shards('name', 'abcd'),
+            query_params={'view': 'default'}, fields='name', page_size=3))
+        self.assertEqual(sorted(h['name'] for h in hosts),
+                         sorted(self.names))
+        # 5 shards of 7 names in pages of 3
+        self.assertEqual(len(self.inventory.queries), 15)
+        self.assertTrue(all(q['view'] == 'default'
+                            for q in self.inventory.queries))
+
+    def test_paged_without_page_size(self):
+        hosts = list(self.iba_ipa.scan('record:host',
+                                       infoblox.prefix_shards('name', 'ab')))
+        self.assertEqual(len(hosts), len(self.names))
+        self.assertTrue(all(q['_paging'] == '1' and
+                            q['_max_results'] == '1000'
+                            for q in self.inventory.queries))
+
+    def test_concurrency_cap(self):
+        list(self.iba_ipa.scan('record:host',
+                               infoblox.prefix_shards('name', 'abcd'),
+                               concurrency=2, page_size=3))
+        self.assertEqual(self.inventory.max_in_flight, 2)
+
+    def test_shards_in_parallel(self):
+        self.inventory.delay = 0.1
+        start = time.time()
+        list(self.iba_ipa.scan('record:host',
+                               infoblox.prefix_shards('name', 'abcd'),
+                               concurrency=5, page_size=7))
+        # five single page shards at once, not one after the other
+        self.assertLess(time.time() - start, 0.4)
+
+    def test_shard_error_raised(self):
+        with self.assertRaises(HTTPError):
+            list(self.iba_ipa.scan('record:host',
+                                   [{'name~': '^a'}, {'name~': '^f'}],
+                                   page_size=3))
+
+    def test_scan_abandoned(self):
+        running = set(threading.enumerate())
+        hosts = self.iba_ipa.scan('record:host',
+                                  infoblox.prefix_shards('name', 'abcd'),
+                                  concurrency=3, page_size=1)
+        self.assertEqual(len([next(hosts) for _ in range(3)]), 3)
+        hosts.close()
+        for thread in set(threading.enumerate()) - running:
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+        self.assertLess(len(self.inventory.queries), 35)
+
+    def test_zone_shards(self):
+        self.responses.add(responses.GET, BASE_URL + '/zone_auth',
+                           body=json.dumps({'result': [
+                               {'fqdn': 'domain.com'},
+                               {'fqdn': 'lab.domain.com'}]}))
+        self.assertEqual(self.iba_ipa.zone_shards(),
+                         [{'zone': 'domain.com'}, {'zone': 'lab.domain.com'}])
+        request = self.responses.calls[0].request
+        self.assertIn('view=default', request.url)
+        self.assertIn('_return_fields=fqdn', request.url)
+        self.assertIn('_max_results=1000', request.url)
+
+    def test_network_shards(self):
+        self.responses.add(responses.GET, BASE_URL + '/network',
+                           body=json.dumps({'result': [
+                               {'network': '10.0.0.0/24'},
+                               {'network': '10.0.1.0/24'}]}))
+        self.assertEqual(self.iba_ipa.network_shards('10.0.0.0/16'),
+                         [{'network': '10.0.0.0/24'},
+                          {'network': '10.0.1.0/24'}])
+        self.assertIn('network_container=10.0.0.0%2F16',
+                      self.responses.calls[0].request.url)
@@ -0,0 +1,120 @@
+import json
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import responses
+from infoblox import infoblox
+from . import fakewapi
+
+BASE_URL = 'https://10.10.10.10/wapi/v1.6'
+HOST_REF = 'record:host/ZG5zLmhvc3QkLl9kZWZhdWx0:host.domain.com/default'
+NETWORK_REF = 'network/ZG5zLm5ldHdvcms:10.0.0.0/24/default'
+
+
+class TestSingleRequestDeletes(unittest.TestCase):
+
+    def setUp(self):
+        self.iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                         'default', 'default',
+                                         cookie_auth=False,
+                                         single_request_deletes=True)
+
+    @responses.activate
+    def test_search_and_delete_chained(self):
+        responses.add(responses.POST, BASE_URL + '/request', status=200,
+                      body=json.dumps([NETWORK_REF]))
+        self.iba_ipa.delete_network('10.0.0.0/24')
+        self.assertEqual(len(responses.calls), 1)
+        search, delete = json.loads(responses.calls[0].request.body)
+        self.assertEqual(search['method'], 'GET')
+        self.assertEqual(search['object'], 'network')
+        self.assertEqual(search['data'], {'network': '10.0.0.0/24',
+                                          'network_view': 'default'})
+        self.assertEqual(search['assign_state'], {'found_ref': '_ref'})
+        self.assertEqual(delete, {'method': 'DELETE',
+                                  'object': '##STATE:found_ref:##',
+                                  'enable_substitution': True})
+
+    @responses.activate
+    def test_unexpected_reference_not_deleted(self):
+        responses.add(responses.GET, BASE_URL + '/record:host', status=200,
+                      body=json.dumps([{'_ref': 'record:host/ZG5z:other.com/'
+                                                'default'}]))
+        with self.assertRaises(infoblox.InfobloxGeneralException):
+            self.iba_ipa.delete_host_record('host.domain.com')
+        # the name is checked before anything is deleted
+        self.assertEqual([call.request.method for call in responses.calls],
+                         ['GET'])
+
+    @responses.activate
+    def test_dns_records_not_chained(self):
+        for obj, ref, delete in (
+                ('record:host', HOST_REF, self.iba_ipa.delete_host_record),
+                ('record:txt', 'record:txt/ZG5z:host.domain.com/default',
+                 self.iba_ipa.delete_txt_record),
+                ('record:cname', 'record:cname/ZG5z:host.domain.com/default',
+                 self.iba_ipa.delete_cname_record)):
+            responses.add(responses.GET, BASE_URL + '/' + obj, status=200,
+                          body=json.dumps([{'_ref': ref}]))
+            responses.add(responses.DELETE, BASE_URL + '/' + ref, status=200,
+                          body=json.dumps(ref))
+            delete('host.domain.com')
+        self.assertEqual([call.request.method for call in responses.calls],
+                         ['GET', 'DELETE'] * 3)
+
+    @responses.activate
+    def test_failed_request_falls_back(self):
+        responses.add(responses.POST, BASE_URL + '/request', status=400,
+                      body=json.dumps({'text': 'State assignment failed'}))
+        responses.add(responses.GET, BASE_URL + '/network', status=200,
+                      body='[]')
+        with self.assertRaises(infoblox.InfobloxNotFoundException):
+            self.iba_ipa.delete_network('10.0.0.0/24')
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_per_call_override(self):
+        responses.add(responses.GET, BASE_URL + '/network', status=200,
+                      body=json.dumps([{'_ref': 'network/ZG5z:10.0.0.0/24/'
+                                                'default'}]))
+        responses.add(responses.DELETE,
+                      BASE_URL + '/network/ZG5z:10.0.0.0/24/default',
+                      status=200, body='"network/ZG5z:10.0.0.0/24/default"')
+        self.iba_ipa.delete_network('10.0.0.0/24', single_request=False)
+        self.assertEqual([call.request.method for call in responses.calls],
+                         ['GET', 'DELETE'])
+
+    @responses.activate
+    def test_range_searched_by_both_addresses(self):
+        responses.add(responses.POST, BASE_URL + '/request', status=200,
+                      body=json.dumps(['range/ZG5z:10.0.0.10/10.0.0.20/'
+                                       'default']))
+        self.iba_ipa.delete_dhcp_range('10.0.0.10', '10.0.0.20')
+        search = json.loads(responses.calls[0].request.body)[0]
+        self.assertEqual(search['data'], {'start_addr': '10.0.0.10',
+                                          'end_addr': '10.0.0.20',
+                                          'network_view': 'default'})
+
+
+class TestSingleRequestDeleteRoundTrips(unittest.TestCase):
+
+    def setUp(self):
+        self.server = fakewapi.FakeWapi()
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        self.server.add_host('host.domain.com', '10.0.0.1')
+        self.iba_ipa = self.server.client(single_request_deletes=True)
+        self.iba_ipa.get_host('host.domain.com')
+
+    def test_host_checked_before_delete(self):
+        requests = self.server.requests
+        self.iba_ipa.delete_host_record('host.domain.com')
+        self.assertEqual(self.server.requests - requests, 2)
+        self.assertEqual(self.server.hosts, {})
+
+    def test_missing_host(self):
+        with self.assertRaises(infoblox.InfobloxNotFoundException):
+            self.iba_ipa.delete_host_record('missing.domain.com')
+        self.assertIn('host.domain.com', self.server.hosts)
@@ -0,0 +1,89 @@
+import threading
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import responses
+from infoblox import infoblox
+from . import fakewapi
+
+THREADS = 16
+CALLS = 20
+
+
+def run_threads(target, count=THREADS):
+    errors = []
+
+    def worker(i):
+        try:
+            target(i)
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=worker, args=(i,))
+               for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return errors
+
+
+class TestSharedClient(unittest.TestCase):
+
+    def setUp(self):
+        self.server = fakewapi.FakeWapi()
+        self.server.start()
+        self.addCleanup(self.server.stop)
+        for i in range(THREADS):
+            self.server.add_host('host%d.domain.com' % i, '10.0.0.%d' % i)
+        self.iba_ipa = self.server.client(pool_maxsize=THREADS)
+
+    def test_results_not_mixed_between_threads(self):
+        def lookups(i):
+            for _ in range(CALLS):
+                host = self.iba_ipa.get_host('host%d.domain.com' % i)
+                self.assertEqual(host['name'], 'host%d.domain.com' % i)
+                self.assertEqual(host['ipv4addrs'][0]['ipv4addr'],
+                                 '10.0.0.%d' % i)
+        self.assertEqual(run_threads(lookups), [])
+
+    def test_one_pool_shared_by_threads(self):
+        def lookups(i):
+            for _ in range(CALLS):
+                self.iba_ipa.get_host('host%d.domain.com' % i)
+        run_threads(lookups)
+        stats = self.iba_ipa.pool_stats
+        self.assertLessEqual(stats['created'], THREADS)
+        self.assertEqual(stats['created'] + stats['reused'],
+                         THREADS * CALLS)
+
+    def test_single_login(self):
+        def lookup(i):
+            self.iba_ipa.get_host('host%d.domain.com' % i)
+        self.assertEqual(run_threads(lookup), [])
+        self.assertEqual(self.server.logins, 1)
+
+    def test_concurrent_writes(self):
+        def create_delete(i):
+            fqdn = 'new%d.domain.com' % i
+            self.iba_ipa.create_host_record('10.1.0.%d' % i, fqdn)
+            self.iba_ipa.delete_host_record(fqdn)
+        self.assertEqual(run_threads(create_delete), [])
+        self.assertEqual(len(self.server.hosts), THREADS)
+
+
+class TestUtilQueryParams(unittest.TestCase):
+
+    @responses.activate
+    def test_query_params_not_modified(self):
+        responses.add(responses.GET,
+                      'https://10.10.10.10/wapi/v1.6/lease', body='[{}]',
+                      status=200)
+        iba_ipa = infoblox.Infoblox('10.10.10.10', 'foo', 'bar', '1.6',
+                                    'default', 'default')
+        query_params = {'address': '10.0.0.1'}
+        iba_ipa.util.get('lease', query_params=query_params,
+                         fields=['address'])
+        self.assertEqual(query_params, {'address': '10.0.0.1'})
+        self.assertIn('_return_fields=address', responses.calls[0].request.url)
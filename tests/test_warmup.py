@@ -0,0 +1,147 @@
+import os
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+try:
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from infoblox import infoblox
+
+
+class EmptyListHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'[]')
+
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def make_certificate(directory):
+    cert = os.path.join(directory, 'cert.pem')
+    key = os.path.join(directory, 'key.pem')
+    subprocess.check_call(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+         '-days', '1', '-subj', '/CN=127.0.0.1',
+         '-keyout', key, '-out', cert],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return cert, key
+
+
+class TestWarmup(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        try:
+            cert, key = make_certificate(cls.directory)
+        except (OSError, subprocess.CalledProcessError):
+            shutil.rmtree(cls.directory)
+            raise unittest.SkipTest('openssl is needed to run a TLS server')
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        cls.server = ThreadingServer(('127.0.0.1', 0), EmptyListHandler)
+        cls.server.socket = context.wrap_socket(cls.server.socket,
+                                                server_side=True)
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+        cls.host = '127.0.0.1:%d' % cls.server.server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutil.rmtree(cls.directory)
+
+    def setUp(self):
+        # a CA bundle in the environment would override iba_verify_ssl
+        patcher = mock.patch.dict(os.environ)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        os.environ.pop('REQUESTS_CA_BUNDLE', None)
+        os.environ.pop('CURL_CA_BUNDLE', None)
+
+    def make_client(self, **kwargs):
+        return infoblox.Infoblox(self.host, 'foo', 'bar', '1.6',
+                                 'default', 'default', **kwargs)
+
+    def test_warmup_opens_pooled_connections(self):
+        iba_ipa = self.make_client(pool_maxsize=4)
+        self.assertEqual(iba_ipa.warmup(3), 3)
+        self.assertEqual(iba_ipa.pool_stats['created'], 3)
+        iba_ipa.session.get(iba_ipa.base_url + '/grid')
+        stats = iba_ipa.pool_stats
+        self.assertEqual(stats['created'], 3)
+        self.assertEqual(stats['reused'], 1)
+
+    def test_warmup_bounded_by_pool_size(self):
+        iba_ipa = self.make_client(pool_maxsize=2)
+        self.assertEqual(iba_ipa.warmup(5), 2)
+
+    def test_constructor_flag(self):
+        iba_ipa = self.make_client(warmup=2)
+        self.assertEqual(iba_ipa.pool_stats['created'], 2)
+
+    def test_unreachable_host_ignored(self):
+        iba_ipa = infoblox.Infoblox('127.0.0.1:1', 'foo', 'bar', '1.6',
+                                    'default', 'default', connect_timeout=1)
+        self.assertEqual(iba_ipa.warmup(2), 0)
+
+    def test_tls_session_resumed(self):
+        iba_ipa = self.make_client(keep_alive=False)
+        for _ in range(3):
+            iba_ipa.session.get(iba_ipa.base_url + '/grid')
+        stats = iba_ipa.tls_stats
+        self.assertEqual(stats['handshakes'], 3)
+        self.assertEqual(stats['resumed'], 2)
+
+    def test_tls_resumption_disabled(self):
+        iba_ipa = self.make_client(keep_alive=False, tls_resumption=False)
+        for _ in range(2):
+            iba_ipa.session.get(iba_ipa.base_url + '/grid')
+        self.assertEqual(iba_ipa.tls_stats['resumed'], 0)
+
+    def test_imported_without_ssl_context(self):
+        # python < 2.7.9 has neither SSLContext nor SSLSession
+        code = ('import requests, ssl\n'
+                'del ssl.SSLContext, ssl.SSLSession\n'
+                'from infoblox import infoblox\n'
+                'iba_api = infoblox.Infoblox("10.10.10.10", "foo", "bar", '
+                '"1.6", "default", "default")\n'
+                'assert not iba_api.session.adapters["https://"]'
+                '.tls_resumption\n')
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        subprocess.check_call([sys.executable, '-c', code], cwd=root)
+
+    def test_timings_breakdown(self):
+        iba_ipa = self.make_client()
+        iba_ipa.session.get(iba_ipa.base_url + '/grid')
+        timings = iba_ipa.connection_timings
+        for phase in ('dns', 'connect', 'tls', 'first_byte'):
+            self.assertEqual(timings[phase]['count'], 1)
+            self.assertGreaterEqual(timings[phase]['total'], 0)